@@ -0,0 +1,49 @@
+import json
+
+
+class ActionScript:
+    """
+    Сценарій дій для headless режиму замість миші.
+
+    JSON-файл — список кроків, кожен з моментом спрацювання за часом ("at",
+    секунди від старту) або за номером кадру ("frame"):
+
+        [
+          {"at": 1.0, "action": "crosshair"},
+          {"frame": 120, "action": "zoom_in", "repeat": 10},
+          {"at": 5.0, "action": "switch_hls", "index": 2},
+          {"at": 30.0, "action": "quit"}
+        ]
+
+    Решта полів кроку передається як параметри дії (як у /api/action).
+    """
+
+    def __init__(self, steps):
+        self.steps = []
+        for step in steps:
+            if "action" not in step or ("at" not in step and "frame" not in step):
+                raise ValueError(f"Некоректний крок сценарію: {step}")
+            self.steps.append(dict(step))
+        self._pending = list(self.steps)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @property
+    def finished(self):
+        return not self._pending
+
+    def due(self, frame_index, elapsed):
+        """Повертає список (action, params), час яких настав, і прибирає їх зі сценарію."""
+        ready = []
+        remaining = []
+        for step in self._pending:
+            if ("at" in step and elapsed >= step["at"]) or ("frame" in step and frame_index >= step["frame"]):
+                params = {k: v for k, v in step.items() if k not in ("at", "frame", "action", "repeat")}
+                ready.extend([(step["action"], params)] * int(step.get("repeat", 1)))
+            else:
+                remaining.append(step)
+        self._pending = remaining
+        return ready
@@ -0,0 +1,172 @@
+import os
+import queue
+import threading
+import time
+
+
+class _Alert:
+    def __init__(self, name, path, volume, cooldown, max_per_minute):
+        self.name = name
+        self.path = path
+        self.volume = volume
+        self.cooldown = cooldown
+        self.max_per_minute = max_per_minute
+        self.sound = None
+        self.channel = None
+        self.last_play = -1e9
+        # Token bucket для обмеження частоти: max_per_minute токенів на хвилину
+        self.tokens = float(max_per_minute or 0)
+        self.tokens_time = time.monotonic()
+        self.played = 0
+        self.suppressed = 0
+
+
+class AlertEngine:
+    """
+    Звукові сповіщення з мінімальною затримкою.
+
+    Файли декодуються в PCM (pygame.mixer.Sound) один раз при старті, кожне
+    сповіщення має власний канал мікшера, тож звуки не перебивають один одного
+    і можуть звучати одночасно. trigger() викликається з потоку рендерингу
+    і коштує кілька порівнянь: debounce (cooldown) та обмеження частоти
+    перевіряються одразу, а саме відтворення виконує окремий потік.
+    """
+
+    def __init__(self, frequency=44100, size=-16, channels=2, buffer=512,
+                 driver="alsa", device="hw:0,0", max_pending=8):
+        """
+        :param frequency: Частота дискретизації мікшера.
+        :param size: Розрядність семплу (-16 = signed 16 bit).
+        :param channels: Кількість аудіоканалів виходу (1 або 2).
+        :param buffer: Розмір буфера мікшера в семплах; менший — менша затримка, але ризик заїкань.
+        :param driver: SDL_AUDIODRIVER за замовчуванням (змінна оточення має пріоритет).
+        :param device: SDL_AUDIO_DEVICE за замовчуванням (напр. HDMI 0).
+        :param max_pending: Максимальна черга запитів на відтворення.
+        """
+        self.frequency = frequency
+        self.size = size
+        self.channels = channels
+        self.buffer = buffer
+        self.driver = driver
+        self.device = device
+        self._alerts = {}
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._mixer = None
+        self._ready = False
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def register(self, name, path, volume=1.0, cooldown=1.0, max_per_minute=None):
+        """
+        Додає сповіщення. Викликати до start().
+        :param cooldown: Мінімальний інтервал між відтвореннями, с (debounce).
+        :param max_per_minute: Ліміт відтворень за хвилину (None — без ліміту).
+        """
+        self._alerts[name] = _Alert(name, path, volume, cooldown, max_per_minute)
+
+    def start(self):
+        """
+        Ініціалізує мікшер і декодує всі звуки. Повільно (імпорт pygame, init
+        аудіопристрою), тому викликається у фоні. Повертає True при успіху.
+        """
+        if self.driver:
+            os.environ.setdefault("SDL_AUDIODRIVER", self.driver)
+        if self.device:
+            os.environ.setdefault("SDL_AUDIO_DEVICE", self.device)
+        # pygame імпортується тут, а не на рівні модуля: це сотні мс при старті
+        import pygame
+        pygame.mixer.pre_init(self.frequency, self.size, self.channels, self.buffer)
+        pygame.mixer.init()
+        pygame.mixer.set_num_channels(max(8, len(self._alerts)))
+        pygame.mixer.set_reserved(len(self._alerts))
+
+        for i, alert in enumerate(self._alerts.values()):
+            if not os.path.exists(alert.path):
+                print(f"⚠️  Аудіофайл не знайдено: {alert.path}")
+                continue
+            try:
+                alert.sound = pygame.mixer.Sound(alert.path)
+            except pygame.error as e:
+                print(f"⚠️  Не вдалося завантажити {alert.path}: {e}")
+                continue
+            alert.sound.set_volume(alert.volume)
+            alert.channel = pygame.mixer.Channel(i)
+
+        self._mixer = pygame.mixer
+        self._thread = threading.Thread(target=self._worker, name="alert-audio", daemon=True)
+        self._thread.start()
+        self._ready = True
+        return True
+
+    def stop(self):
+        """Зупиняє всі звуки та потік відтворення."""
+        if not self._ready:
+            return
+        self._ready = False
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._mixer.stop()
+
+    # --- Сторона основного циклу ---
+    def trigger(self, name):
+        """
+        Запитує відтворення сповіщення. Неблокуюче; повертає True, якщо
+        звук поставлено в чергу, False — якщо придушено чи рушій не готовий.
+        """
+        alert = self._alerts.get(name)
+        if alert is None or not self._ready or alert.sound is None:
+            return False
+        now = time.monotonic()
+        if now - alert.last_play < alert.cooldown:
+            alert.suppressed += 1
+            return False
+        if alert.max_per_minute:
+            alert.tokens = min(float(alert.max_per_minute),
+                               alert.tokens + (now - alert.tokens_time) * alert.max_per_minute / 60.0)
+            alert.tokens_time = now
+            if alert.tokens < 1.0:
+                alert.suppressed += 1
+                return False
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            alert.suppressed += 1
+            return False
+        if alert.max_per_minute:
+            alert.tokens -= 1.0
+        alert.last_play = now
+        return True
+
+    def stop_alert(self, name):
+        alert = self._alerts.get(name)
+        if alert is not None and alert.channel is not None:
+            alert.channel.stop()
+
+    def stats(self):
+        return {name: {"played": a.played, "suppressed": a.suppressed} for name, a in self._alerts.items()}
+
+    @property
+    def played_total(self):
+        return sum(a.played for a in self._alerts.values())
+
+    @property
+    def suppressed_total(self):
+        return sum(a.suppressed for a in self._alerts.values())
+
+    # --- Потік відтворення ---
+    def _worker(self):
+        while True:
+            alert = self._queue.get()
+            if alert is None:
+                return
+            # Канал сповіщення вже грає — перезапускаємо звук з початку
+            alert.channel.play(alert.sound)
+            alert.played += 1
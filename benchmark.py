@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Відтворюваний бенчмарк відеопайплайна без апаратури.
+
+Проганяє синтетичний (або записаний) кліп через етапи обробки кадру
+на фіксованих роздільностях і друкує JSON з ms/кадр, алокаціями на кадр
+та піковою пам'яттю для кожного етапу.
+
+Приклади:
+    python benchmark.py --out bench.json
+    python benchmark.py --clip record/video_001.mp4 --frames 200
+    python benchmark.py --compare bench.json --threshold 0.15   # exit 1 при регресії
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from frame_ops import enhance_image, zoom_frame, thermal_hot_mask, apply_thermal_colormap, draw_text_pil
+from frame_pool import FramePool
+from hud_manager import HUDManager
+from motion_detector import MotionDetector
+from simulator.camera import SyntheticClip
+from stabilizer import Stabilizer
+from temporal_denoise import TemporalDenoiser
+from thermal_analysis import ThermalAnalyzer
+
+try:
+    from PIL import ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+DEFAULT_RESOLUTIONS = ["640x480", "1024x600", "1920x1080"]
+DEFAULT_FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DejaVuSans.ttf")
+
+
+class FileClip:
+    """Записаний кліп, що читається по колу і масштабується до потрібного розміру."""
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Не вдалося відкрити кліп: {path}")
+
+    def read_into(self, index, out):
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+            if not ret:
+                raise RuntimeError(f"Кліп порожній: {self.path}")
+        cv2.resize(frame, (self.width, self.height), dst=out)
+
+
+# --- Етапи ---
+# Кожна фабрика отримує (width, height, font) і повертає функцію frame -> frame,
+# що повторює відповідний етап основного циклу test_opt.py — з тими ж буферами
+# FramePool, які повертаються в пул на початку кожного кадру.
+def make_motion(width, height, font):
+    detector = MotionDetector(min_contour_area=500, scale_factor=0.5, var_threshold=70)
+    def run(frame):
+        frame, _ = detector.detect_and_draw(frame, frame)
+        return frame
+    return run
+
+def make_motion_thermal(width, height, font):
+    detector = MotionDetector(min_contour_area=500, scale_factor=0.5, var_threshold=70)
+    pool = FramePool()
+    def run(frame):
+        pool.end_frame()
+        hot = thermal_hot_mask(frame, dst=pool.like(frame), gray=pool.lease(frame.shape[:2]),
+                               mask=pool.lease(frame.shape[:2]))
+        frame, _ = detector.detect_and_draw(hot, frame)
+        return frame
+    return run
+
+def make_enhance(width, height, font):
+    pool = FramePool()
+    def run(frame):
+        pool.end_frame()
+        return enhance_image(frame, dst=pool.like(frame), work=pool.like(frame))
+    return run
+
+def make_denoise(width, height, font):
+    denoiser = TemporalDenoiser(alpha=0.25, motion_threshold=14)
+    pool = FramePool()
+    def run(frame):
+        pool.end_frame()
+        return denoiser.apply(frame, dst=pool.like(frame))
+    return run
+
+def make_zoom(width, height, font):
+    pool = FramePool()
+    def run(frame):
+        pool.end_frame()
+        return zoom_frame(frame, 2.0, dst=pool.like(frame))
+    return run
+
+def make_stabilized_zoom(width, height, font):
+    stabilizer = Stabilizer(scale=0.25, smoothing=0.9, budget_ms=3.0)
+    pool = FramePool()
+    def run(frame):
+        pool.end_frame()
+        return zoom_frame(frame, 3.0, dst=pool.like(frame), offset=stabilizer.update(frame))
+    return run
+
+def make_thermal_colormap(width, height, font):
+    pool = FramePool()
+    def run(frame):
+        pool.end_frame()
+        return apply_thermal_colormap(frame, font, dst=pool.like(frame), gray=pool.lease(frame.shape[:2]))
+    return run
+
+def make_thermal_analysis(width, height, font):
+    analyzer = ThermalAnalyzer(scale=0.25, offset=50, min_blob_area=200)
+    def run(frame):
+        return analyzer.draw(frame, analyzer.analyze(frame))
+    return run
+
+def make_hud_text(width, height, font):
+    pos = (width - 300, 60)
+    return lambda frame: draw_text_pil(frame, "Відстань: 1234.5 м", pos, font)
+
+def make_hud_draw(width, height, font):
+    hud = HUDManager(timeout=float("inf"), font=font)
+    hud.show_message("Детекцію руху увімкнено")
+    return hud.draw
+
+STAGES = {
+    "motion": make_motion,
+    "motion_thermal": make_motion_thermal,
+    "enhance": make_enhance,
+    "denoise": make_denoise,
+    "zoom": make_zoom,
+    "stabilized_zoom": make_stabilized_zoom,
+    "thermal_colormap": make_thermal_colormap,
+    "thermal_analysis": make_thermal_analysis,
+    "hud_text": make_hud_text,
+    "hud_draw": make_hud_draw,
+}
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def bench_stage(func, clip, frames, warmup, mem_frames):
+    """
+    Два проходи: перший — лише час (tracemalloc сповільнює код),
+    другий — алокації. Кадр джерела копіюється в робочий буфер поза
+    вимірюваною ділянкою, бо етапи малюють на кадрі на місці.
+    """
+    src = np.empty((clip.height, clip.width, 3), np.uint8)
+    work = np.empty_like(src)
+
+    times = []
+    for i in range(warmup + frames):
+        clip.read_into(i, src)
+        np.copyto(work, src)
+        t0 = time.perf_counter_ns()
+        func(work)
+        dt = time.perf_counter_ns() - t0
+        if i >= warmup:
+            times.append(dt / 1e6)
+
+    tracemalloc.start()
+    start_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    peak_total = 0
+    transient = []
+    for i in range(mem_frames):
+        clip.read_into(warmup + frames + i, src)
+        np.copyto(work, src)
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func(work)
+        _, peak = tracemalloc.get_traced_memory()
+        transient.append(peak - before)
+        peak_total = max(peak_total, peak - start_current)
+    end_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times.sort()
+    mean_ms = sum(times) / len(times)
+    return {
+        "frames": len(times),
+        "ms_mean": round(mean_ms, 3),
+        "ms_p50": round(_percentile(times, 0.50), 3),
+        "ms_p95": round(_percentile(times, 0.95), 3),
+        "ms_max": round(times[-1], 3),
+        "fps": round(1000.0 / mean_ms, 1) if mean_ms else None,
+        "alloc_kb_per_frame": round(sum(transient) / len(transient) / 1024, 1) if transient else None,
+        "retained_kb": round((end_current - start_current) / 1024, 1),
+        "peak_kb": round(peak_total / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(args):
+    font = None
+    if PIL_AVAILABLE and args.font and os.path.exists(args.font):
+        font = ImageFont.truetype(args.font, 22)
+    else:
+        print("⚠️  Шрифт недоступний, HUD текст піде через cv2.putText", file=sys.stderr)
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    stages = args.stages.split(",") if args.stages else list(STAGES)
+    for name in stages:
+        if name not in STAGES:
+            raise SystemExit(f"Невідомий етап: {name} (доступні: {', '.join(STAGES)})")
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "cv_threads": cv2.getNumThreads(),
+            "clip": args.clip or "synthetic",
+            "frames": args.frames,
+            "warmup": args.warmup,
+        },
+        "results": {},
+    }
+
+    for res in args.resolutions.split(","):
+        width, height = (int(v) for v in res.lower().split("x"))
+        report["results"][res] = {}
+        for name in stages:
+            # Свіжий кліп на кожен етап — однакова послідовність кадрів для всіх
+            clip = FileClip(args.clip, width, height) if args.clip else SyntheticClip(width, height)
+            func = STAGES[name](width, height, font)
+            result = bench_stage(func, clip, args.frames, args.warmup, args.mem_frames)
+            report["results"][res][name] = result
+            print(f"{res:>10} {name:<18}{result['ms_mean']:8.2f} ms  p95 {result['ms_p95']:7.2f}  "
+                  f"alloc {result['alloc_kb_per_frame']:8.1f} KB/кадр", file=sys.stderr)
+
+    report["meta"]["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+
+def compare_reports(old, new, threshold):
+    """Повертає список регресій: етапи, де p50 виріс більше ніж на threshold."""
+    regressions = []
+    for res, stages in new["results"].items():
+        for name, result in stages.items():
+            base = old.get("results", {}).get(res, {}).get(name)
+            if not base or not base.get("ms_p50"):
+                continue
+            ratio = result["ms_p50"] / base["ms_p50"]
+            if ratio > 1.0 + threshold:
+                regressions.append({"resolution": res, "stage": name, "old_ms": base["ms_p50"],
+                                    "new_ms": result["ms_p50"], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк відеопайплайна VideoLd")
+    parser.add_argument("--clip", help="відеофайл замість синтетичного кліпу")
+    parser.add_argument("--frames", type=int, default=120, help="кадрів для вимірювання часу")
+    parser.add_argument("--warmup", type=int, default=10, help="кадрів прогріву (не враховуються)")
+    parser.add_argument("--mem-frames", type=int, default=20, help="кадрів для проходу з tracemalloc")
+    parser.add_argument("--resolutions", default=",".join(DEFAULT_RESOLUTIONS))
+    parser.add_argument("--stages", help="через кому, напр. motion,enhance (за замовчуванням усі)")
+    parser.add_argument("--font", default=DEFAULT_FONT)
+    parser.add_argument("--threads", type=int, help="cv2.setNumThreads для відтворюваності")
+    parser.add_argument("--out", help="файл для JSON (інакше stdout)")
+    parser.add_argument("--compare", help="попередній JSON для порівняння")
+    parser.add_argument("--threshold", type=float, default=0.15, help="допустиме сповільнення p50 (0.15 = 15%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.threshold)
+        report["regressions"] = regressions
+        for r in regressions:
+            print(f"❌ Регресія {r['resolution']} {r['stage']}: {r['old_ms']} -> {r['new_ms']} ms "
+                  f"(x{r['ratio']})", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+        else:
+            print("✅ Регресій немає", file=sys.stderr)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+try:
+    from PIL import Image, ImageDraw
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Чисті функції обробки кадру: без глобального стану і апаратури,
+# тому їх використовують і основний цикл, і benchmark.py.
+# Необов'язкові dst/work — буфери з FramePool, щоб не виділяти пам'ять щокадру.
+
+SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+
+# Градієнт шкали температури (гарячий -> холодний), розфарбовується один раз
+_COLORBAR_GRADIENT = np.arange(255, 0, -1, dtype=np.uint8).reshape(-1, 1)
+_colorbar_cache = {}
+
+# Відрендерений текст: (текст, шрифт, колір) -> (зсув, 255-alpha, колір*alpha)
+TEXT_SPRITE_CACHE_SIZE = 256
+_text_sprites = OrderedDict()
+
+
+# --- Enhancement filter ---
+def enhance_image(frame, dst=None, work=None):
+    """
+    Контраст/яскравість та різкість.
+    :param dst: Буфер результату (форма як у frame).
+    :param work: Проміжний буфер (форма як у frame).
+    """
+    alpha, beta = 1.8, 20
+    frame_enhanced = cv2.convertScaleAbs(frame, dst=work, alpha=alpha, beta=beta)
+    return cv2.filter2D(frame_enhanced, -1, SHARPEN_KERNEL, dst=dst)
+
+
+def zoom_rect(shape, zoom, offset=(0, 0)):
+    """
+    Область кадру (x1, y1, x2, y2), яку zoom_frame розтягує до повного розміру.
+    :param shape: Форма кадру до зуму.
+    """
+    h, w = shape[:2]
+    center_x, center_y = w//2, h//2
+    nh, nw = int(h / zoom), int(w / zoom)
+    y1, y2 = center_y - nh//2, center_y + nh//2
+    x1, x2 = center_x - nw//2, center_x + nw//2
+    if offset[0] or offset[1]:
+        dx = min(max(int(round(offset[0])), -x1), w - x2)
+        dy = min(max(int(round(offset[1])), -y1), h - y2)
+        x1, x2, y1, y2 = x1 + dx, x2 + dx, y1 + dy, y2 + dy
+    # захищені границі
+    y1, y2 = max(0, y1), min(h, y2)
+    x1, x2 = max(0, x1), min(w, x2)
+    return x1, y1, x2, y2
+
+
+def zoom_frame(frame, zoom, dst=None, offset=(0, 0)):
+    """
+    Цифровий зум: центральна область кадру, розтягнута до повного розміру.
+    :param offset: Зсув (dx, dy) області від центру (стабілізація), обмежується межами кадру.
+    """
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = zoom_rect(frame.shape, zoom, offset)
+    return cv2.resize(frame[y1:y2, x1:x2], (w, h), dst=dst)
+
+
+def thermal_hot_mask(frame, dst=None, gray=None, mask=None):
+    """
+    Залишає на кадрі теплової камери лише "гарячі" області для детекції руху.
+    Адаптивний поріг: середня яскравість + зміщення, тож система стійка
+    до загальних змін температури фону.
+    :param gray, mask: Одноканальні буфери розміру кадру.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+    adaptive_threshold = min(cv2.mean(gray)[0] + 50, 254)
+    _, mask = cv2.threshold(gray, adaptive_threshold, 255, cv2.THRESH_BINARY, dst=mask)
+    if dst is not None:
+        dst[:] = 0
+    return cv2.bitwise_and(frame, frame, dst=dst, mask=mask)
+
+
+def _colorbar(bar_w, bar_h):
+    key = (bar_w, bar_h)
+    if key not in _colorbar_cache:
+        colorbar_img = cv2.applyColorMap(_COLORBAR_GRADIENT, cv2.COLORMAP_JET)
+        _colorbar_cache[key] = cv2.resize(colorbar_img, (bar_w, bar_h))
+    return _colorbar_cache[key]
+
+
+def apply_thermal_colormap(frame, font=None, dst=None, gray=None):
+    """Heatmap для теплової камери зі шкалою температури всередині HUD панелі."""
+    # Припускаємо, що кадр з термокамери - відтінки сірого (навіть якщо у форматі BGR)
+    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+    frame = cv2.applyColorMap(gray_frame, cv2.COLORMAP_JET, dst=dst)
+
+    # --- Малюємо шкалу температури (кольорову смугу) ---
+    bar_h = 200
+    bar_w = 25
+    # Координати головного HUD
+    hud_rect_x = frame.shape[1] - 300 - 10
+    hud_rect_y = 10
+    # Розміщуємо шкалу всередині HUD, справа, з відступом 10px
+    bar_x = hud_rect_x + 300 - bar_w - 10
+    bar_y = hud_rect_y + (280 - bar_h) // 2 # Вертикально по центру HUD
+
+    frame[bar_y:bar_y+bar_h, bar_x:bar_x+bar_w] = _colorbar(bar_w, bar_h)
+    frame = draw_text_pil(frame, "    Гар", (bar_x - 25, bar_y - 20), font, (255, 255, 255))
+    return draw_text_pil(frame, "    Хол", (bar_x - 30, bar_y + bar_h + 5), font, (255, 255, 255))
+
+
+# --- Функція для малювання тексту з підтримкою UTF-8 ---
+def _text_sprite(text, font, color):
+    """
+    Рендерить текст Pillow один раз у маску та кешує готові для накладання масиви.
+    color задається в RGB, як і раніше для Pillow.
+    """
+    key = (text, id(font), color)
+    sprite = _text_sprites.get(key)
+    if sprite is not None:
+        _text_sprites.move_to_end(key)
+        return sprite
+    try:  # Pillow >= 8.0
+        left, top, right, bottom = font.getbbox(text)
+    except AttributeError:
+        (right, bottom), left, top = font.getsize(text), 0, 0
+    size = (max(1, right - left), max(1, bottom - top))
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+    alpha = np.asarray(mask, dtype=np.uint16)[:, :, None]
+    bgr = np.array(color[:3][::-1], dtype=np.uint16)
+    inverse = cv2.merge([(255 - alpha[:, :, 0]).astype(np.uint8)] * 3)
+    colored = ((alpha * bgr + 127) // 255).astype(np.uint8)
+    sprite = (left, top, inverse, colored)
+    _text_sprites[key] = sprite
+    if len(_text_sprites) > TEXT_SPRITE_CACHE_SIZE:
+        _text_sprites.popitem(last=False)
+    return sprite
+
+
+def draw_text_pil(frame, text, pos, font, color=(255, 255, 255)):
+    """
+    Малює текст на кадрі OpenCV за допомогою Pillow.
+    Підтримує UTF-8 символи.
+
+    Текст рендериться один раз і кешується як спрайт; накладання — змішування
+    лише області тексту на місці, без перетворення всього кадру в PIL і назад.
+    """
+    if not PIL_AVAILABLE or not font:
+        # Fallback до стандартного cv2.putText, якщо Pillow недоступний
+        # або шрифт не завантажено. Кирилиця не буде працювати.
+        cv2.putText(frame, text, pos, cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        return frame
+
+    left, top, inverse, colored = _text_sprite(text, font, tuple(color))
+    h, w = frame.shape[:2]
+    x, y = pos[0] + left, pos[1] + top
+    # Обрізаємо спрайт по межах кадру
+    sx, sy = max(0, -x), max(0, -y)
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(w, x + colored.shape[1]), min(h, y + colored.shape[0])
+    if x2 <= x1 or y2 <= y1:
+        return frame
+    roi = frame[y1:y2, x1:x2]
+    sh, sw = y2 - y1, x2 - x1
+    # roi = roi * (255 - alpha) / 255 + color * alpha / 255
+    cv2.multiply(roi, inverse[sy:sy + sh, sx:sx + sw], dst=roi, scale=1.0 / 255)
+    cv2.add(roi, colored[sy:sy + sh, sx:sx + sw], dst=roi)
+    return frame
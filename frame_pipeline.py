@@ -0,0 +1,270 @@
+import os
+import time
+from bisect import bisect_left
+
+
+class StageTimer:
+    """
+    Гістограма тривалостей (perf_counter_ns) з логарифмічними кошиками.
+
+    Додавання — один bisect по фіксованій таблиці меж, тож таймер можна
+    тримати увімкненим постійно. Перцентилі оцінюються з точністю кошика
+    (4 кошики на октаву, ~19%).
+
+    Крім накопиченої за весь час гістограми, ведеться ковзне вікно з двох
+    половин (rotate() зсуває їх): перцентилі вікна відображають поточну
+    поведінку, а не всю історію з моменту запуску.
+    """
+
+    # Межі кошиків у наносекундах: від 1 мкс до ~4 с
+    BOUNDS_NS = [int(1000 * 2 ** (i / 4)) for i in range(4 * 22)]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_ns = 0
+        # Вікно: поточна та попередня половини
+        self.recent = [0] * len(self.counts)
+        self.previous = [0] * len(self.counts)
+        self.recent_count = self.previous_count = 0
+        self.recent_max_ns = self.previous_max_ns = 0
+
+    def add(self, duration_ns):
+        i = bisect_left(self.BOUNDS_NS, duration_ns)
+        self.counts[i] += 1
+        self.recent[i] += 1
+        self.recent_count += 1
+        if duration_ns > self.recent_max_ns:
+            self.recent_max_ns = duration_ns
+        self.count += 1
+        self.total_ns += duration_ns
+        self.last_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def rotate(self):
+        """Починає нову половину вікна; найстаріша відкидається."""
+        self.previous = self.recent
+        self.previous_count = self.recent_count
+        self.previous_max_ns = self.recent_max_ns
+        self.recent = [0] * len(self.counts)
+        self.recent_count = 0
+        self.recent_max_ns = 0
+
+    @property
+    def window_count(self):
+        return self.recent_count + self.previous_count
+
+    def percentile_ns(self, p, window=False):
+        """
+        Верхня межа кошика, в який потрапляє p-й перцентиль.
+        :param window: По ковзному вікну замість усієї історії.
+        """
+        if window:
+            count = self.window_count
+            max_ns = max(self.recent_max_ns, self.previous_max_ns)
+            counts = [a + b for a, b in zip(self.recent, self.previous)] if count else ()
+        else:
+            count, max_ns, counts = self.count, self.max_ns, self.counts
+        if not count:
+            return 0
+        rank = p / 100.0 * count
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank and c:
+                return min(self.BOUNDS_NS[i], max_ns) if i < len(self.BOUNDS_NS) else max_ns
+        return max_ns
+
+    def summary(self, window=False):
+        """
+        Підсумок у мілісекундах. count/mean — за весь час; з window=True
+        перцентилі та max — по ковзному вікну (window_count вимірювань).
+        """
+        max_ns = max(self.recent_max_ns, self.previous_max_ns) if window else self.max_ns
+        return {
+            "count": self.count,
+            "window_count": self.window_count,
+            "last_ms": self.last_ns / 1e6,
+            "mean_ms": (self.total_ns / self.count / 1e6) if self.count else 0.0,
+            "p50_ms": self.percentile_ns(50, window) / 1e6,
+            "p95_ms": self.percentile_ns(95, window) / 1e6,
+            "p99_ms": self.percentile_ns(99, window) / 1e6,
+            "max_ms": max_ns / 1e6,
+        }
+
+
+class FrameContext:
+    """
+    Стан одного кадру, що передається між етапами.
+    Етапи змінюють ctx.frame на місці або замінюють посилання — без копій.
+    """
+
+    __slots__ = ("frame", "index", "width", "height", "stop", "quit", "data")
+
+    def __init__(self):
+        self.frame = None
+        self.index = 0
+        self.width = 0
+        self.height = 0
+        self.stop = False   # перервати поточний кадр (решта етапів пропускається)
+        self.quit = False   # завершити основний цикл
+        self.data = {}      # довільні дані між етапами
+
+    def next_frame(self):
+        self.index += 1
+        self.frame = None
+        self.stop = False
+        self.data.clear()
+
+
+class Stage:
+    """Етап обробки: функція func(ctx), умова when() та власний таймер."""
+
+    def __init__(self, name, func, when=None):
+        self.name = name
+        self.func = func
+        self.when = when
+        self.enabled = True
+        self.timer = StageTimer()
+
+
+class FramePipeline:
+    """
+    Послідовність іменованих етапів обробки кадру.
+
+    Етапи можна вимикати без редагування циклу (enable/disable або змінна
+    середовища VIDEOLD_DISABLE_STAGES=enhance,motion), а кожен виконаний етап
+    автоматично хронометрується. VIDEOLD_PROFILE=<секунди> періодично друкує
+    звіт по етапах. alloc_tracker (frame_pool.AllocTracker) додатково
+    обліковує виділену кожним етапом пам'ять.
+    """
+
+    def __init__(self, name="main", window_s=10.0):
+        """
+        :param name: Назва pipeline у звітах і метриках.
+        :param window_s: Половина ковзного вікна перцентилів, с (перцентилі
+                         охоплюють останні window_s..2*window_s секунд).
+        """
+        self.name = name
+        self._stages = []
+        self.frame_timer = StageTimer()
+        self.window_ns = int(window_s * 1e9)
+        self._window_start = time.perf_counter_ns()
+        self.profile_interval = float(os.environ.get("VIDEOLD_PROFILE", "0") or 0)
+        self._last_report = time.monotonic()
+        self.alloc_tracker = None
+        self._disabled_from_env = {
+            s.strip() for s in os.environ.get("VIDEOLD_DISABLE_STAGES", "").split(",") if s.strip()
+        }
+
+    # --- Реєстрація ---
+    def add_stage(self, name, func, when=None, before=None, after=None):
+        """
+        Реєструє етап.
+        :param name: Унікальна назва етапу.
+        :param func: Функція func(ctx).
+        :param when: Умова без аргументів; етап виконується лише якщо вона істинна.
+        :param before, after: Вставити перед/після етапу з цією назвою.
+        """
+        if self.get(name) is not None:
+            raise ValueError(f"Етап '{name}' вже зареєстровано")
+        stage = Stage(name, func, when)
+        if name in self._disabled_from_env:
+            stage.enabled = False
+        if before is not None:
+            self._stages.insert(self._index(before), stage)
+        elif after is not None:
+            self._stages.insert(self._index(after) + 1, stage)
+        else:
+            self._stages.append(stage)
+        return stage
+
+    def remove_stage(self, name):
+        self._stages.pop(self._index(name))
+
+    def get(self, name):
+        for stage in self._stages:
+            if stage.name == name:
+                return stage
+        return None
+
+    def _index(self, name):
+        for i, stage in enumerate(self._stages):
+            if stage.name == name:
+                return i
+        raise KeyError(name)
+
+    def enable(self, name, enabled=True):
+        self._stages[self._index(name)].enabled = enabled
+
+    def disable(self, name):
+        self.enable(name, False)
+
+    @property
+    def stage_names(self):
+        return [s.name for s in self._stages]
+
+    # --- Виконання ---
+    def run(self, ctx):
+        """Проганяє кадр через усі активні етапи. Повертає ctx."""
+        clock = time.perf_counter_ns
+        frame_start = clock()
+        tracker = self.alloc_tracker
+        for stage in self._stages:
+            if not stage.enabled or (stage.when is not None and not stage.when()):
+                continue
+            if tracker is not None:
+                tracker.begin()
+            start = clock()
+            stage.func(ctx)
+            stage.timer.add(clock() - start)
+            if tracker is not None:
+                tracker.end(stage.name)
+            if ctx.stop or ctx.quit:
+                break
+        self.frame_timer.add(clock() - frame_start)
+        if frame_start - self._window_start >= self.window_ns:
+            self._window_start = frame_start
+            self.rotate_windows()
+
+        if self.profile_interval and time.monotonic() - self._last_report >= self.profile_interval:
+            self._last_report = time.monotonic()
+            print(self.report())
+        return ctx
+
+    # --- Статистика ---
+    def stats(self, window=True):
+        """
+        Підсумок по кожному етапу та по кадру в цілому.
+        :param window: Перцентилі за ковзним вікном (False — за весь час роботи).
+        """
+        result = {s.name: dict(s.timer.summary(window), enabled=s.enabled) for s in self._stages}
+        result["frame"] = self.frame_timer.summary(window)
+        return result
+
+    def rotate_windows(self):
+        for stage in self._stages:
+            stage.timer.rotate()
+        self.frame_timer.rotate()
+
+    def reset_stats(self):
+        for stage in self._stages:
+            stage.timer.reset()
+        self.frame_timer.reset()
+
+    def report(self, window=True):
+        """Таблиця по етапах; window=False — за весь час роботи (підсумок при виході)."""
+        lines = [f"--- pipeline '{self.name}' ({self.frame_timer.count} frames) ---",
+                 f"{'stage':<18}{'n':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"]
+        for name, s in self.stats(window).items():
+            if not (s["window_count"] if window else s["count"]):
+                continue
+            lines.append(f"{name:<18}{s['count']:>8}{s['mean_ms']:>9.2f}{s['p50_ms']:>9.2f}"
+                         f"{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['max_ms']:>9.2f}")
+        return "\n".join(lines)
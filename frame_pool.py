@@ -0,0 +1,126 @@
+import tracemalloc
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Пул буферів кадрів за (shape, dtype).
+
+    Етапи pipeline беруть вихідні буфери через lease() і пишуть у них через
+    dst=, а end_frame() наприкінці кадру повертає всі видані буфери в пул.
+    Після перших кадрів кожен етап отримує вже виділений буфер, тож у
+    сталому режимі кадр не виділяє жодного нового масиву.
+
+    Буфер дійсний лише до end_frame(): споживач, якому кадр потрібен довше
+    (трансляція, запис у фоні), має скопіювати його у власний буфер.
+    """
+
+    def __init__(self):
+        self._free = {}
+        self._leased = []
+        self.allocations = 0
+        self.allocations_by_tag = {}
+
+    def lease(self, shape, dtype=np.uint8, tag=None):
+        """
+        Видає буфер до кінця кадру. Вміст не ініціалізований.
+        :param tag: Назва етапу для лічильника нових алокацій.
+        """
+        key = (shape, dtype)
+        free = self._free.get(key)
+        if free:
+            buf = free.pop()
+        else:
+            buf = np.empty(shape, dtype)
+            self.allocations += 1
+            if tag is not None:
+                self.allocations_by_tag[tag] = self.allocations_by_tag.get(tag, 0) + 1
+        self._leased.append((key, buf))
+        return buf
+
+    def like(self, frame, tag=None):
+        """Буфер тієї ж форми й типу, що й frame."""
+        return self.lease(frame.shape, frame.dtype.type, tag)
+
+    def end_frame(self):
+        """Повертає в пул усі буфери, видані за кадр."""
+        for key, buf in self._leased:
+            self._free.setdefault(key, []).append(buf)
+        self._leased.clear()
+
+    def clear(self):
+        self._free.clear()
+        self._leased.clear()
+
+    @property
+    def pooled_bytes(self):
+        return sum(buf.nbytes for bufs in self._free.values() for buf in bufs)
+
+
+class AllocTracker:
+    """
+    Облік алокацій по етапах pipeline через tracemalloc.
+
+    Для кожного етапу фіксується пік виділеної пам'яті під час виконання
+    (transient) та різниця до/після (retained). Перші warmup кадрів не
+    враховуються: тоді пул ще наповнюється. Знімок tracemalloc після
+    розігріву порівнюється з кінцевим, щоб показати рядки коду, де пам'ять
+    продовжує рости. tracemalloc сповільнює код у рази — лише для діагностики.
+    """
+
+    def __init__(self, warmup=30, pool=None):
+        self.warmup = warmup
+        self.pool = pool
+        self.frames = 0
+        self.stages = {}        # name -> [виконань, transient сума, transient макс, retained сума]
+        self._before = 0
+        self._baseline = None
+        self._pool_baseline = 0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        tracemalloc.stop()
+
+    def begin(self):
+        self._before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def end(self, name):
+        current, peak = tracemalloc.get_traced_memory()
+        if self.frames < self.warmup:
+            return
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = [0, 0, 0, 0]
+        transient = peak - self._before
+        stats[0] += 1
+        stats[1] += transient
+        stats[2] = max(stats[2], transient)
+        stats[3] += current - self._before
+
+    def end_frame(self):
+        self.frames += 1
+        if self.frames == self.warmup:
+            self._baseline = tracemalloc.take_snapshot()
+            self._pool_baseline = self.pool.allocations if self.pool else 0
+
+    def report(self, top=5):
+        lines = [f"--- allocations after {self.warmup} warm-up frames "
+                 f"({max(0, self.frames - self.warmup)} frames) ---",
+                 f"{'stage':<18}{'n':>8}{'B/frame':>10}{'max B':>10}{'retained':>10}"]
+        for name, (count, transient, worst, retained) in self.stages.items():
+            lines.append(f"{name:<18}{count:>8}{transient / count:>10.0f}{worst:>10}{retained:>10}")
+        if self.pool is not None:
+            lines.append(f"pool: {self.pool.allocations - self._pool_baseline} new buffers after warm-up, "
+                         f"{self.pool.pooled_bytes / 1e6:.1f} MB pooled, by stage {self.pool.allocations_by_tag}")
+        if self._baseline is not None:
+            diff = tracemalloc.take_snapshot().compare_to(self._baseline, "lineno")
+            growth = [d for d in diff if d.size_diff > 0][:top]
+            for d in growth:
+                frame = d.traceback[0]
+                lines.append(f"  +{d.size_diff} B  {frame.filename}:{frame.lineno}")
+        return "\n".join(lines)
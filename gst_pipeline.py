@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Побудова GStreamer pipeline для CSI камери з мінімальною затримкою.
+
+- appsink drop=true max-buffers=1 sync=false: основний цикл завжди отримує
+  найсвіжіший кадр, а не чергу застарілих;
+- формат камери обирається переговорами зі списку, впорядкованого за
+  вартістю перетворення в BGR (BGR від ISP — videoconvert стає passthrough);
+- опційна друга гілка через tee: зменшений сірий кадр для аналізу
+  (з NV12/I420 це просто площина Y).
+
+Вимірювання затримки на videotestsrc (без камери):
+    python gst_pipeline.py --frames 200 --work-ms 40
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+try:
+    import gi
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+    GST_AVAILABLE = True
+except (ImportError, ValueError):
+    GST_AVAILABLE = False
+
+# Формати джерела в порядку вартості перетворення в BGR:
+# 0 — без перетворення, BGRx — відкинути байт, RGB — переставити канали, YUV — перерахунок кольору
+SOURCE_FORMATS = ("BGR", "BGRx", "BGRA", "RGB", "RGBx", "NV12", "I420", "YUY2", "UYVY")
+
+
+class CaptureSettings:
+    """Налаштування pipeline захоплення."""
+
+    def __init__(self, source="libcamerasrc", width=1024, height=600, fps=30, formats=SOURCE_FORMATS,
+                 output_format="BGR", drop=True, max_buffers=1, sync=False, convert_threads=2,
+                 analysis_size=None, analysis_fps=None):
+        """
+        :param source: Елемент-джерело з властивостями (напр. "videotestsrc is-live=true").
+        :param formats: Допустимі формати джерела, від найдешевшого; None — без обмеження формату.
+        :param output_format: Формат кадру для OpenCV (BGR або GRAY8).
+        :param drop: appsink відкидає старі кадри замість черги.
+        :param max_buffers: Скільки кадрів тримає appsink (0 — необмежено).
+        :param sync: Синхронізація appsink з годинником pipeline (для живої камери зайва затримка).
+        :param convert_threads: Потоки videoconvert (якщо перетворення потрібне).
+        :param analysis_size: (w, h) сірої гілки аналізу або None.
+        :param analysis_fps: Обмеження частоти гілки аналізу (None — як основна).
+        """
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.formats = formats
+        self.output_format = output_format
+        self.drop = drop
+        self.max_buffers = max_buffers
+        self.sync = sync
+        self.convert_threads = convert_threads
+        self.analysis_size = analysis_size
+        self.analysis_fps = analysis_fps
+
+
+def _bool(value):
+    return "true" if value else "false"
+
+
+def _source_caps(settings):
+    fields = [f"width={settings.width}", f"height={settings.height}", f"framerate={int(settings.fps)}/1"]
+    if settings.formats:
+        # Список форматів: переговори обирають перший, який підтримує джерело
+        if len(settings.formats) == 1:
+            fields.insert(0, f"format={settings.formats[0]}")
+        else:
+            fields.insert(0, f"format=(string){{{','.join(settings.formats)}}}")
+    return "video/x-raw," + ",".join(fields)
+
+
+def _appsink(settings, name):
+    return (f"appsink name={name} drop={_bool(settings.drop)} max-buffers={settings.max_buffers} "
+            f"sync={_bool(settings.sync)}")
+
+
+def _convert(settings, output_format):
+    # videoconvert без перетворення (формат уже збігається) працює як passthrough
+    return f"videoconvert n-threads={settings.convert_threads} ! video/x-raw,format={output_format}"
+
+
+def build_pipeline(settings, with_analysis=None):
+    """
+    Рядок pipeline для cv2.VideoCapture(..., cv2.CAP_GSTREAMER) або Gst.parse_launch.
+    :param with_analysis: Додати гілку аналізу (за замовчуванням — якщо задано analysis_size).
+                          OpenCV читає лише один appsink, тож гілка має сенс тільки з GstCapture.
+    """
+    if with_analysis is None:
+        with_analysis = settings.analysis_size is not None
+    head = f"{settings.source} ! {_source_caps(settings)}"
+    main = f"{_convert(settings, settings.output_format)} ! {_appsink(settings, 'main')}"
+    if not with_analysis:
+        return f"{head} ! {main}"
+
+    aw, ah = settings.analysis_size
+    rate = ""
+    if settings.analysis_fps:
+        rate = f"videorate drop-only=true ! video/x-raw,framerate={int(settings.analysis_fps)}/1 ! "
+    # Спершу в GRAY8 (для YUV — лише площина Y), потім масштабування вже одного каналу
+    analysis = (f"{rate}{_convert(settings, 'GRAY8')} ! videoscale ! video/x-raw,width={aw},height={ah} ! "
+                f"{_appsink(settings, 'analysis')}")
+    leaky = "queue max-size-buffers=1 max-size-bytes=0 max-size-time=0 leaky=downstream"
+    return f"{head} ! tee name=t t. ! {leaky} ! {main} t. ! {leaky} ! {analysis}"
+
+
+class GstCapture:
+    """
+    Захоплення через PyGObject з двома appsink (основний кадр та гілка аналізу).
+    Інтерфейс як у cv2.VideoCapture; read_analysis() повертає останній сірий кадр.
+    """
+
+    def __init__(self, settings, timeout=1.0):
+        if not GST_AVAILABLE:
+            raise RuntimeError("PyGObject (gi) з GStreamer недоступний")
+        Gst.init(None)
+        self.settings = settings
+        self.timeout_ns = int(timeout * Gst.SECOND)
+        self.description = build_pipeline(settings)
+        self.pipeline = Gst.parse_launch(self.description)
+        self.main_sink = self.pipeline.get_by_name("main")
+        self.analysis_sink = self.pipeline.get_by_name("analysis")
+        self.last_analysis = None
+        self.last_latency_ms = None
+        self.negotiated_format = None
+        self._opened = self.pipeline.set_state(Gst.State.PLAYING) != Gst.StateChangeReturn.FAILURE
+
+    def isOpened(self):
+        return self._opened
+
+    @staticmethod
+    def _to_array(sample):
+        buffer = sample.get_buffer()
+        structure = sample.get_caps().get_structure(0)
+        width, height = structure.get_value("width"), structure.get_value("height")
+        ok, info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return None, structure
+        try:
+            data = np.frombuffer(info.data, np.uint8)
+            # Рядки можуть бути вирівняні (stride > width * channels)
+            stride = len(data) // height
+            channels = 1 if structure.get_value("format") == "GRAY8" else 3
+            frame = data[:stride * height].reshape(height, stride)[:, :width * channels]
+            # Копія обов'язкова: після unmap пам'ять буфера повертається GStreamer
+            frame = frame.copy()
+            return (frame.reshape(height, width, 3) if channels == 3 else frame), structure
+        finally:
+            buffer.unmap(info)
+
+    def _latency_ms(self, sample):
+        """Вік кадру: поточний running time pipeline мінус мітка часу буфера."""
+        clock = self.pipeline.get_clock()
+        pts = sample.get_buffer().pts
+        if clock is None or pts == Gst.CLOCK_TIME_NONE:
+            return None
+        running = clock.get_time() - self.pipeline.get_base_time()
+        return (running - pts) / 1e6
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        sample = self.main_sink.emit("try-pull-sample", self.timeout_ns)
+        if sample is None:
+            return False, None
+        frame, structure = self._to_array(sample)
+        self.last_latency_ms = self._latency_ms(sample)
+        if self.negotiated_format is None:
+            self.negotiated_format = self._source_format()
+        return frame is not None, frame
+
+    def read_analysis(self):
+        """Останній кадр гілки аналізу (неблокуюче); None, якщо ще не було."""
+        if self.analysis_sink is not None:
+            sample = self.analysis_sink.emit("try-pull-sample", 0)
+            if sample is not None:
+                self.last_analysis, _ = self._to_array(sample)
+        return self.last_analysis
+
+    def _source_format(self):
+        """Формат, узгоджений між джерелом і caps-фільтром (джерело має бути назване name=src)."""
+        source = self.pipeline.get_by_name("src")
+        if source is None:
+            return None
+        caps = source.get_static_pad("src").get_current_caps()
+        return caps.get_structure(0).get_value("format") if caps else None
+
+    def grab(self):
+        return self.read()[0]
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.settings.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.settings.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.settings.fps)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        if self._opened:
+            self.pipeline.set_state(Gst.State.NULL)
+            self._opened = False
+
+
+def open_capture(settings):
+    """GstCapture, якщо потрібна гілка аналізу і є PyGObject; інакше cv2 з одним appsink."""
+    if settings.analysis_size is not None and GST_AVAILABLE:
+        return GstCapture(settings)
+    return cv2.VideoCapture(build_pipeline(settings, with_analysis=False), cv2.CAP_GSTREAMER)
+
+
+# --- Вимірювання затримки ---
+def bench_variants(width, height, fps):
+    """Варіанти pipeline для порівняння на videotestsrc (джерело "видає" NV12, як ISP камери)."""
+    source = "videotestsrc is-live=true pattern=ball name=src"
+    native = ("NV12",)
+    return {
+        "legacy": f"{source} ! video/x-raw,format=BGR,width={width},height={height},framerate={fps}/1 "
+                  f"! videoconvert ! appsink",
+        "drop": CaptureSettings(source, width, height, fps, formats=native, drop=True),
+        "queue": CaptureSettings(source, width, height, fps, formats=native, drop=False, max_buffers=0),
+        "drop+analysis": CaptureSettings(source, width, height, fps, formats=native,
+                                         analysis_size=(width // 4, height // 4)),
+    }
+
+
+def measure(capture, frames, work_ms, fps):
+    """
+    Читає кадри з імітацією обробки work_ms на кадр.
+    Затримка — вік кадру в момент читання: напряму з годинника GStreamer (GstCapture)
+    або як (час від першого кадру) - (мітка часу від першого кадру) для cv2.
+    """
+    read_ms, latency, skipped = [], [], 0
+    t0 = pts0 = last_pts = None
+    for _ in range(frames):
+        start = time.perf_counter()
+        ret, frame = capture.read()
+        now = time.perf_counter()
+        if not ret:
+            break
+        read_ms.append((now - start) * 1000.0)
+        if isinstance(capture, GstCapture):
+            if capture.last_latency_ms is not None:
+                latency.append(capture.last_latency_ms)
+            capture.read_analysis()
+        else:
+            pts = capture.get(cv2.CAP_PROP_POS_MSEC)
+            if t0 is None:
+                t0, pts0 = now, pts
+            else:
+                latency.append((now - t0) * 1000.0 - (pts - pts0) + 1000.0 / fps)
+                skipped += max(0, round((pts - last_pts) * fps / 1000.0) - 1)
+            last_pts = pts
+        if work_ms:
+            time.sleep(work_ms / 1000.0)
+
+    def pct(values, q):
+        return round(float(np.percentile(values, q)), 2) if values else None
+    return {
+        "frames": len(read_ms),
+        "read_ms_p50": pct(read_ms, 50),
+        "latency_ms_p50": pct(latency, 50),
+        "latency_ms_p95": pct(latency, 95),
+        "skipped_frames": skipped,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Затримка захоплення для варіантів GStreamer pipeline")
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--work-ms", type=float, default=40.0,
+                        help="імітація обробки кадру; > 1000/fps показує накопичення черги")
+    parser.add_argument("--variants", help="через кому: legacy,drop,queue,drop+analysis")
+    parser.add_argument("--print", dest="print_only", action="store_true", help="лише надрукувати pipeline")
+    parser.add_argument("--out", help="зберегти результати в JSON")
+    args = parser.parse_args(argv)
+
+    variants = bench_variants(args.width, args.height, args.fps)
+    if args.variants:
+        variants = {k: v for k, v in variants.items() if k in args.variants.split(",")}
+    if args.print_only:
+        for name, variant in variants.items():
+            print(f"{name}:\n  {variant if isinstance(variant, str) else build_pipeline(variant)}")
+        return 0
+    if "GStreamer:                   YES" not in cv2.getBuildInformation() and not GST_AVAILABLE:
+        print("❌ Ні OpenCV, ні PyGObject не зібрані з GStreamer — вимірювання неможливе (див. --print)")
+        return 1
+
+    results = {}
+    for name, variant in variants.items():
+        if isinstance(variant, str):
+            capture = cv2.VideoCapture(variant, cv2.CAP_GSTREAMER)
+        elif variant.analysis_size is not None and not GST_AVAILABLE:
+            print(f"⏭️  {name}: гілка аналізу потребує PyGObject")
+            continue
+        else:
+            capture = open_capture(variant)
+        if not capture.isOpened():
+            print(f"❌ {name}: pipeline не відкрився")
+            continue
+        # Прогрів: переговори caps та запуск джерела не входять у вимірювання
+        for _ in range(5):
+            capture.read()
+        results[name] = measure(capture, args.frames, args.work_ms, args.fps)
+        if isinstance(capture, GstCapture):
+            results[name]["source_format"] = capture.negotiated_format
+        capture.release()
+        r = results[name]
+        print(f"{name:<15} read p50 {r['read_ms_p50']} ms  latency p50 {r['latency_ms_p50']} ms  "
+              f"p95 {r['latency_ms_p95']} ms  skipped {r['skipped_frames']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"width": args.width, "height": args.height, "fps": args.fps,
+                       "work_ms": args.work_ms, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
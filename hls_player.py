@@ -1,17 +1,23 @@
 import av
 import cv2
 import time
+from collections import deque
+
+# Межа пакетів, відкладених grab() до наступного ключового кадру
+MAX_GRABBED_PACKETS = 300
 
 class HLSVideo:
-    def __init__(self, url, hud=None, fps=30, width=1024, height=600, reconnect_timeout=2.0):
+    def __init__(self, url, hud=None, fps=30, width=1024, height=600, reconnect_timeout=2.0, options=None):
         """
         url: HLS URL
         hud: об'єкт HUDManager для показу повідомлень
         fps: частота кадрів
         width, height: розмір кадру
         reconnect_timeout: час у секундах для перепідключення
+        options: додаткові опції FFmpeg (напр. {"rtsp_transport": "tcp"})
         """
         self.url = url
+        self.options = dict(options or {})
         self.hud = hud
         self.fps = fps
         self.frame_time = 1.0 / fps
@@ -21,20 +27,29 @@ class HLSVideo:
 
         self.container = None
         self.stream = None
-        self.frame_iter = None
+        self.packets = None
+        self._frames = deque()
+        # Пакети від останнього ключового кадру, забрані grab() без декодування
+        self._grabbed = None
+        self._need_key = False
         self.last_time = time.time()
 
         self._open_stream()
 
     def _open_stream(self):
         try:
-            self.container = av.open(self.url, options={"timeout": str(int(self.reconnect_timeout * 1e6))})
+            options = {"timeout": str(int(self.reconnect_timeout * 1e6))}
+            options.update(self.options)
+            self.container = av.open(self.url, options=options)
             self.stream = self.container.streams.video[0]
-            self.frame_iter = self.container.decode(video=0)
+            self.packets = self.container.demux(self.stream)
+            self._frames.clear()
+            self._grabbed = None
+            self._need_key = False
         except av.AVError:
             self.container = None
             self.stream = None
-            self.frame_iter = None
+            self.packets = None
             if self.hud:
                 self.hud.trigger("crosshair_warning", "Stream error", "no active video stream", duration=3)
 
@@ -53,11 +68,12 @@ class HLSVideo:
             if elapsed < self.frame_time:
                 time.sleep(self.frame_time - elapsed)
 
-            frame = next(self.frame_iter)
+            frame = self._next_frame()
             self.last_time = time.time()
 
-            img = frame.to_ndarray(format="bgr24")
-            img = cv2.resize(img, (self.width, self.height))
+            # Масштабування виконує swscale під час перетворення в BGR —
+            # без проміжного повнорозмірного кадру та окремого cv2.resize
+            img = frame.to_ndarray(width=self.width, height=self.height, format="bgr24")
             return True, img
 
         except (StopIteration, av.AVError):
@@ -67,12 +83,68 @@ class HLSVideo:
             self._open_stream()
             return False, None
 
+    def _next_frame(self):
+        """Наступний декодований кадр; після grab() спершу доганяє відкладені пакети."""
+        if self._grabbed is not None or self._need_key:
+            self._catch_up()
+        while not self._frames:
+            packet = next(self.packets)
+            if self._need_key:
+                if not packet.is_keyframe:
+                    continue
+                self._need_key = False
+            self._frames.extend(packet.decode())
+        return self._frames.popleft()
+
+    def _catch_up(self):
+        """
+        Декодує пакети, забрані grab(), від останнього ключового кадру — лише
+        останній кадр потрібен для показу, решта відновлює стан декодера.
+        """
+        packets, self._grabbed = self._grabbed, None
+        if not packets:
+            # Ключового кадру ще не було: декодувати нема з чого
+            self._need_key = True
+            return
+        self._need_key = False
+        codec = self.stream.codec_context
+        if hasattr(codec, "flush_buffers"):
+            codec.flush_buffers()
+        last = []
+        for packet in packets:
+            last = packet.decode() or last
+        self._frames.extend(last[-1:])
+
+    def grab(self):
+        """
+        Забирає наступний пакет без декодування (декодування відкладається до read()).
+        Використовується warm standby пулом, щоб тримати з'єднання живим за ціною
+        лише мережі та демультиплексора.
+        """
+        if not self.isOpened():
+            return False
+        try:
+            packet = next(self.packets)
+        except (StopIteration, av.AVError):
+            self.release()
+            return False
+        self._frames.clear()
+        if packet.is_keyframe:
+            self._grabbed = [packet]
+        elif self._grabbed and len(self._grabbed) < MAX_GRABBED_PACKETS:
+            self._grabbed.append(packet)
+        else:
+            # Ще немає ключового кадру або GOP задовгий — чекаємо наступного
+            self._grabbed = []
+        self.last_time = time.time()
+        return True
+
     def release(self):
         if self.container:
             self.container.close()
             self.container = None
             self.stream = None
-            self.frame_iter = None
+            self.packets = None
 
     def isOpened(self):
         return self.container is not None
@@ -1,12 +1,7 @@
 import time
 import cv2
-import numpy as np
 
-try:
-    from PIL import Image, ImageDraw, ImageFont
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
+from frame_ops import draw_text_pil, PIL_AVAILABLE
 
 class HUDManager:
     """
@@ -19,6 +14,12 @@ class HUDManager:
         self.message_time = 0
         self.timeout = timeout
         self.font = font
+        self.perf_overlay = False
+
+    def toggle_perf_overlay(self):
+        """Вмикає/вимикає компактний оверлей метрик продуктивності."""
+        self.perf_overlay = not self.perf_overlay
+        return self.perf_overlay
 
     def show_message(self, text):
         """Показати повідомлення (буде видиме кілька секунд)."""
@@ -35,10 +36,8 @@ class HUDManager:
             cv2.putText(frame, text, pos, cv2.FONT_HERSHEY_SIMPLEX, 1.0, color, 2)
             return frame
 
-        img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        draw = ImageDraw.Draw(img_pil)
-        draw.text(pos, text, font=self.font, fill=color)
-        return cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+        # Кешований спрайт тексту, накладається лише на свою область
+        return draw_text_pil(frame, text, pos, self.font, color)
 
     def _get_text_size_pil(self, text):
         """
@@ -55,10 +54,30 @@ class HUDManager:
         except AttributeError: # Старі версії Pillow
             return self.font.getsize(text)
 
+    def draw_perf(self, frame, lines, pos=(180, None)):
+        """
+        Малює рядки метрик у лівому нижньому куті (над смугою повідомлень).
+        Працює на місці: затемнює лише свою область і пише cv2.putText.
+        """
+        if not self.perf_overlay or not lines:
+            return frame
+        h, w = frame.shape[:2]
+        line_h = 18
+        box_w = 400
+        box_h = line_h * len(lines) + 8
+        x1 = pos[0]
+        y1 = pos[1] if pos[1] is not None else h - 60 - 10 - box_h
+        x2, y2 = min(w, x1 + box_w), min(h, y1 + box_h)
+        roi = frame[y1:y2, x1:x2]
+        cv2.convertScaleAbs(roi, dst=roi, alpha=0.3)
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (x1 + 6, y1 + 4 + line_h * (i + 1) - 5),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 0), 1)
+        return frame
+
     def draw(self, frame):
         """Накладає повідомлення на кадр, якщо воно ще актуальне."""
         if self.message and (time.time() - self.message_time < self.timeout):
-            overlay = frame.copy()
             h, w = frame.shape[:2]
 
             # висота смуги
@@ -68,14 +87,9 @@ class HUDManager:
             # Відступ зліва, щоб не перекривати кнопки
             left_offset = 170  # Ширина колонки кнопок (150) + невеликий відступ
 
-            cv2.rectangle(
-                overlay,
-                (left_offset, y1),
-                (w, y2),
-                (0, 0, 0),
-                -1
-            )
-            frame = cv2.addWeighted(overlay, 0.6, frame, 0.4, 0)
+            # Чорна смуга з прозорістю 0.6 = затемнення області до 40%, на місці
+            band = frame[y1:y2, left_offset:w]
+            cv2.convertScaleAbs(band, dst=band, alpha=0.4)
 
             # --- Центрування тексту ---
             text_w, text_h = self._get_text_size_pil(self.message)
@@ -0,0 +1,191 @@
+import math
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Вигляд кнопки, обчислений зі стану: перемальовується лише коли змінився
+ButtonStyle = namedtuple("ButtonStyle", "enabled color label message blink")
+
+COLOR_NORMAL = (0, 100, 200)
+COLOR_ACTIVE = (0, 150, 0)
+COLOR_DISABLED = (80, 80, 80)
+COLOR_BLINK = (0, 0, 255)
+
+
+class StateStore:
+    """
+    Стан UI з підпискою на зміни.
+
+    update() порівнює нові значення з поточними й сповіщає лише підписників
+    змінених ключів, тож синхронізацію можна викликати щокадру — без змін
+    вона коштує одне порівняння на ключ.
+    """
+
+    def __init__(self, **initial):
+        self._values = dict(initial)
+        self._subscribers = {}
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def subscribe(self, keys, callback):
+        """callback(key) викликається при зміні будь-якого з keys."""
+        for key in keys:
+            self._subscribers.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, callback):
+        for callbacks in self._subscribers.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def set(self, key, value):
+        if key in self._values and self._values[key] == value:
+            return False
+        self._values[key] = value
+        for callback in self._subscribers.get(key, ()):
+            callback(key)
+        return True
+
+    def update(self, **values):
+        changed = False
+        for key, value in values.items():
+            changed |= self.set(key, value)
+        return changed
+
+
+class Button:
+    """
+    Кнопка HUD з кешованим спрайтом.
+
+    Стиль (доступність, колір, підпис) обчислюється функцією style лише після
+    зміни стану, від якого кнопка залежить; спрайт перемальовується лише коли
+    стиль справді змінився. Для миготіння кешується невеликий набір фаз.
+    """
+
+    BLINK_PERIOD = 1.5
+    BLINK_STEPS = 12
+
+    def __init__(self, name, rect, label, style=None, depends=()):
+        """
+        :param rect: (x, y, w, h) на екрані.
+        :param style: Функція style(name, label, store) -> ButtonStyle; None — завжди звичайна кнопка.
+        :param depends: Ключі StateStore, від яких залежить стиль.
+        """
+        self.name = name
+        self.rect = rect
+        self.label = label
+        self.style_func = style
+        self.depends = tuple(depends)
+        self.style = None
+        self.dirty = True
+        self._sprites = {}
+
+    def invalidate(self, key=None):
+        self.dirty = True
+
+    def contains(self, x, y):
+        bx, by, bw, bh = self.rect
+        return bx <= x <= bx + bw and by <= y <= by + bh
+
+    def refresh(self, store):
+        if not self.dirty:
+            return
+        self.dirty = False
+        if self.style_func is None:
+            style = ButtonStyle(True, COLOR_NORMAL, self.label, None, False)
+        else:
+            style = self.style_func(self.name, self.label, store)
+        if style != self.style:
+            self.style = style
+            self._sprites.clear()
+
+    def _sprite(self, phase):
+        sprite = self._sprites.get(phase)
+        if sprite is None:
+            _, _, bw, bh = self.rect
+            color = self.style.color
+            if phase is not None:
+                t = phase / self.BLINK_STEPS * self.BLINK_PERIOD
+                factor = (math.sin(t * 2 * math.pi / self.BLINK_PERIOD) + 1) / 2
+                color = tuple(int(c * (1 - factor) + r * factor) for c, r in zip(color, COLOR_BLINK))
+            # +1: прямокутник cv2.rectangle включає праву та нижню межі
+            sprite = np.empty((bh + 1, bw + 1, 3), np.uint8)
+            sprite[:] = color
+            cv2.putText(sprite, self.style.label, (5, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+            self._sprites[phase] = sprite
+        return sprite
+
+    def draw(self, frame, now):
+        phase = None
+        if self.style.blink:
+            phase = int((now % self.BLINK_PERIOD) / self.BLINK_PERIOD * self.BLINK_STEPS)
+        sprite = self._sprite(phase)
+        bx, by = self.rect[0], self.rect[1]
+        fh, fw = frame.shape[:2]
+        h = min(sprite.shape[0], fh - by)
+        w = min(sprite.shape[1], fw - bx)
+        if h > 0 and w > 0:
+            frame[by:by + h, bx:bx + w] = sprite[:h, :w]
+
+
+class WidgetLayer:
+    """
+    Набір кнопок (HUD, Menu) з просторовою сіткою для пошуку кнопки під дотиком.
+    Сітка будується один раз при зміні набору, а hit() перевіряє лише кнопки
+    однієї клітинки замість перебору всього набору.
+    """
+
+    def __init__(self, store, cell=64):
+        self.store = store
+        self.cell = cell
+        self.widgets = {}
+        self._grid = {}
+
+    @classmethod
+    def from_layout(cls, store, layout, style=None, depends=None, cell=64):
+        """
+        Створює шар із словника {name: (x, y, w, h, label)}, як у button_sets.
+        :param depends: Функція name -> ключі стану для кнопки.
+        """
+        layer = cls(store, cell)
+        for name, data in layout.items():
+            if len(data) != 5:
+                continue
+            x, y, w, h, label = data
+            layer.add(Button(name, (x, y, w, h), label, style, depends(name) if depends else ()))
+        return layer
+
+    def add(self, widget):
+        self.widgets[widget.name] = widget
+        if widget.depends:
+            self.store.subscribe(widget.depends, widget.invalidate)
+        x, y, w, h = widget.rect
+        for cx in range(x // self.cell, (x + w) // self.cell + 1):
+            for cy in range(y // self.cell, (y + h) // self.cell + 1):
+                self._grid.setdefault((cx, cy), []).append(widget)
+
+    def clear(self):
+        """Відписує кнопки від стану (при заміні набору, напр. сторінки меню)."""
+        for widget in self.widgets.values():
+            if widget.depends:
+                self.store.unsubscribe(widget.invalidate)
+        self.widgets.clear()
+        self._grid.clear()
+
+    def hit(self, x, y):
+        for widget in self._grid.get((x // self.cell, y // self.cell), ()):
+            if widget.contains(x, y):
+                return widget
+        return None
+
+    def draw(self, frame):
+        now = time.monotonic()
+        for widget in self.widgets.values():
+            widget.refresh(self.store)
+            widget.draw(frame, now)
+        return frame
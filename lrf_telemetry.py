@@ -0,0 +1,224 @@
+import csv
+import io
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+STATUS_OK = 0
+STATUS_NO_READING = 1   # далекомір не відповів або повернув помилку
+STATUS_OUTLIER = 2      # відкинуто медіанним фільтром
+STATUS_NAMES = ("ok", "no_reading", "outlier")
+
+READING_DTYPE = np.dtype([("time", "f8"), ("distance", "f4"), ("min", "f4"), ("max", "f4"), ("status", "u1")])
+
+
+def normalize_reading(result):
+    """
+    (distance, min, max) з відповіді далекоміра.
+    ld.LRF повертає кортеж (мін, макс) з урахуванням похибки, ldtest.LRF та
+    заглушки — одне число. None — немає вимірювання.
+    """
+    if result is None:
+        return None
+    if isinstance(result, (tuple, list)):
+        low, high = float(result[0]), float(result[1])
+        return (low + high) / 2.0, low, high
+    value = float(result)
+    return value, value, value
+
+
+class LRFTelemetry:
+    """
+    Телеметрія далекоміра: кільцевий буфер NumPy на capacity вимірювань
+    (час, дистанція, мін, макс, статус).
+
+    record() викликається з потоку рендерингу і лише пише рядок у буфер;
+    фільтрація — медіана та MAD по останніх window відповідях, тож одиничні
+    викиди відкидаються, а справжня зміна цілі приймається після кількох
+    вимірювань. "Захоплена" дистанція — медіана, коли останні lock_count
+    вимірювань лежать у межах lock_tolerance від неї.
+    Експорт (JSON/CSV) копіює буфер під локом у потоці HTTP сервера.
+    """
+
+    def __init__(self, capacity=4096, window=9, outlier_mad=3.5, min_outlier_m=2.0,
+                 lock_count=5, lock_tolerance=1.0, stale_after=3.0):
+        """
+        :param capacity: Розмір кільцевого буфера (вимірювань).
+        :param window: Скільки останніх відповідей враховує медіанний фільтр.
+        :param outlier_mad: Поріг викиду в масштабованих MAD.
+        :param min_outlier_m: Мінімальний поріг викиду в метрах (коли MAD ≈ 0).
+        :param lock_count: Скільки послідовних стабільних вимірювань потрібно для захоплення.
+        :param lock_tolerance: Допустиме відхилення від медіани для захоплення, м.
+        :param stale_after: Через скільки секунд без вимірювань захоплення знімається.
+        """
+        self.capacity = capacity
+        self.window = window
+        self.outlier_mad = outlier_mad
+        self.min_outlier_m = min_outlier_m
+        self.lock_count = lock_count
+        self.lock_tolerance = lock_tolerance
+        self.stale_after = stale_after
+
+        self._buf = np.zeros(capacity, READING_DTYPE)
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        # Останні відповіді (з викидами) для фільтра — окремо від буфера, без копіювання
+        self._recent = np.zeros(window, np.float32)
+        self._recent_n = 0
+        self._recent_next = 0
+        self.filtered = None
+        self.locked = None
+        self.latest = None
+        self.last_status = None
+        self.last_time = 0.0
+        self.total = 0
+
+    # --- Запис ---
+    def record(self, result, timestamp=None):
+        """
+        Додає відповідь далекоміра.
+        :param result: Як повертає get_single_measurement(): None, число або (мін, макс).
+        :return: Статус вимірювання (STATUS_*).
+        """
+        now = time.time() if timestamp is None else timestamp
+        reading = normalize_reading(result)
+        if reading is None:
+            distance = low = high = np.nan
+            status = STATUS_NO_READING
+        else:
+            distance, low, high = reading
+            status = self._classify(distance)
+            if status == STATUS_OK:
+                self.latest = distance
+
+        with self._lock:
+            self._buf[self._next] = (now, distance, low, high, status)
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+        self.total += 1
+        self.last_status = status
+        self.last_time = now
+        self._update_lock()
+        return status
+
+    def _classify(self, distance):
+        """Оновлює вікно фільтра і визначає, чи є вимірювання викидом."""
+        recent = self._recent[:self._recent_n]
+        status = STATUS_OK
+        if self._recent_n >= 3:
+            median = float(np.median(recent))
+            mad = float(np.median(np.abs(recent - median))) * 1.4826
+            if abs(distance - median) > max(self.outlier_mad * mad, self.min_outlier_m):
+                status = STATUS_OUTLIER
+        # Викиди теж потрапляють у вікно: нова ціль стає медіаною за кілька вимірювань
+        self._recent[self._recent_next] = distance
+        self._recent_next = (self._recent_next + 1) % self.window
+        self._recent_n = min(self._recent_n + 1, self.window)
+        return status
+
+    def _update_lock(self):
+        ok = self.readings(self.window)
+        ok = ok["distance"][ok["status"] == STATUS_OK]
+        if not len(ok):
+            self.filtered = None
+            self.locked = None
+            return
+        self.filtered = float(np.median(ok))
+        tail = ok[-self.lock_count:]
+        if len(tail) >= self.lock_count and np.all(np.abs(tail - self.filtered) <= self.lock_tolerance):
+            self.locked = self.filtered
+        elif self.locked is not None and abs(ok[-1] - self.locked) > self.lock_tolerance:
+            self.locked = None
+
+    # --- Читання ---
+    def readings(self, last=None):
+        """Копія останніх вимірювань у хронологічному порядку (структурований масив)."""
+        with self._lock:
+            count = self._count if last is None else min(last, self._count)
+            start = (self._next - count) % self.capacity
+            if start + count <= self.capacity:
+                return self._buf[start:start + count].copy()
+            return np.concatenate((self._buf[start:], self._buf[:self._next]))
+
+    def display_distance(self, now=None):
+        """
+        Дистанція для HUD: захоплена, інакше останнє прийняте вимірювання
+        (медіана відстає від цілі, що рухається). Викид замінюється медіаною.
+        None — останнє вимірювання невдале або дані застаріли.
+        """
+        now = time.time() if now is None else now
+        if self.last_status in (None, STATUS_NO_READING) or now - self.last_time > self.stale_after:
+            return None
+        if self.locked is not None:
+            return self.locked
+        return self.latest if self.last_status == STATUS_OK else self.filtered
+
+    def rate(self, window_s=5.0, now=None):
+        """Вимірювань за секунду за останні window_s секунд: (усі відповіді, успішні)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            # Незаповнені комірки мають час 0 і не потрапляють у вікно
+            recent = self._buf["time"] >= now - window_s
+            ok = np.count_nonzero(recent & (self._buf["status"] == STATUS_OK))
+            return float(np.count_nonzero(recent)) / window_s, float(ok) / window_s
+
+    def stats(self):
+        data = self.readings()
+        counts = np.bincount(data["status"], minlength=len(STATUS_NAMES))
+        total_rate, ok_rate = self.rate()
+        return {
+            "total": self.total,
+            "buffered": len(data),
+            "by_status": {name: int(n) for name, n in zip(STATUS_NAMES, counts)},
+            "readings_per_s": round(total_rate, 2),
+            "valid_per_s": round(ok_rate, 2),
+            "filtered_m": self.filtered,
+            "locked_m": self.locked,
+        }
+
+    # --- Експорт ---
+    @staticmethod
+    def _rows(data):
+        for t, distance, low, high, status in data.tolist():
+            valid = distance == distance  # NaN для невдалих вимірювань
+            yield (round(t, 3), round(distance, 2) if valid else None, round(low, 2) if valid else None,
+                   round(high, 2) if valid else None, STATUS_NAMES[status])
+
+    def to_json(self, last=None):
+        readings = [dict(zip(("time", "distance", "min", "max", "status"), row))
+                    for row in self._rows(self.readings(last))]
+        return json.dumps({"stats": self.stats(), "readings": readings})
+
+    def to_csv(self, last=None):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(("time", "distance", "min", "max", "status"))
+        writer.writerows(self._rows(self.readings(last)))
+        return out.getvalue()
+
+    def _last_param(self, handler):
+        try:
+            return int(parse_qs(urlsplit(handler.path).query)["last"][0])
+        except (KeyError, ValueError):
+            return None
+
+    def _send(self, handler, body, content_type):
+        body = body.encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def serve_json(self, handler):
+        """Обробник /api/lrf.json (?last=N — лише останні N вимірювань)."""
+        self._send(handler, self.to_json(self._last_param(handler)), "application/json; charset=utf-8")
+
+    def serve_csv(self, handler):
+        """Обробник /api/lrf.csv (?last=N)."""
+        self._send(handler, self.to_csv(self._last_param(handler)), "text/csv; charset=utf-8")
@@ -0,0 +1,322 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class FrameBroadcaster:
+    """
+    Спільний буфер останнього кадру для трансляції клієнтам хотспоту.
+
+    Основний цикл лише копіює кадр у подвійний буфер (publish), а окремий
+    потік кодує його в JPEG один раз і роздає всім клієнтам. Повільний клієнт
+    просто отримує наступний найсвіжіший кадр, пропускаючи проміжні, і ніколи
+    не блокує кодувальник чи цикл рендерингу.
+    """
+
+    BOUNDARY = "frame"
+
+    def __init__(self, quality=70, max_fps=15.0):
+        """
+        :param quality: Якість JPEG (0-100).
+        :param max_fps: Максимальна частота кодування кадрів для трансляції.
+        """
+        self.quality = quality
+        self.max_fps = max_fps
+        self._encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+
+        # Подвійний буфер: _back заповнює основний цикл, _front читає кодувальник
+        self._buf_lock = threading.Lock()
+        self._back = None
+        self._front = None
+        self._new_frame = threading.Event()
+
+        # Останній закодований JPEG та його порядковий номер
+        self._jpeg_cond = threading.Condition()
+        self._jpeg = None
+        self._seq = 0
+
+        self._clients = 0
+        self._clients_lock = threading.Lock()
+        self.dropped = 0  # кадри, перезаписані до того, як кодувальник їх забрав
+        self._raw_consumers = []
+
+        self._running = False
+        self._thread = None
+
+    # --- Життєвий цикл ---
+    def start(self):
+        """Запускає потік кодування."""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._encode_loop, name="mjpeg-encoder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Зупиняє потік кодування та будить усіх клієнтів."""
+        self._running = False
+        self._new_frame.set()
+        with self._jpeg_cond:
+            self._jpeg_cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def client_count(self):
+        return self._clients
+
+    @property
+    def pending_frames(self):
+        """Кадр у буфері, який кодувальник ще не забрав (0 або 1)."""
+        return int(self._new_frame.is_set())
+
+    def has_consumers(self):
+        """Чи є кому віддавати кадри (HTTP клієнти або сирі споживачі, напр. HLS)."""
+        return self._clients > 0 or bool(self._raw_consumers)
+
+    # --- Вхід з основного циклу ---
+    def publish(self, frame):
+        """
+        Передає поточний кадр у спільний буфер. Викликається з основного циклу.
+        Якщо ніхто не дивиться — нічого не робить.
+        """
+        if not self._running or frame is None or not self.has_consumers():
+            return
+        with self._buf_lock:
+            if self._back is None or self._back.shape != frame.shape or self._back.dtype != frame.dtype:
+                self._back = np.empty_like(frame)
+            np.copyto(self._back, frame)
+        if self._new_frame.is_set():
+            self.dropped += 1
+        self._new_frame.set()
+
+    # --- Вихід для клієнтів ---
+    def add_client(self):
+        with self._clients_lock:
+            self._clients += 1
+
+    def remove_client(self):
+        with self._clients_lock:
+            self._clients = max(0, self._clients - 1)
+
+    def add_raw_consumer(self, consumer):
+        """Додає споживача сирих кадрів (об'єкт з методом offer(frame))."""
+        self._raw_consumers.append(consumer)
+
+    def remove_raw_consumer(self, consumer):
+        if consumer in self._raw_consumers:
+            self._raw_consumers.remove(consumer)
+
+    def wait_jpeg(self, last_seq, timeout=1.0):
+        """
+        Чекає на JPEG, новіший за last_seq.
+        :return: Кортеж (seq, jpeg_bytes); jpeg_bytes може бути None при таймауті.
+        """
+        with self._jpeg_cond:
+            self._jpeg_cond.wait_for(lambda: self._seq != last_seq or not self._running, timeout)
+            if self._seq == last_seq:
+                return last_seq, None
+            return self._seq, self._jpeg
+
+    def latest_jpeg(self):
+        """Повертає останній закодований JPEG (або None)."""
+        with self._jpeg_cond:
+            return self._jpeg
+
+    # --- Потік кодування ---
+    def _encode_loop(self):
+        min_interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        last_encode = 0.0
+        while self._running:
+            if not self._new_frame.wait(0.5):
+                continue
+            self._new_frame.clear()
+            if not self._running:
+                break
+
+            # Обмежуємо частоту кодування
+            wait = min_interval - (time.monotonic() - last_encode)
+            if wait > 0:
+                time.sleep(wait)
+
+            # Міняємо буфери місцями під коротким локом, кодуємо без нього
+            with self._buf_lock:
+                self._back, self._front = self._front, self._back
+            frame = self._front
+            if frame is None:
+                continue
+            last_encode = time.monotonic()
+
+            for consumer in list(self._raw_consumers):
+                consumer.offer(frame)
+
+            if self._clients == 0:
+                continue
+            ok, buf = cv2.imencode(".jpg", frame, self._encode_params)
+            if not ok:
+                continue
+            with self._jpeg_cond:
+                self._jpeg = buf.tobytes()
+                self._seq += 1
+                self._jpeg_cond.notify_all()
+
+    # --- HTTP ---
+    def serve_mjpeg(self, handler):
+        """
+        Обробник маршруту /stream.mjpg для WifiHotspotServer.
+        Віддає multipart/x-mixed-replace потік, доки клієнт не від'єднається.
+        """
+        handler.send_response(200)
+        handler.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={self.BOUNDARY}")
+        handler.send_header("Cache-Control", "no-cache, private")
+        handler.send_header("Pragma", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        # Клієнт, що перестав читати, не повинен висіти вічно
+        handler.connection.settimeout(5.0)
+
+        self.add_client()
+        # Будимо кодувальник, якщо кадр уже є в буфері
+        self._new_frame.set()
+        seq = 0
+        try:
+            while self._running:
+                seq, jpeg = self.wait_jpeg(seq)
+                if jpeg is None:
+                    continue
+                handler.wfile.write(
+                    b"--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n"
+                    % (self.BOUNDARY.encode(), len(jpeg))
+                )
+                handler.wfile.write(jpeg)
+                handler.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError, TimeoutError, OSError):
+            pass
+        finally:
+            self.remove_client()
+
+    def serve_snapshot(self, handler):
+        """Обробник маршруту /snapshot.jpg — один останній кадр."""
+        jpeg = self.latest_jpeg()
+        if jpeg is None:
+            handler.send_error(503, "No frame yet")
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "image/jpeg")
+        handler.send_header("Content-Length", str(len(jpeg)))
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        handler.wfile.write(jpeg)
+
+
+class HlsLiveOutput:
+    """
+    Опційний вихід low-latency HLS через ffmpeg.
+
+    Сирі кадри від FrameBroadcaster передаються у stdin ffmpeg з окремого
+    потоку; якщо ffmpeg не встигає — кадр відкидається. Сегменти та плейлист
+    пишуться в підпапку, яку роздає статичний HTTP сервер хотспоту.
+    """
+
+    def __init__(self, out_dir, width=1024, height=600, fps=15, segment_time=1.0, list_size=4):
+        self.out_dir = out_dir
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.segment_time = segment_time
+        self.list_size = list_size
+
+        self._proc = None
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._pending = None
+        self._busy = None
+        self._has_frame = threading.Event()
+
+    @staticmethod
+    def available():
+        return shutil.which("ffmpeg") is not None
+
+    @property
+    def playlist_path(self):
+        return os.path.join(self.out_dir, "stream.m3u8")
+
+    def start(self):
+        if self._running:
+            return True
+        if not self.available():
+            print("⚠️  ffmpeg не знайдено, HLS вихід вимкнено")
+            return False
+        os.makedirs(self.out_dir, exist_ok=True)
+        cmd = [
+            "ffmpeg", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{self.width}x{self.height}", "-r", str(self.fps), "-i", "-",
+            "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+            "-g", str(max(1, int(self.fps * self.segment_time))), "-pix_fmt", "yuv420p",
+            "-f", "hls", "-hls_time", str(self.segment_time),
+            "-hls_list_size", str(self.list_size),
+            "-hls_flags", "delete_segments+independent_segments",
+            self.playlist_path,
+        ]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        self._running = True
+        self._thread = threading.Thread(target=self._feed_loop, name="hls-output", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._running = False
+        self._has_frame.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._proc:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=2)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+
+    @property
+    def pending_frames(self):
+        """Кадр, що чекає запису в stdin ffmpeg (0 або 1)."""
+        return int(self._has_frame.is_set())
+
+    def offer(self, frame):
+        """Неблокуюче передає кадр; якщо потрібен інший розмір — пропускаємо."""
+        if not self._running or frame.shape[:2] != (self.height, self.width):
+            return
+        with self._lock:
+            if self._pending is None or self._pending.shape != frame.shape:
+                self._pending = np.empty_like(frame)
+            np.copyto(self._pending, frame)
+        self._has_frame.set()
+
+    def _feed_loop(self):
+        while self._running:
+            if not self._has_frame.wait(0.5):
+                continue
+            self._has_frame.clear()
+            with self._lock:
+                self._pending, self._busy = self._busy, self._pending
+            if self._busy is None:
+                continue
+            try:
+                self._proc.stdin.write(self._busy.tobytes())
+            except (BrokenPipeError, ValueError, OSError):
+                print("⚠️  ffmpeg HLS процес завершився")
+                self._running = False
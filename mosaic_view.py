@@ -0,0 +1,226 @@
+import math
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class _Tile:
+    """Одна клітинка мозаїки: прямокутник на полотні та потік-декодер."""
+
+    def __init__(self, index, name, opener, rect, view):
+        self.index = index
+        self.name = name
+        self.opener = opener
+        self.rect = rect            # (x, y, w, h) на полотні
+        self.view = view            # view у спільне полотно, без копії
+        self.src_buf = None         # буфер для cap.read(), щоб не виділяти пам'ять щокадру
+        self.target_fps = 0.0
+        self.busy = 0.0             # час (с) роботи декодера з моменту останнього update()
+        self.frames = 0
+        self.online = False
+        self.thread = None
+        self.stop = threading.Event()   # власний сигнал: потік, що не встиг завершитись, не оживе після start()
+
+
+class MosaicView:
+    """
+    Мозаїка з кількох потоків (2x2 або 3x3) на одному полотні.
+
+    Кожне джерело декодується у власному потоці й масштабується одразу у свою
+    клітинку попередньо виділеного полотна (cv2.resize з dst=), тож основний
+    цикл просто показує полотно без додаткових виділень пам'яті. Частота кадрів
+    клітинок підлаштовується під бюджет CPU.
+    """
+
+    def __init__(self, width=1024, height=600, cpu_budget=None, max_fps=15.0, min_fps=1.0):
+        """
+        :param width, height: Розмір полотна.
+        :param cpu_budget: Бюджет CPU на всі декодери, у ядрах (за замовчуванням половина ядер).
+        :param max_fps: Максимальна частота кадрів однієї клітинки.
+        :param min_fps: Мінімальна частота, нижче якої адаптація не опускається.
+        """
+        self.width = width
+        self.height = height
+        self.cpu_budget = cpu_budget or max(1.0, (os.cpu_count() or 2) / 2.0)
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self.tiles = []
+        self.grid = (0, 0)
+        self._running = False
+        self._lock = threading.Lock()
+        self._last_update = time.monotonic()
+
+    @property
+    def active(self):
+        return self._running
+
+    @staticmethod
+    def grid_for(count):
+        """2x2 для до 4 джерел, 3 колонки (3x2 або 3x3) — для більшої кількості."""
+        if count <= 4:
+            return 2, 2
+        return 3, math.ceil(count / 3)
+
+    def start(self, sources):
+        """
+        Запускає мозаїку.
+        :param sources: Список (name, opener), де opener(width, height) повертає
+                        об'єкт з read()/release(), бажано вже у розмірі клітинки.
+        """
+        self.stop()
+        sources = list(sources)[:9]
+        cols, rows = self.grid_for(len(sources))
+        self.grid = (cols, rows)
+        tile_w, tile_h = self.width // cols, self.height // rows
+        # Нове полотно: потоки попередньої мозаїки, що не завершились за stop(),
+        # пишуть у свої старі view і не потрапляють у нову розкладку
+        self.canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+        self.tiles = []
+        for i, (name, opener) in enumerate(sources):
+            x, y = (i % cols) * tile_w, (i // cols) * tile_h
+            view = self.canvas[y:y + tile_h, x:x + tile_w]
+            tile = _Tile(i, name, opener, (x, y, tile_w, tile_h), view)
+            tile.target_fps = self.max_fps
+            self._draw_placeholder(tile, "Connecting...")
+            self.tiles.append(tile)
+
+        self._running = True
+        self._last_update = time.monotonic()
+        for tile in self.tiles:
+            tile.thread = threading.Thread(target=self._worker, args=(tile,), name=f"mosaic-{tile.index}", daemon=True)
+            tile.thread.start()
+
+    def stop(self, timeout=0.5):
+        """
+        Зупиняє всі клітинки. Сигнал отримують усі одразу, очікування — спільне
+        і не довше timeout. Потоки, що застрягли у відкритті чи read(), завершаться
+        самі (daemon) і закриють своє джерело; полотно наступного start() вже інше.
+        """
+        self._running = False
+        for tile in self.tiles:
+            tile.stop.set()
+        deadline = time.monotonic() + timeout
+        for tile in self.tiles:
+            if tile.thread:
+                tile.thread.join(max(0.0, deadline - time.monotonic()))
+                tile.thread = None
+        self.tiles = []
+
+    def tile_at(self, x, y):
+        """Повертає індекс джерела в клітинці під точкою (x, y) або None."""
+        for tile in self.tiles:
+            tx, ty, tw, th = tile.rect
+            if tx <= x < tx + tw and ty <= y < ty + th:
+                return tile.index
+        return None
+
+    def update(self):
+        """
+        Адаптація частоти кадрів під бюджет CPU. Викликається з основного циклу.
+        Якщо декодери сумарно зайняті більше за бюджет — частота знижується
+        пропорційно, якщо значно менше — поступово зростає.
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        if elapsed < 1.0 or not self.tiles:
+            return
+        self._last_update = now
+        with self._lock:
+            busy = sum(t.busy for t in self.tiles)
+            for t in self.tiles:
+                t.busy = 0.0
+        load = busy / elapsed  # у ядрах
+        if load > self.cpu_budget:
+            scale = self.cpu_budget / load
+        elif load < self.cpu_budget * 0.7:
+            scale = 1.25
+        else:
+            return
+        for t in self.tiles:
+            t.target_fps = min(self.max_fps, max(self.min_fps, t.target_fps * scale))
+
+    def stats(self):
+        return [
+            {"name": t.name, "online": t.online, "target_fps": round(t.target_fps, 1), "frames": t.frames}
+            for t in self.tiles
+        ]
+
+    # --- Потік клітинки ---
+    def _draw_placeholder(self, tile, text):
+        tile.view[:] = 30
+        self._draw_label(tile, text)
+
+    def _draw_label(self, tile, status=None):
+        label = f"{tile.index + 1}. {tile.name}"
+        if status:
+            label = f"{label} - {status}"
+        cv2.putText(tile.view, label, (8, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
+
+    def _worker(self, tile):
+        _, _, tw, th = tile.rect
+        cap = None
+        try:
+            while not tile.stop.is_set():
+                if cap is None:
+                    try:
+                        cap = tile.opener(tw, th)
+                    except Exception:
+                        cap = None
+                    if tile.stop.is_set():
+                        break
+                    if cap is None or (hasattr(cap, "isOpened") and not cap.isOpened()):
+                        tile.online = False
+                        self._draw_placeholder(tile, "offline")
+                        cap = None
+                        tile.stop.wait(2.0)
+                        continue
+
+                start = time.perf_counter()
+                # cv2.VideoCapture пише у вже виділений буфер
+                is_cv = isinstance(cap, cv2.VideoCapture)
+                ok, img = cap.read(tile.src_buf) if is_cv else cap.read()
+                if tile.stop.is_set():
+                    break
+                if not ok or img is None:
+                    tile.online = False
+                    self._draw_placeholder(tile, "offline")
+                    cap.release()
+                    cap = None
+                    continue
+                if is_cv:
+                    tile.src_buf = img
+                if img.shape[:2] == (th, tw):
+                    np.copyto(tile.view, img)
+                else:
+                    cv2.resize(img, (tw, th), dst=tile.view, interpolation=cv2.INTER_AREA)
+                self._draw_label(tile)
+                tile.online = True
+                tile.frames += 1
+                spent = time.perf_counter() - start
+                with self._lock:
+                    tile.busy += spent
+
+                # Пропускаємо кадри згідно з поточною цільовою частотою
+                wait = 1.0 / tile.target_fps - spent
+                deadline = time.monotonic() + wait
+                while not tile.stop.is_set() and wait > 0:
+                    if hasattr(cap, "grab"):
+                        # Потік треба вичитувати, інакше накопичується затримка
+                        grab_start = time.perf_counter()
+                        cap.grab()
+                        with self._lock:
+                            tile.busy += time.perf_counter() - grab_start
+                    else:
+                        time.sleep(min(wait, 0.05))
+                    wait = deadline - time.monotonic()
+        finally:
+            if cap is not None:
+                try:
+                    cap.release()
+                except Exception:
+                    pass
@@ -23,6 +23,17 @@ class MotionDetector:
         self.backSub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=self.var_threshold, detectShadows=False)
         self.min_contour_area = min_contour_area
         self.scale_factor = scale_factor
+        self.kernel = np.ones((5, 5), np.uint8)
+        # Рамки (x, y, w, h) з останнього виклику детекції, у координатах кадру
+        self.last_boxes = []
+        # Проміжні буфери detect_and_draw: виділяються один раз для розміру кадру
+        self._buffers = {}
+
+    def _buffer(self, name, shape):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = self._buffers[name] = np.empty(shape, np.uint8)
+        return buf
 
     def detect(self, frame):
         """
@@ -56,6 +67,7 @@ class MotionDetector:
         contours, _ = cv2.findContours(fgMask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
         motion_detected = False
+        self.last_boxes = []
 
         # 4. Ітеруємо по знайдених контурах.
         for contour in contours:
@@ -68,6 +80,7 @@ class MotionDetector:
             # 7. Масштабуємо координати назад до розміру оригінального кадру.
             x, y, w, h = int(x / self.scale_factor), int(y / self.scale_factor), int(w / self.scale_factor), int(h / self.scale_factor)
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 255), 2)
+            self.last_boxes.append((x, y, w, h))
             motion_detected = True
 
         return frame, motion_detected
@@ -83,24 +96,30 @@ class MotionDetector:
                  - frame_to_draw_on: кадр з намальованими прямокутниками.
                  - motion_detected: True, якщо рух було виявлено, інакше False.
         """
-        # 1. Зменшуємо кадр для аналізу.
-        resized_frame = cv2.resize(frame_for_detection, (0, 0), fx=self.scale_factor, fy=self.scale_factor, interpolation=cv2.INTER_AREA)
+        # 1. Зменшуємо кадр для аналізу (у буфер, що живе між кадрами).
+        height, width = frame_for_detection.shape[:2]
+        size = (int(round(width * self.scale_factor)), int(round(height * self.scale_factor)))
+        small_shape = (size[1], size[0]) + frame_for_detection.shape[2:]
+        resized_frame = cv2.resize(frame_for_detection, size, dst=self._buffer("resized", small_shape),
+                                   interpolation=cv2.INTER_AREA)
 
         # 2. Розмиття для зменшення шуму.
-        blurred_frame = cv2.GaussianBlur(resized_frame, (5, 5), 0)
+        blurred_frame = cv2.GaussianBlur(resized_frame, (5, 5), 0, dst=self._buffer("blurred", small_shape))
 
         # 3. Отримуємо "маску" руху.
-        fgMask = self.backSub.apply(blurred_frame)
+        fgMask = self.backSub.apply(blurred_frame, fgmask=self._buffer("mask", small_shape[:2]))
 
         # 3.1. Очищення маски від шуму за допомогою морфологічних операцій.
-        kernel = np.ones((5, 5), np.uint8)
-        fgMask = cv2.morphologyEx(fgMask, cv2.MORPH_OPEN, kernel, iterations=1)
-        fgMask = cv2.morphologyEx(fgMask, cv2.MORPH_CLOSE, kernel, iterations=2)
+        fgMask = cv2.morphologyEx(fgMask, cv2.MORPH_OPEN, self.kernel, dst=self._buffer("opened", fgMask.shape),
+                                  iterations=1)
+        fgMask = cv2.morphologyEx(fgMask, cv2.MORPH_CLOSE, self.kernel, dst=self._buffer("mask", fgMask.shape),
+                                  iterations=2)
 
         # 4. Знаходимо контури.
         contours, _ = cv2.findContours(fgMask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
         motion_detected = False
+        self.last_boxes = []
 
         for contour in contours:
             if cv2.contourArea(contour) < self.min_contour_area:
@@ -111,10 +130,12 @@ class MotionDetector:
             x, y, w, h = int(x / self.scale_factor), int(y / self.scale_factor), int(w / self.scale_factor), int(h / self.scale_factor)
             # Малюємо на кадрі 'frame_to_draw_on'.
             cv2.rectangle(frame_to_draw_on, (x, y), (x+w, y+h), (0, 255, 255), 2)
+            self.last_boxes.append((x, y, w, h))
             motion_detected = True
 
         return frame_to_draw_on, motion_detected
 
     def reset(self):
         """Скидає стан віднімача фону."""
+        self.last_boxes = []
         self.backSub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=self.var_threshold, detectShadows=False)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import json
+import os
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+EVENTS_EXT = ".events.json"
+
+# Кадри — номери кадрів у відеофайлі; рамка (x, y, w, h) — об'єднання всіх рамок події
+MotionEvent = namedtuple("MotionEvent", "start end peak_area x y w h")
+
+
+def events_path(video_path):
+    """Шлях індексу подій для відеофайлу: record/rec_X.mp4 -> record/rec_X.events.json."""
+    return os.path.splitext(video_path)[0] + EVENTS_EXT
+
+
+class EventRecorder:
+    """
+    Збирає події руху під час запису. update() викликається для кожного
+    записаного кадру; подія закривається, коли руху немає gap_frames кадрів.
+    Індекс перезаписується у файл після кожної закритої події, тож обрив
+    запису втрачає щонайбільше поточну подію.
+    """
+
+    def __init__(self, path, fps=None, gap_frames=60):
+        """
+        :param path: Шлях індексу (див. events_path).
+        :param fps: Частота кадрів відео (для переходів у секундах при відтворенні).
+        :param gap_frames: Скільки кадрів без руху завершують подію.
+        """
+        self.path = path
+        self.fps = fps
+        self.gap_frames = gap_frames
+        self.events = []
+        self.frame = 0
+        self._current = None    # [start, end, peak_area, x1, y1, x2, y2]
+
+    def update(self, boxes=None, analysed=False):
+        """
+        :param boxes: Рамки руху (x, y, w, h) цього кадру.
+        :param analysed: Чи виконувалась на кадрі детекція (інакше відсутність рамок нічого не означає).
+        """
+        frame = self.frame
+        self.frame += 1
+        if boxes:
+            area = sum(w * h for _, _, w, h in boxes)
+            x1 = min(x for x, _, _, _ in boxes)
+            y1 = min(y for _, y, _, _ in boxes)
+            x2 = max(x + w for x, _, w, _ in boxes)
+            y2 = max(y + h for _, y, _, h in boxes)
+            event = self._current
+            if event is not None and frame - event[1] >= self.gap_frames:
+                # Детекцію вимикали — довга пауза без аналізу розділяє події
+                self._finish()
+                event = None
+            if event is None:
+                self._current = [frame, frame, area, x1, y1, x2, y2]
+            else:
+                event[1] = frame
+                event[2] = max(event[2], area)
+                event[3:] = min(event[3], x1), min(event[4], y1), max(event[5], x2), max(event[6], y2)
+        elif analysed and self._current is not None and frame - self._current[1] >= self.gap_frames:
+            self._finish()
+
+    def _finish(self):
+        start, end, area, x1, y1, x2, y2 = self._current
+        self.events.append(MotionEvent(start, end, area, x1, y1, x2 - x1, y2 - y1))
+        self._current = None
+        self.save()
+
+    def close(self):
+        if self._current is not None:
+            self._finish()
+        else:
+            self.save()
+
+    def save(self):
+        data = {"fps": self.fps, "frames": self.frame, "events": [e._asdict() for e in self.events]}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+class EventIndex:
+    """
+    Події одного запису, впорядковані за початком. Пошук події за номером
+    кадру — бісекція по списку початків, O(log n), без декодування відео.
+    """
+
+    def __init__(self, events=(), fps=None, frames=None):
+        self.events = sorted(events, key=lambda e: e.start)
+        self.starts = [e.start for e in self.events]
+        self.fps = fps
+        self.frames = frames
+
+    @classmethod
+    def load(cls, path):
+        """Індекс з файлу; порожній, якщо файлу немає або він пошкоджений."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            events = [MotionEvent(**e) for e in data.get("events", [])]
+        except (OSError, ValueError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"⚠️ Індекс подій {path} не прочитано: {e}")
+            return cls()
+        return cls(events, data.get("fps"), data.get("frames"))
+
+    def __len__(self):
+        return len(self.events)
+
+    def event_at(self, frame):
+        """Подія, що містить кадр frame, або None."""
+        i = bisect_right(self.starts, frame) - 1
+        if i >= 0 and self.events[i].end >= frame:
+            return self.events[i]
+        return None
+
+    def next_event(self, frame):
+        """Перша подія, що починається після кадру frame."""
+        i = bisect_right(self.starts, frame)
+        return self.events[i] if i < len(self.events) else None
+
+    def prev_event(self, frame, margin=0):
+        """
+        Остання подія, що починається раніше ніж frame - margin.
+        margin дозволяє "назад" з початку події перейти до попередньої.
+        """
+        i = bisect_left(self.starts, frame - margin) - 1
+        return self.events[i] if i >= 0 else None
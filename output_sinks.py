@@ -0,0 +1,174 @@
+import os
+import sys
+
+import cv2
+
+_raw_stdout = None
+
+
+def detach_stdout():
+    """
+    Забирає stdout (fd 1) під сирі кадри: print() та дочірні процеси далі
+    пишуть у stderr. Викликати якомога раніше, до першого print().
+    """
+    global _raw_stdout
+    if _raw_stdout is None:
+        sys.stdout.flush()
+        _raw_stdout = os.fdopen(os.dup(1), "wb")
+        os.dup2(2, 1)
+    return _raw_stdout
+
+
+class NullSink:
+    """Відкидає кадри — для вимірювання чистої пропускної здатності."""
+
+    local = False
+
+    def __init__(self):
+        self.frames = 0
+
+    def write(self, frame, delay=1):
+        self.frames += 1
+        return -1
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Записує кадри у відеофайл; VideoWriter створюється за розміром першого кадру."""
+
+    local = False
+
+    def __init__(self, path, fps=30.0, fourcc="mp4v"):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.writer = None
+        self.frames = 0
+
+    def write(self, frame, delay=1):
+        if self.writer is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            h, w = frame.shape[:2]
+            self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (w, h))
+        self.writer.write(frame)
+        self.frames += 1
+        return -1
+
+    def close(self):
+        if self.writer:
+            self.writer.release()
+            self.writer = None
+
+
+class PipeSink:
+    """
+    Сирі BGR кадри у stdout ("-") або FIFO/файл.
+    Розмір кадру друкується в stderr один раз, напр. для
+    `ffmpeg -f rawvideo -pix_fmt bgr24 -s 1024x600 -i -`.
+    При виводі в stdout службовий текст перенаправляється в stderr
+    (див. detach_stdout), щоб не змішуватися з кадрами.
+    """
+
+    local = False
+
+    def __init__(self, target="-"):
+        self.target = target
+        self.stream = None
+        self.frames = 0
+        self.broken = False
+        if target == "-":
+            self.stream = detach_stdout()
+
+    def write(self, frame, delay=1):
+        if self.broken:
+            return -1
+        if self.frames == 0:
+            if self.stream is None:
+                self.stream = open(self.target, "wb")
+            h, w = frame.shape[:2]
+            print(f"PipeSink: rawvideo bgr24 {w}x{h}", file=sys.stderr)
+        try:
+            self.stream.write(memoryview(frame).cast("B") if frame.flags.c_contiguous else frame.tobytes())
+            self.frames += 1
+        except (BrokenPipeError, OSError):
+            print("PipeSink: споживач закрив канал", file=sys.stderr)
+            self.broken = True
+        return -1
+
+    def close(self):
+        if self.stream is None:
+            return
+        try:
+            if self.target == "-":
+                self.stream.flush()
+            else:
+                self.stream.close()
+        except OSError:
+            pass
+        self.stream = None
+
+
+class MjpegSink:
+    """Публікує кадри у FrameBroadcaster (/stream.mjpg на хотспоті)."""
+
+    local = False
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+
+    def write(self, frame, delay=1):
+        self.broadcaster.publish(frame)
+        return -1
+
+    def close(self):
+        pass
+
+
+class DisplaySink:
+    """Повноекранне вікно OpenCV з обробником миші; повертає натиснуту клавішу."""
+
+    local = True
+
+    def __init__(self, window="Camera HUD", fullscreen=True, mouse_callback=None):
+        self.window = window
+        cv2.namedWindow(window)
+        if fullscreen:
+            cv2.setWindowProperty(window, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        if mouse_callback is not None:
+            cv2.setMouseCallback(window, mouse_callback)
+
+    def write(self, frame, delay=1):
+        cv2.imshow(self.window, frame)
+        key = cv2.waitKey(delay)
+        return key & 0xFF if key != -1 else -1
+
+    def close(self):
+        try:
+            cv2.destroyWindow(self.window)
+        except cv2.error:
+            pass
+
+
+def create_sink(spec, broadcaster=None, fps=30.0, mouse_callback=None):
+    """
+    Створює sink за текстовим описом:
+    "null", "file:<шлях>", "pipe:<шлях або ->", "mjpeg", "display".
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "null":
+        return NullSink()
+    if kind == "file":
+        return FileSink(arg or "headless.mp4", fps=fps)
+    if kind == "pipe":
+        return PipeSink(arg or "-")
+    if kind == "mjpeg":
+        if broadcaster is None:
+            raise ValueError("mjpeg sink потребує FrameBroadcaster")
+        return MjpegSink(broadcaster)
+    if kind == "display":
+        return DisplaySink(mouse_callback=mouse_callback)
+    raise ValueError(f"Невідомий sink: {spec}")
@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+
+
+class MetricsRegistry:
+    """
+    Реєстр метрик продуктивності з експортом у текстовому форматі Prometheus.
+
+    Лічильники та gauge оновлюються з будь-якого потоку простим присвоєнням
+    (без локів на гарячому шляху). Системні метрики (CPU%, RSS, температура SoC)
+    збирає фоновий потік раз на `sample_interval` секунд з /proc та /sys.
+    Затримки етапів беруться прямо з гістограм FramePipeline.
+    """
+
+    def __init__(self, prefix="videold", sample_interval=2.0):
+        self.prefix = prefix
+        self.sample_interval = sample_interval
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+        self._gauge_funcs = {}
+        self._counter_funcs = {}
+        self._pipelines = []
+
+        # FPS рахується за вікном між викликами sample
+        self._frames = 0
+        self._fps_last_frames = 0
+        self._fps_last_time = time.monotonic()
+
+        self._cpu_last = None
+        self._running = False
+        self._thread = None
+
+    # --- Реєстрація ---
+    def counter(self, name, help_text="", func=None):
+        """Реєструє лічильник; func — якщо значення вже рахує інший об'єкт."""
+        self._counters.setdefault(name, 0)
+        self._help[name] = help_text
+        if func is not None:
+            self._counter_funcs[name] = func
+
+    def gauge(self, name, help_text="", func=None):
+        """
+        Реєструє gauge. Якщо задано func — значення читається при експорті
+        (напр. довжина черги), і основний цикл нічого не оновлює.
+        """
+        self._gauges.setdefault(name, 0.0)
+        self._help[name] = help_text
+        if func is not None:
+            self._gauge_funcs[name] = func
+
+    def attach_pipeline(self, pipeline):
+        self._pipelines.append(pipeline)
+
+    # --- Оновлення з гарячого шляху ---
+    def inc(self, name, value=1):
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def set(self, name, value):
+        self._gauges[name] = value
+
+    def frame_done(self):
+        """Один показаний кадр основного циклу (у будь-якому режимі)."""
+        self._frames += 1
+
+    # --- Фоновий збір системних метрик ---
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._sample_loop, name="perf-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _sample_loop(self):
+        while self._running:
+            self.sample()
+            time.sleep(self.sample_interval)
+
+    def sample(self):
+        now = time.monotonic()
+        elapsed = now - self._fps_last_time
+        if elapsed > 0:
+            self._gauges["fps"] = (self._frames - self._fps_last_frames) / elapsed
+        self._fps_last_frames = self._frames
+        self._fps_last_time = now
+
+        cpu = self._read_cpu_percent()
+        if cpu is not None:
+            self._gauges["cpu_percent"] = cpu
+        rss = _read_rss_bytes()
+        if rss is not None:
+            self._gauges["rss_bytes"] = rss
+        temp = _read_soc_temp()
+        if temp is not None:
+            self._gauges["soc_temp_celsius"] = temp
+
+    def _read_cpu_percent(self):
+        """CPU% процесу за вікно між викликами (100% = одне ядро)."""
+        t = os.times()
+        busy = t.user + t.system
+        now = time.monotonic()
+        last, self._cpu_last = self._cpu_last, (busy, now)
+        if last is None or now <= last[1]:
+            return None
+        return 100.0 * (busy - last[0]) / (now - last[1])
+
+    # --- Експорт ---
+    def values(self):
+        """Плоский словник усіх метрик (для оверлею та JSON)."""
+        values = dict(self._counters)
+        values.update(self._gauges)
+        for name, func in list(self._counter_funcs.items()) + list(self._gauge_funcs.items()):
+            try:
+                values[name] = func()
+            except Exception:
+                pass
+        return values
+
+    def render_prometheus(self):
+        p = self.prefix
+        lines = []
+        values = self.values()
+        for name in sorted(self._counters):
+            lines.append(f"# HELP {p}_{name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {p}_{name} counter")
+            lines.append(f"{p}_{name} {values[name]}")
+        for name in sorted(set(self._gauges) | set(self._gauge_funcs)):
+            if name not in values:
+                continue
+            lines.append(f"# HELP {p}_{name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {float(values[name]):.6g}")
+
+        for pipeline in self._pipelines:
+            metric = f"{p}_stage_latency_seconds"
+            lines.append(f"# HELP {metric} Frame pipeline stage latency quantiles")
+            lines.append(f"# TYPE {metric} summary")
+            for stage, s in pipeline.stats().items():
+                if not s["count"]:
+                    continue
+                labels = f'pipeline="{pipeline.name}",stage="{stage}"'
+                # Квантилі — за ковзним вікном pipeline (як у summary Prometheus), _sum/_count — накопичені
+                if s["window_count"]:
+                    for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                        lines.append(f'{metric}{{{labels},quantile="{q}"}} {s[key] / 1000.0:.6g}')
+                lines.append(f"{metric}_sum{{{labels}}} {s['mean_ms'] * s['count'] / 1000.0:.6g}")
+                lines.append(f"{metric}_count{{{labels}}} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, handler):
+        """Обробник маршруту /metrics для WifiHotspotServer."""
+        body = self.render_prometheus().encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def overlay_lines(self, pipeline=None, top=4):
+        """Компактні рядки для перф-оверлею HUD."""
+        v = self.values()
+        lines = [
+            f"FPS {v.get('fps', 0):.1f}  CPU {v.get('cpu_percent', 0):.0f}%  "
+            f"RSS {v.get('rss_bytes', 0) / 1048576:.0f}M  T {v.get('soc_temp_celsius', 0):.0f}C",
+            f"drop {v.get('dropped_frames_total', 0)}/{v.get('stream_dropped_frames_total', 0)}  "
+            f"lrf {v.get('lrf_rtt_ms', 0):.0f}ms  rec {v.get('record_ms', 0):.0f}ms  "
+            f"q {v.get('action_queue_depth', 0):.0f}  cl {v.get('stream_clients', 0):.0f}",
+        ]
+        if pipeline is not None:
+            stats = pipeline.stats()
+            frame = stats.pop("frame")
+            lines.append(f"frame p50 {frame['p50_ms']:.1f} p95 {frame['p95_ms']:.1f} ms")
+            slowest = sorted(((s["last_ms"], n) for n, s in stats.items() if s["count"]), reverse=True)[:top]
+            lines.extend(f"{name:<14}{ms:6.1f} ms" for ms, name in slowest)
+        return lines
+
+
+def _read_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _read_soc_temp():
+    try:
+        with open("/sys/class/thermal/thermal_zone0/temp") as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Покадрові метадані записів (sidecar поруч з відео).
+
+Для кожного записаного кадру зберігається запис фіксованого розміру:
+номер кадру, час, зум, камера, дистанція далекоміра та рамки руху.
+Файл — короткий заголовок (JSON з описом dtype) і масив записів NumPy,
+тож читання — це np.memmap без розбору: години запису відкриваються
+миттєво, а запити (час -> кадр, кадри з рухом) — векторні.
+
+    python recording_metadata.py record/rec_20250101_120000.mp4   # зведення
+"""
+
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"VLDMETA1"
+SIDECAR_EXT = ".vmeta"
+HEADER_ALIGN = 64
+MAX_BOXES = 8
+
+# motion: 0 — детекція на кадрі не виконувалась, 1 — виконувалась
+FRAME_DTYPE = np.dtype([
+    ("frame", "<u4"),
+    ("time", "<f8"),
+    ("zoom", "<f4"),
+    ("camera", "u1"),
+    ("motion", "u1"),
+    ("box_count", "u1"),
+    ("lrf_status", "u1"),
+    ("distance", "<f4"),     # NaN — немає вимірювання
+    ("boxes", "<i2", (MAX_BOXES, 4)),   # x, y, w, h у пікселях кадру
+])
+
+
+def sidecar_path(video_path):
+    """Шлях sidecar для відеофайлу: record/rec_X.mp4 -> record/rec_X.vmeta."""
+    return os.path.splitext(video_path)[0] + SIDECAR_EXT
+
+
+class MetadataWriter:
+    """
+    Дописує метадані кадрів у sidecar буферизовано: записи накопичуються
+    в масиві на chunk кадрів і скидаються у файл одним write().
+    """
+
+    def __init__(self, path, fps=None, info=None, chunk=64):
+        """
+        :param path: Шлях sidecar (див. sidecar_path).
+        :param fps: Номінальна частота кадрів відео.
+        :param info: Додаткові поля заголовка (dict, JSON).
+        :param chunk: Кадрів у буфері до запису на диск.
+        """
+        self.path = path
+        self.count = 0
+        self._chunk = np.zeros(chunk, FRAME_DTYPE)
+        self._pending = 0
+        header = {"dtype": FRAME_DTYPE.descr, "fps": fps, "max_boxes": MAX_BOXES}
+        header.update(info or {})
+        body = json.dumps(header).encode("utf-8")
+        # Записи починаються з вирівняного зсуву — зручно для memmap
+        size = len(MAGIC) + 4 + len(body)
+        body += b" " * (-size % HEADER_ALIGN)
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + struct.pack("<I", len(body)) + body)
+
+    def append(self, timestamp, zoom, camera, distance=None, lrf_status=0, boxes=None, motion=False):
+        """
+        Додає кадр.
+        :param distance: Дистанція, м (None — немає вимірювання).
+        :param boxes: Рамки руху [(x, y, w, h), ...]; зберігаються перші MAX_BOXES.
+        :param motion: Чи виконувалась детекція руху на цьому кадрі.
+        """
+        row = self._chunk[self._pending]
+        row["frame"] = self.count
+        row["time"] = timestamp
+        row["zoom"] = zoom
+        row["camera"] = camera
+        row["motion"] = motion
+        row["lrf_status"] = lrf_status
+        row["distance"] = np.nan if distance is None else distance
+        count = 0
+        if boxes:
+            count = min(len(boxes), MAX_BOXES)
+            row["boxes"][:count] = boxes[:count]
+        row["boxes"][count:] = 0
+        row["box_count"] = count
+        self.count += 1
+        self._pending += 1
+        if self._pending == len(self._chunk):
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._file.write(self._chunk[:self._pending].tobytes())
+            self._pending = 0
+        self._file.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+
+class MetadataReader:
+    """
+    Sidecar, відображений у пам'ять. records — структурований масив FRAME_DTYPE;
+    недописаний хвіст (обрив запису) відкидається.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: не є файлом метаданих запису")
+            (length,) = struct.unpack("<I", f.read(4))
+            self.header = json.loads(f.read(length).decode("utf-8"))
+        offset = len(MAGIC) + 4 + length
+        dtype = np.dtype([tuple(field) if len(field) == 2 else (field[0], field[1], tuple(field[2]))
+                          for field in self.header["dtype"]])
+        count = (os.path.getsize(path) - offset) // dtype.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def fps(self):
+        return self.header.get("fps")
+
+    def frame_at(self, timestamp):
+        """Номер кадру, записаного в момент timestamp (або найближчого після)."""
+        return int(min(np.searchsorted(self.records["time"], timestamp), len(self.records) - 1))
+
+    def motion_frames(self):
+        """Номери кадрів, на яких знайдено рух."""
+        return np.flatnonzero(self.records["box_count"])
+
+    def boxes(self, frame):
+        """Рамки руху кадру frame як список (x, y, w, h)."""
+        row = self.records[frame]
+        return [tuple(b) for b in row["boxes"][:row["box_count"]].tolist()]
+
+    def distances(self):
+        """(час, дистанція) кадрів із вимірюванням."""
+        valid = ~np.isnan(self.records["distance"])
+        return self.records["time"][valid], self.records["distance"][valid]
+
+    def close(self):
+        mm = getattr(self.records, "_mmap", None)
+        self.records = None
+        if mm is not None:
+            mm.close()
+
+
+def summary(path):
+    reader = MetadataReader(path)
+    records = reader.records
+    lines = [f"{path}: {len(reader)} кадрів, fps {reader.fps}"]
+    if len(reader):
+        duration = records["time"][-1] - records["time"][0]
+        _, distances = reader.distances()
+        lines.append(f"  тривалість {duration:.1f} с, камери {sorted(set(records['camera'].tolist()))}, "
+                     f"зум {records['zoom'].min():.2f}-{records['zoom'].max():.2f}")
+        lines.append(f"  кадрів з рухом: {len(reader.motion_frames())}, вимірювань дистанції: {len(distances)}"
+                     + (f" ({distances.min():.1f}-{distances.max():.1f} м)" if len(distances) else ""))
+    reader.close()
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Зведення метаданих запису")
+    parser.add_argument("paths", nargs="+", help="відео (.mp4) або sidecar (.vmeta)")
+    args = parser.parse_args(argv)
+    for path in args.paths:
+        print(summary(path if path.endswith(SIDECAR_EXT) else sidecar_path(path)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+import math
+import os
+import tempfile
+import unittest
+
+from recording_metadata import FRAME_DTYPE, HEADER_ALIGN, MAX_BOXES, MetadataReader, MetadataWriter
+
+
+class MetadataRoundTripTest(unittest.TestCase):
+    """Формат .vmeta читається з уже записаних файлів — зміна розкладки має ламати цей тест."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "rec.vmeta")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_record_layout(self):
+        self.assertEqual(FRAME_DTYPE.itemsize, 88)
+
+    def test_round_trip(self):
+        boxes = [(i, i + 1, 10 + i, 20 + i) for i in range(MAX_BOXES + 2)]
+        # Більше кадрів, ніж chunk — частина скидається під час append, решта в close()
+        writer = MetadataWriter(self.path, fps=25.0, info={"camera_label": "CSI"}, chunk=4)
+        for i in range(10):
+            writer.append(100.0 + i * 0.04, zoom=1.0 + i / 10, camera=i % 2,
+                          distance=None if i % 3 else 50.5 + i, lrf_status=i % 4,
+                          boxes=boxes[:i], motion=i % 2 == 0)
+        writer.close()
+
+        reader = MetadataReader(self.path)
+        try:
+            self.assertEqual(len(reader), 10)
+            self.assertEqual(reader.fps, 25.0)
+            self.assertEqual(reader.header["camera_label"], "CSI")
+            records = reader.records
+            self.assertEqual(records["frame"].tolist(), list(range(10)))
+            self.assertAlmostEqual(float(records["time"][7]), 100.28)
+            self.assertAlmostEqual(float(records["zoom"][5]), 1.5, places=6)
+            self.assertEqual(records["camera"].tolist(), [i % 2 for i in range(10)])
+            self.assertEqual(records["lrf_status"].tolist(), [i % 4 for i in range(10)])
+            self.assertEqual(records["motion"].tolist(), [int(i % 2 == 0) for i in range(10)])
+            self.assertEqual(reader.boxes(3), boxes[:3])
+            self.assertEqual(reader.boxes(9), boxes[:MAX_BOXES])
+            self.assertEqual(reader.motion_frames().tolist(), list(range(1, 10)))
+            _, distances = reader.distances()
+            self.assertEqual(distances.tolist(), [50.5, 53.5, 56.5, 59.5])
+            self.assertTrue(math.isnan(float(records["distance"][1])))
+            self.assertEqual(reader.frame_at(100.1), 3)
+        finally:
+            reader.close()
+
+    def test_records_aligned_and_partial_tail_dropped(self):
+        writer = MetadataWriter(self.path, fps=30.0)
+        for i in range(3):
+            writer.append(float(i), zoom=1.0, camera=0)
+        writer.close()
+        size = os.path.getsize(self.path)
+        self.assertEqual((size - 3 * FRAME_DTYPE.itemsize) % HEADER_ALIGN, 0)
+
+        # Обрив запису посеред кадру: недописаний хвіст відкидається
+        with open(self.path, "ab") as f:
+            f.write(b"\0" * (FRAME_DTYPE.itemsize // 2))
+        reader = MetadataReader(self.path)
+        try:
+            self.assertEqual(len(reader), 3)
+            self.assertEqual(reader.records["time"].tolist(), [0.0, 1.0, 2.0])
+        finally:
+            reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+
+class RemoteControl:
+    """
+    Віддалене керування HUD через HTTP сервер хотспоту.
+
+    - POST /api/action  {"action": "zoom_in"} — ставить дію в чергу;
+      основний цикл забирає її через poll_actions() і викликає button_callback,
+      тож стан змінюється лише з потоку рендерингу.
+    - GET /api/state    — поточний знімок стану (JSON).
+    - GET /api/events   — Server-Sent Events: стан пушиться лише при зміні.
+    """
+
+    def __init__(self, actions, max_pending=32, history=64, heartbeat=15.0):
+        """
+        :param actions: Перелік дозволених дій (назви кнопок HUD та службові дії).
+        :param max_pending: Максимальна кількість дій у черзі; зайві відкидаються.
+        :param history: Кількість подій, що зберігаються для клієнтів, які відстали.
+        :param heartbeat: Інтервал (с) keep-alive коментарів для SSE клієнтів.
+        """
+        self.actions = set(actions)
+        self.heartbeat = heartbeat
+        self._actions = queue.Queue(maxsize=max_pending)
+
+        self._cond = threading.Condition()
+        self._state = {}
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._running = True
+
+    def attach(self, server):
+        """Реєструє маршрути на WifiHotspotServer."""
+        server.add_route("/api/action", self.serve_action, method="POST")
+        server.add_route("/api/state", self.serve_state)
+        server.add_route("/api/events", self.serve_events)
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def pending_count(self):
+        return self._actions.qsize()
+
+    # --- Сторона основного циклу ---
+    def poll_actions(self):
+        """Повертає список (action, params), що надійшли з моменту останнього виклику."""
+        pending = []
+        while True:
+            try:
+                pending.append(self._actions.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def update_state(self, **state):
+        """
+        Оновлює стан. Подія надсилається клієнтам лише для ключів, що змінилися,
+        тому виклик на кожному кадрі коштує одне порівняння словників.
+        """
+        changed = {k: v for k, v in state.items() if self._state.get(k, _MISSING) != v}
+        if not changed:
+            return
+        with self._cond:
+            self._state.update(changed)
+            self._push("state", changed)
+
+    def emit(self, event, data=None):
+        """Надсилає клієнтам разову подію (напр. "detection" чи "message")."""
+        with self._cond:
+            self._push(event, data or {})
+
+    def _push(self, event, data):
+        self._seq += 1
+        self._events.append((self._seq, event, json.dumps(data, ensure_ascii=False)))
+        self._cond.notify_all()
+
+    # --- HTTP ---
+    def _send_json(self, handler, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        handler.send_response(code)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def serve_action(self, handler):
+        try:
+            length = int(handler.headers.get("Content-Length", 0))
+            if length <= 0 or length > 4096:
+                raise ValueError("bad length")
+            request = json.loads(handler.rfile.read(length))
+            action = request.get("action")
+        except (ValueError, AttributeError):
+            self._send_json(handler, 400, {"error": "invalid JSON"})
+            return
+
+        if action not in self.actions:
+            self._send_json(handler, 400, {"error": f"unknown action: {action}"})
+            return
+        params = {k: v for k, v in request.items() if k != "action"}
+        try:
+            self._actions.put_nowait((action, params))
+        except queue.Full:
+            self._send_json(handler, 429, {"error": "too many pending actions"})
+            return
+        self._send_json(handler, 202, {"queued": action})
+
+    def serve_state(self, handler):
+        with self._cond:
+            snapshot = dict(self._state)
+        self._send_json(handler, 200, snapshot)
+
+    def serve_events(self, handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        handler.connection.settimeout(5.0)
+
+        def write(seq, event, data):
+            handler.wfile.write(f"id: {seq}\nevent: {event}\ndata: {data}\n\n".encode("utf-8"))
+
+        try:
+            # Новий клієнт спочатку отримує повний знімок
+            with self._cond:
+                last_seq = self._seq
+                snapshot = json.dumps(self._state, ensure_ascii=False)
+            write(last_seq, "state", snapshot)
+            handler.wfile.flush()
+
+            last_sent = time.monotonic()
+            while self._running:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != last_seq or not self._running, self.heartbeat)
+                    oldest = self._events[0][0] if self._events else self._seq + 1
+                    if last_seq + 1 < oldest:
+                        # Клієнт відстав більше, ніж зберігає історія — шлемо знімок
+                        pending = [(self._seq, "state", json.dumps(self._state, ensure_ascii=False))]
+                    else:
+                        pending = [e for e in self._events if e[0] > last_seq]
+                    last_seq = self._seq
+
+                if pending:
+                    for seq, event, data in pending:
+                        write(seq, event, data)
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= self.heartbeat:
+                    handler.wfile.write(b": keep-alive\n\n")
+                    last_sent = time.monotonic()
+                handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, TimeoutError, OSError):
+            pass
+
+
+_MISSING = object()
@@ -0,0 +1,8 @@
+from simulator import gpio
+from simulator.fake_lrf import FakeRangefinder, make_profile, build_response
+from simulator.camera import SyntheticClip, SyntheticCamera, LoopedFileCamera, open_sim_source
+
+# Симулятор апаратури для запуску та навантажувального тестування без Raspberry Pi:
+#   - gpio.install()        — no-op RPi.GPIO у sys.modules;
+#   - FakeRangefinder       — далекомір 0x55AA на псевдотерміналі;
+#   - sim:// джерела        — синтетичні камери та відеофайли по колу для device_list.
@@ -0,0 +1,165 @@
+import time
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+
+class SyntheticClip:
+    """
+    Детермінований кліп: шумний градієнтний фон і кілька яскравих об'єктів,
+    що рухаються (схоже і на звичайну, і на теплову камеру).
+    """
+
+    def __init__(self, width, height, seed=1234, objects=3):
+        self.width = width
+        self.height = height
+        rng = np.random.default_rng(seed)
+        gradient = np.linspace(40, 110, width, dtype=np.float32)
+        background = np.repeat(gradient[None, :], height, axis=0)
+        background += rng.normal(0, 6, (height, width)).astype(np.float32)
+        self.background = cv2.cvtColor(np.clip(background, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+        # Шум сенсора: невеликий набір кадрів шуму по колу
+        self.noise = [cv2.cvtColor(rng.integers(0, 12, (height, width), dtype=np.uint8), cv2.COLOR_GRAY2BGR)
+                      for _ in range(4)]
+        self.objects = [
+            (rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9), rng.uniform(-0.01, 0.01), rng.uniform(-0.006, 0.006),
+             int(rng.integers(8, 30) * width / 640))
+            for _ in range(objects)
+        ]
+
+    def read_into(self, index, out):
+        np.copyto(out, self.background)
+        cv2.add(out, self.noise[index % len(self.noise)], dst=out)
+        for x, y, vx, vy, r in self.objects:
+            px = int(((x + vx * index) % 1.0) * self.width)
+            py = int(((y + vy * index) % 1.0) * self.height)
+            cv2.circle(out, (px, py), r, (235, 235, 235), -1)
+
+
+class _PacedSource:
+    """Спільна частина симульованих джерел: темп кадрів та інтерфейс cv2.VideoCapture."""
+
+    def __init__(self, width, height, fps):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.index = 0
+        self._opened = True
+        self._next_time = time.monotonic()
+
+    def isOpened(self):
+        return self._opened
+
+    def _pace(self):
+        """Чекає до моменту наступного кадру, як справжня камера."""
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_time > now:
+            time.sleep(self._next_time - now)
+        else:
+            # Споживач відстав — не намагаємося "наздогнати" пачкою кадрів
+            self._next_time = now
+        self._next_time += 1.0 / self.fps
+
+    # read(image) пише у переданий буфер, як cv2.VideoCapture.read(image)
+    read_accepts_buffer = True
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        self._pace()
+        frame = image
+        if frame is None or frame.shape != (self.height, self.width, 3):
+            frame = np.empty((self.height, self.width, 3), np.uint8)
+        if not self._render(frame):
+            return False, None
+        self.index += 1
+        return True, frame
+
+    def grab(self):
+        if not self._opened:
+            return False
+        self._pace()
+        self.index += 1
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.index)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self._opened = False
+
+
+class SyntheticCamera(_PacedSource):
+    """Синтетична камера з рухомими об'єктами; pattern="thermal" дає відтінки сірого."""
+
+    def __init__(self, width=1024, height=600, fps=30.0, pattern="scene", seed=1234):
+        super().__init__(width, height, fps)
+        self.pattern = pattern
+        self.clip = SyntheticClip(width, height, seed=seed)
+
+    def _render(self, frame):
+        self.clip.read_into(self.index, frame)
+        if self.pattern == "thermal":
+            # Холодний фон, гарячі об'єкти — як у тепловізора
+            cv2.convertScaleAbs(frame, dst=frame, alpha=1.2, beta=-60)
+        return True
+
+
+class LoopedFileCamera(_PacedSource):
+    """Відеофайл по колу в темпі камери (а не з максимальною швидкістю декодування)."""
+
+    def __init__(self, path, width=1024, height=600, fps=None):
+        self.cap = cv2.VideoCapture(path)
+        file_fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0
+        super().__init__(width, height, fps or file_fps or 30.0)
+        self.path = path
+        self._opened = self.cap.isOpened()
+
+    def _render(self, frame):
+        ret, src = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, src = self.cap.read()
+            if not ret:
+                return False
+        cv2.resize(src, (self.width, self.height), dst=frame)
+        return True
+
+    def release(self):
+        super().release()
+        self.cap.release()
+
+
+def open_sim_source(url, width=1024, height=600, fps=30.0):
+    """
+    Відкриває симульоване джерело за адресою з device_list / hls_streams.json:
+        sim://synthetic[?fps=30&seed=1]
+        sim://thermal[?fps=9]
+        sim://file/абсолютний/шлях/кліпу.mp4[?fps=25]
+        sim://file?path=record/кліп.mp4       (відносний шлях)
+    Для файлу без ?fps використовується частота з самого файлу.
+    """
+    parsed = urlparse(url)
+    query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    if parsed.netloc == "file":
+        file_fps = float(query["fps"]) if "fps" in query else None
+        return LoopedFileCamera(query.get("path", parsed.path), width, height, fps=file_fps)
+    fps = float(query.get("fps", fps))
+    if parsed.netloc in ("synthetic", "thermal"):
+        pattern = "thermal" if parsed.netloc == "thermal" else "scene"
+        return SyntheticCamera(width, height, fps=fps, pattern=pattern, seed=int(query.get("seed", 1234)))
+    raise ValueError(f"Невідоме симульоване джерело: {url}")
@@ -0,0 +1,225 @@
+import math
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from simulator import gpio
+
+CMD_SINGLE = 0x88
+CMD_CONTINUOUS = 0x89
+CMD_STOP = 0x8E
+HEADER = b"\x55\xAA"
+STATUS_OK = 0x01
+STATUS_ERROR = 0x00
+
+
+def make_profile(spec):
+    """
+    Профіль відстані: функція t (секунди від старту) -> метри.
+
+    :param spec: callable або рядок:
+                 "constant:150", "ramp:50:1500:20" (від, до, період),
+                 "sine:800:300:10" (середнє, амплітуда, період).
+    """
+    if callable(spec):
+        return spec
+    kind, *args = str(spec).split(":")
+    values = [float(a) for a in args]
+    if kind == "constant":
+        meters = values[0] if values else 150.0
+        return lambda t: meters
+    if kind == "ramp":
+        start, end, period = (values + [50.0, 1500.0, 20.0][len(values):])[:3]
+        return lambda t: start + (end - start) * ((t % period) / period)
+    if kind == "sine":
+        mean, amp, period = (values + [800.0, 300.0, 10.0][len(values):])[:3]
+        return lambda t: mean + amp * math.sin(2 * math.pi * t / period)
+    raise ValueError(f"Невідомий профіль відстані: {spec}")
+
+
+def _checksum(data):
+    return sum(data) & 0xFF
+
+
+def build_response(command, status, meters=0.0):
+    """8-байтова відповідь: заголовок, команда, статус, 0x00, дистанція*10 (BE), CRC без статусу."""
+    raw = max(0, min(0xFFFF, int(round(meters * 10))))
+    response = bytearray(HEADER + bytes([command, status, 0x00, raw >> 8, raw & 0xFF, 0]))
+    response[7] = _checksum(response[2:3] + response[4:7])
+    return bytes(response)
+
+
+class FakeRangefinder:
+    """
+    Програмний далекомір на псевдотерміналі, що розмовляє протоколом 0x55AA.
+
+    Клієнт (ldtest.LRF / ld.LRF) відкриває `port` як звичайний послідовний
+    порт. Підтримуються одиночне (0x88), безперервне (0x89) вимірювання
+    та зупинка (0x8E). Затримку, частку помилок і профіль відстані можна
+    налаштувати, щоб відтворювати таймінги вимірювання без пристрою.
+    """
+
+    def __init__(self, profile="constant:150", latency=0.08, jitter=0.02, error_rate=0.0,
+                 drop_rate=0.0, noise=0.2, continuous_hz=10.0, enable_pin=None, seed=None):
+        """
+        :param profile: Профіль відстані (див. make_profile).
+        :param latency: Середня затримка відповіді, с.
+        :param jitter: Випадкове відхилення затримки (±), с.
+        :param error_rate: Частка відповідей зі статусом помилки.
+        :param drop_rate: Частка команд без відповіді (клієнт чекає до таймауту).
+        :param noise: Шум вимірювання (сигма), м.
+        :param continuous_hz: Частота відповідей у безперервному режимі.
+        :param enable_pin: Якщо задано — відповідає лише при HIGH на цьому піні GPIO-заглушки.
+        """
+        self.profile = make_profile(profile)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.noise = noise
+        self.continuous_hz = continuous_hz
+        self.enable_pin = enable_pin
+        self._rng = random.Random(seed)
+
+        self.commands = 0
+        self.responses = 0
+        self.errors = 0
+        self.dropped = 0
+
+        self._master = None
+        self._slave = None
+        self.port = None
+        self._pending = []      # (час відправки, байти)
+        self._continuous_next = None
+        self._rx = bytearray()
+        self._started = time.monotonic()
+        self._running = False
+        self._thread = None
+
+    # --- Життєвий цикл ---
+    def start(self):
+        """Створює псевдотермінал і запускає потік пристрою. Повертає шлях порту."""
+        if self._running:
+            return self.port
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        tty.setraw(self._master)
+        self.port = os.ttyname(self._slave)
+        self._started = time.monotonic()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="fake-lrf", daemon=True)
+        self._thread.start()
+        print(f"🛰️  Симулятор LRF на {self.port}")
+        return self.port
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    @property
+    def powered(self):
+        return self.enable_pin is None or gpio.input(self.enable_pin) == gpio.HIGH
+
+    @property
+    def continuous(self):
+        return self._continuous_next is not None
+
+    def stats(self):
+        return {"commands": self.commands, "responses": self.responses,
+                "errors": self.errors, "dropped": self.dropped, "continuous": self.continuous}
+
+    # --- Потік пристрою ---
+    def _run(self):
+        while self._running:
+            now = time.monotonic()
+            deadlines = [t for t, _ in self._pending]
+            if self._continuous_next is not None:
+                deadlines.append(self._continuous_next)
+            timeout = max(0.0, min(deadlines) - now) if deadlines else 0.2
+            try:
+                readable, _, _ = select.select([self._master], [], [], min(timeout, 0.2))
+            except (OSError, ValueError):
+                break
+            if readable:
+                try:
+                    self._rx += os.read(self._master, 256)
+                except OSError:
+                    break
+                self._parse()
+            self._flush(time.monotonic())
+
+    def _parse(self):
+        """Виділяє з потоку 8-байтові команди 55 AA cmd d1 d2 d3 d4 crc."""
+        while len(self._rx) >= 8:
+            start = self._rx.find(HEADER)
+            if start < 0:
+                del self._rx[:-1]
+                return
+            if start:
+                del self._rx[:start]
+                continue
+            if len(self._rx) < 8:
+                return
+            frame = bytes(self._rx[:8])
+            del self._rx[:8]
+            if _checksum(frame[2:7]) != frame[7]:
+                continue  # справжній модуль мовчить на биту команду
+            self._handle(frame[2])
+
+    def _handle(self, command):
+        self.commands += 1
+        if not self.powered:
+            return
+        if command == CMD_SINGLE:
+            self._schedule(self._measure(CMD_SINGLE))
+        elif command == CMD_CONTINUOUS:
+            # Перша відповідь з кодом 0x89 одночасно є підтвердженням запуску
+            self._continuous_next = time.monotonic() + self._delay()
+        elif command == CMD_STOP:
+            self._continuous_next = None
+            self._schedule(build_response(CMD_STOP, STATUS_OK))
+
+    def _delay(self):
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _schedule(self, response):
+        if self._rng.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        self._pending.append((time.monotonic() + self._delay(), response))
+
+    def _measure(self, command):
+        if self._rng.random() < self.error_rate:
+            self.errors += 1
+            return build_response(command, STATUS_ERROR)
+        meters = self.profile(time.monotonic() - self._started) + self._rng.gauss(0.0, self.noise)
+        return build_response(command, STATUS_OK, meters)
+
+    def _flush(self, now):
+        if self._continuous_next is not None and now >= self._continuous_next:
+            if self.powered:
+                self._pending.append((now, self._measure(CMD_CONTINUOUS)))
+            self._continuous_next = now + 1.0 / self.continuous_hz
+        due = [r for t, r in self._pending if t <= now]
+        if not due:
+            return
+        self._pending = [(t, r) for t, r in self._pending if t > now]
+        for response in due:
+            try:
+                os.write(self._master, response)
+                self.responses += 1
+            except OSError:
+                self._running = False
+                return
@@ -0,0 +1,66 @@
+import sys
+import types
+
+# No-op заміна RPi.GPIO для запуску поза Raspberry Pi.
+# Стан пінів зберігається в пам'яті, тож симулятор далекоміра може
+# перевірити, чи увімкнене живлення модуля (пін UART_ON).
+
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+
+_mode = None
+_pins = {}
+
+
+def setmode(mode):
+    global _mode
+    _mode = mode
+
+
+def getmode():
+    return _mode
+
+
+def setwarnings(flag):
+    pass
+
+
+def setup(channel, direction, pull_up_down=PUD_OFF, initial=LOW):
+    for pin in (channel if isinstance(channel, (list, tuple)) else [channel]):
+        _pins[pin] = initial if direction == OUT else (HIGH if pull_up_down == PUD_UP else LOW)
+
+
+def output(channel, state):
+    for pin in (channel if isinstance(channel, (list, tuple)) else [channel]):
+        _pins[pin] = HIGH if state else LOW
+
+
+def input(channel):
+    return _pins.get(channel, LOW)
+
+
+def cleanup(channel=None):
+    if channel is None:
+        _pins.clear()
+    else:
+        _pins.pop(channel, None)
+
+
+def install():
+    """Реєструє модуль як RPi.GPIO, щоб `import RPi.GPIO as GPIO` брав заглушку."""
+    module = sys.modules[__name__]
+    package = sys.modules.get("RPi")
+    if package is None:
+        package = types.ModuleType("RPi")
+        package.__path__ = []
+        sys.modules["RPi"] = package
+    package.GPIO = module
+    sys.modules["RPi.GPIO"] = module
+    return module
@@ -0,0 +1,253 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+try:
+    from turbojpeg import TurboJPEG
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+# Теги EXIF (TIFF 6.0 / Exif 2.3)
+_ASCII, _LONG = 2, 4
+_TAG_IMAGE_DESCRIPTION = 0x010E
+_TAG_SOFTWARE = 0x0131
+_TAG_DATETIME = 0x0132
+_TAG_EXIF_IFD = 0x8769
+_TAG_DATETIME_ORIGINAL = 0x9003
+_TAG_SUBSEC_ORIGINAL = 0x9291
+
+
+def _ifd(entries, start):
+    """
+    Один IFD у little-endian TIFF.
+    :param entries: [(тег, тип, кількість, байти значення)], впорядковані за тегом.
+    :param start: Зсув IFD від початку TIFF заголовка.
+    """
+    data_offset = start + 2 + 12 * len(entries) + 4
+    head = struct.pack("<H", len(entries))
+    extra = b""
+    for tag, kind, count, data in entries:
+        if len(data) <= 4:
+            head += struct.pack("<HHI", tag, kind, count) + data.ljust(4, b"\0")
+        else:
+            head += struct.pack("<HHII", tag, kind, count, data_offset + len(extra))
+            extra += data + b"\0" * (len(data) % 2)
+    return head + struct.pack("<I", 0) + extra
+
+
+def exif_segment(description, timestamp, software="VideoLd"):
+    """
+    APP1 сегмент EXIF: ImageDescription (метадані кадру JSON), Software,
+    DateTime, DateTimeOriginal та SubSecTimeOriginal (мілісекунди — кадри серії
+    в межах однієї секунди). Читається exiftool, PIL getexif() тощо.
+    """
+    def ascii_entry(tag, text):
+        data = text.encode("ascii", "replace") + b"\0"
+        return tag, _ASCII, len(data), data
+
+    stamp = time.strftime("%Y:%m:%d %H:%M:%S", time.localtime(timestamp))
+    exif_entries = [ascii_entry(_TAG_DATETIME_ORIGINAL, stamp),
+                    ascii_entry(_TAG_SUBSEC_ORIGINAL, f"{int(timestamp * 1000) % 1000:03d}")]
+
+    def ifd0(exif_offset):
+        return _ifd([ascii_entry(_TAG_IMAGE_DESCRIPTION, description),
+                     ascii_entry(_TAG_SOFTWARE, software),
+                     ascii_entry(_TAG_DATETIME, stamp),
+                     (_TAG_EXIF_IFD, _LONG, 1, struct.pack("<I", exif_offset))], 8)
+
+    # Розмір IFD0 не залежить від значення вказівника на Exif IFD
+    exif_offset = 8 + len(ifd0(0))
+    tiff = b"II*\0" + struct.pack("<I", 8) + ifd0(exif_offset) + _ifd(exif_entries, exif_offset)
+    payload = b"Exif\0\0" + tiff
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+class SnapshotWriter:
+    """
+    Знімки та серії знімків з кодуванням JPEG у фоні.
+
+    request() лише замовляє кадри; наступні кадри потоку рендерингу копіюються
+    в заздалегідь виділені буфери (capture) і ставляться в чергу. Пул потоків
+    кодує їх (TurboJPEG, якщо встановлено, інакше cv2.imencode — обидва
+    відпускають GIL), додає EXIF і записує файл атомарно (tmp + rename), щоб
+    хотспот ніколи не віддав недописаний знімок. Якщо вільних буферів немає,
+    кадр пропускається — рендеринг ніколи не чекає на кодування чи диск.
+    """
+
+    def __init__(self, directory, workers=2, quality=92, max_pending=12):
+        """
+        :param directory: Тека знімків.
+        :param workers: Кількість потоків кодування.
+        :param quality: Якість JPEG (0-100).
+        :param max_pending: Скільки кадрів може чекати кодування (буфери кадрів виділяються один раз).
+        """
+        self.directory = directory
+        self.workers = workers
+        self.quality = quality
+        self.max_pending = max_pending
+        self.saved = 0
+        self.dropped = 0
+        self.last_ms = 0.0
+        self._encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        self._turbo = None
+        if TURBOJPEG_AVAILABLE:
+            try:
+                self._turbo = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                print(f"⚠️ TurboJPEG недоступний, кодування через OpenCV: {e}")
+        self.backend = "turbojpeg" if self._turbo else "opencv"
+
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._free = []             # вільні буфери кадрів
+        self._allocated = 0
+        self._remaining = 0         # кадрів поточного замовлення, ще не захоплених
+        self._group = None          # [ім'я, кадрів, захоплено, незавершено, збережено, перший файл]
+        self._results = []          # (ім'я, збережено, замовлено, перший файл) для poll()
+        self._threads = []
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"snapshot-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=3.0):
+        """Дописує чергу (не довше timeout) і зупиняє потоки."""
+        deadline = time.monotonic() + timeout
+        self._running = False
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    # --- Потік рендерингу ---
+    @property
+    def pending(self):
+        """Кадрів у черзі кодування."""
+        return self._jobs.qsize()
+
+    @property
+    def wants_frame(self):
+        return self._remaining > 0
+
+    def request(self, count=1):
+        """Замовляє знімок (count=1) або серію з count послідовних кадрів. False — попередня ще триває."""
+        if self._remaining or not self._running:
+            return False
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        name = f"snap_{stamp}" if count == 1 else f"burst_{stamp}"
+        with self._lock:
+            self._group = [name, count, 0, count, 0, None]
+        self._remaining = count
+        return True
+
+    def capture(self, frame, meta=None):
+        """
+        Копіює кадр у буфер і ставить у чергу кодування.
+        :param frame: Кадр BGR (буфер може бути перевикористаний одразу після виклику).
+        :param meta: Метадані кадру (dict, JSON) для EXIF ImageDescription.
+        :return: Шлях майбутнього файлу або None, якщо кадр пропущено.
+        """
+        if not self._remaining:
+            return None
+        self._remaining -= 1
+        group = self._group
+        index = group[2]
+        group[2] += 1
+        buf = self._take_buffer(frame.shape)
+        if buf is None:
+            self.dropped += 1
+            self._done(group, None)
+            return None
+        np.copyto(buf, frame)
+        name = group[0] if group[1] == 1 else f"{group[0]}_{index:02d}"
+        path = os.path.join(self.directory, name + ".jpg")
+        meta = dict(meta or {})
+        meta.setdefault("time", time.time())
+        if group[1] > 1:
+            meta.update(burst=group[0], index=index, count=group[1])
+        self._jobs.put((buf, meta, path, group))
+        return path
+
+    def poll(self):
+        """Завершені замовлення: [(ім'я, збережено кадрів, замовлено, перший файл), ...]."""
+        if not self._results:
+            return []
+        with self._lock:
+            results, self._results = self._results, []
+        return results
+
+    def _take_buffer(self, shape):
+        with self._lock:
+            for i, buf in enumerate(self._free):
+                if buf.shape == shape:
+                    return self._free.pop(i)
+            if self._allocated < self.max_pending:
+                self._allocated += 1
+                return np.empty(shape, np.uint8)
+            if self._free:
+                # Змінилась роздільність — старий буфер замінюється новим
+                self._free.pop(0)
+                return np.empty(shape, np.uint8)
+        return None
+
+    def _done(self, group, path):
+        with self._lock:
+            group[3] -= 1
+            if path is not None:
+                self.saved += 1
+                group[4] += 1
+                if group[5] is None or path < group[5]:
+                    group[5] = path
+            if group[3] == 0:
+                self._results.append((group[0], group[4], group[1], group[5]))
+
+    # --- Потоки кодування ---
+    def _encode(self, frame):
+        if self._turbo is not None:
+            return self._turbo.encode(frame, quality=self.quality)
+        ok, buf = cv2.imencode(".jpg", frame, self._encode_params)
+        return buf.tobytes() if ok else None
+
+    def _worker(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            buf, meta, path, group = job
+            start = time.perf_counter()
+            saved = None
+            try:
+                jpeg = self._encode(buf)
+                if jpeg is not None:
+                    description = json.dumps(meta, separators=(",", ":"))
+                    # EXIF одразу після SOI, перед JFIF APP0 кодувальника
+                    jpeg = jpeg[:2] + exif_segment(description, meta["time"]) + jpeg[2:]
+                    tmp = path + ".tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(jpeg)
+                    os.replace(tmp, path)
+                    saved = path
+            except Exception as e:
+                # Будь-яка помилка кодування/EXIF/запису — лише цей кадр; потік і серія живуть далі
+                print(f"⚠️ Знімок {path} не збережено: {e}")
+            finally:
+                with self._lock:
+                    self._free.append(buf)
+            self.last_ms = (time.perf_counter() - start) * 1000.0
+            self._done(group, saved)
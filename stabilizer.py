@@ -0,0 +1,94 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class Stabilizer:
+    """
+    Цифрова стабілізація для великого зуму.
+
+    Глобальний зсув між сусідніми кадрами оцінюється фазовою кореляцією
+    (cv2.phaseCorrelate) на зменшеному сірому кадрі. Накопичена траєкторія
+    згладжується експоненційним середнім, а різниця "траєкторія - згладжена"
+    повертається як зсув вікна зуму: кадр не перетворюється окремо, стабілізація
+    — це лише інше положення crop, який зум і так робить.
+
+    Компенсується тільки зсув: поворот потребував би warpAffine усього кадру.
+    """
+
+    def __init__(self, scale=0.25, smoothing=0.9, min_response=0.05, budget_ms=3.0, min_scale=0.0625):
+        """
+        :param scale: Коефіцієнт зменшення кадру для оцінки зсуву.
+        :param smoothing: Вага попереднього значення згладженої траєкторії (0..1);
+                          більше — сильніше гасить тремтіння, повільніше йде за панорамуванням.
+        :param min_response: Мінімальна якість піку кореляції; нижче — зсув не враховується
+                             (безтекстурна сцена, зміна сцени).
+        :param budget_ms: Бюджет часу на кадр; при перевищенні масштаб аналізу зменшується вдвічі.
+        :param min_scale: Найменший масштаб аналізу.
+        """
+        self.scale = scale
+        self.smoothing = smoothing
+        self.min_response = min_response
+        self.budget_ms = budget_ms
+        self.min_scale = min_scale
+        self.last_ms = 0.0
+        self.response = 0.0
+        self._window = None
+        self._small = None
+        self._gray = None
+        self._prev = None
+        self._cur = None
+        self.reset()
+
+    def reset(self):
+        """Скидає траєкторію (зміна джерела, пропущені кадри)."""
+        self._prev = None
+        self.trajectory = np.zeros(2)
+        self.smoothed = np.zeros(2)
+        self.offset = (0.0, 0.0)
+
+    def _prepare(self, size, channels):
+        """Буфери аналізу та вікно Ханна під розмір size (w, h)."""
+        w, h = size
+        if self._window is None or self._window.shape != (h, w):
+            self._window = cv2.createHanningWindow((w, h), cv2.CV_32F)
+            self._gray = np.empty((h, w), np.uint8)
+            self._prev = None
+            self._cur = np.empty((h, w), np.float32)
+        if self._small is None or self._small.shape[:2] != (h, w) or self._small.shape[2:] != channels:
+            self._small = np.empty((h, w) + channels, np.uint8)
+
+    def update(self, frame):
+        """
+        Оцінює зсув відносно попереднього кадру.
+        :param frame: Повний кадр BGR (до зуму).
+        :return: Зсув (dx, dy) вікна зуму в пікселях frame.
+        """
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        size = (max(16, int(width * self.scale)), max(16, int(height * self.scale)))
+        self._prepare(size, frame.shape[2:])
+
+        small = cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._gray) if small.ndim == 3 else small
+        self._cur[...] = gray
+
+        if self._prev is None:
+            self._prev = np.empty_like(self._cur)
+        else:
+            (dx, dy), self.response = cv2.phaseCorrelate(self._prev, self._cur, self._window)
+            if self.response >= self.min_response and abs(dx) < size[0] / 4 and abs(dy) < size[1] / 4:
+                self.trajectory += (dx * width / size[0], dy * height / size[1])
+            else:
+                # Втрачено зв'язок між кадрами — починаємо траєкторію з поточного положення
+                self.smoothed[:] = self.trajectory
+            self.smoothed = self.smoothing * self.smoothed + (1.0 - self.smoothing) * self.trajectory
+            self.offset = tuple(self.trajectory - self.smoothed)
+            self.last_ms = (time.perf_counter() - start) * 1000.0
+            if self.last_ms > self.budget_ms and self.scale / 2 >= self.min_scale:
+                # Не вкладаємось у бюджет — аналізуємо вдвічі менший кадр
+                self.scale /= 2
+                self._window = None
+        self._prev, self._cur = self._cur, self._prev
+        return self.offset
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+
+
+def _process_age():
+    """Скільки секунд тому стартував процес (з /proc), щоб врахувати імпорти; 0 якщо невідомо."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupTimeline:
+    """
+    Часова шкала запуску: позначки від старту процесу до першого кадру
+    та завершення фонової ініціалізації.
+    """
+
+    def __init__(self):
+        self.origin = time.monotonic() - _process_age()
+        self.events = []
+        self._lock = threading.Lock()
+        self.first_frame_ms = None
+
+    def elapsed_ms(self):
+        return (time.monotonic() - self.origin) * 1000.0
+
+    def mark(self, name):
+        """Додає позначку; безпечно викликати з будь-якого потоку."""
+        ms = self.elapsed_ms()
+        with self._lock:
+            self.events.append((ms, name, threading.current_thread().name))
+        return ms
+
+    def report(self):
+        with self._lock:
+            events = sorted(self.events)
+        lines = ["--- startup timeline ---"]
+        lines.extend(f"{ms:8.1f} ms  {name:<28}[{thread}]" for ms, name, thread in events)
+        return "\n".join(lines)
+
+    def as_dict(self):
+        with self._lock:
+            return {"first_frame_ms": self.first_frame_ms,
+                    "events": [{"ms": round(ms, 1), "name": name, "thread": thread}
+                               for ms, name, thread in sorted(self.events)]}
+
+
+class StartupTasks:
+    """
+    Відкладена ініціалізація підсистем.
+
+    - background(): повільна ініціалізація (LRF, аудіо, шрифти) у фоновому
+      потоці; результат передається в on_ready вже в основному потоці через
+      poll(), тож глобальний стан змінюється лише з потоку рендерингу.
+    - after_first_frame(): те, що не потрібне для першого кадру (HTTP сервер,
+      перевірка потоків, warm standby), виконується одразу після його показу.
+    """
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self._lock = threading.Lock()
+        self._done = []          # (name, result, error, on_ready)
+        self._pending = {}       # name -> Thread
+        self._deferred = []      # (name, func)
+        self.waiting_first_frame = True
+        self.reported = False
+
+    def background(self, name, func, on_ready=None):
+        """Запускає func() у фоновому потоці."""
+        def run():
+            self.timeline.mark(f"{name} start")
+            result, error = None, None
+            try:
+                result = func()
+            except Exception as e:
+                error = e
+            self.timeline.mark(f"{name} {'failed' if error else 'ready'}")
+            with self._lock:
+                self._pending.pop(name, None)
+                self._done.append((name, result, error, on_ready))
+
+        thread = threading.Thread(target=run, name=f"init-{name}", daemon=True)
+        with self._lock:
+            self._pending[name] = thread
+        thread.start()
+        return thread
+
+    def after_first_frame(self, name, func):
+        """Відкладає func() до показу першого кадру (або виконує одразу, якщо він уже був)."""
+        if not self.waiting_first_frame:
+            self._run_deferred(name, func)
+        else:
+            self._deferred.append((name, func))
+
+    @property
+    def pending(self):
+        with self._lock:
+            return list(self._pending)
+
+    def poll(self):
+        """Застосовує результати завершених фонових задач. Викликається з основного циклу."""
+        if not self._done:
+            return
+        with self._lock:
+            done, self._done = self._done, []
+        for name, result, error, on_ready in done:
+            if error is not None:
+                print(f"⚠️  Ініціалізація '{name}' не вдалася: {error}")
+                continue
+            if on_ready is not None:
+                on_ready(result)
+        self._maybe_report()
+
+    def _maybe_report(self):
+        """Друкує часову шкалу один раз, коли показано перший кадр і все ініціалізовано."""
+        if self.reported or self.waiting_first_frame or self._pending or self._done:
+            return
+        self.reported = True
+        print(self.timeline.report())
+
+    def first_frame(self):
+        """Позначає перший показаний кадр і запускає відкладену ініціалізацію."""
+        if not self.waiting_first_frame:
+            return
+        self.waiting_first_frame = False
+        self.timeline.first_frame_ms = self.timeline.mark("first frame")
+        print(f"⏱️  Перший кадр через {self.timeline.first_frame_ms:.0f} мс від старту процесу")
+        deferred, self._deferred = self._deferred, []
+        for name, func in deferred:
+            self._run_deferred(name, func)
+        self._maybe_report()
+
+    def wait(self, timeout=5.0):
+        """Чекає завершення фонових задач (напр. перед виходом) і застосовує результати."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            threads = list(self._pending.values())
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self.poll()
+
+    def _run_deferred(self, name, func):
+        try:
+            func()
+        except Exception as e:
+            print(f"⚠️  Відкладена ініціалізація '{name}' не вдалася: {e}")
+        self.timeline.mark(name)
@@ -0,0 +1,275 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple, deque
+
+from motion_events import EVENTS_EXT
+from recording_metadata import SIDECAR_EXT
+
+VIDEO_EXTS = (".mp4", ".avi", ".mkv")
+
+# Запис на диску: відео та його супутні файли (sidecar, індекс подій) з однаковою основою імені
+Clip = namedtuple("Clip", "stem video files size mtime motion")
+
+StorageStatus = namedtuple("StorageStatus", "used free total clips")
+
+
+def _stem(name):
+    if name.endswith(EVENTS_EXT):
+        return name[:-len(EVENTS_EXT)]
+    stem, ext = os.path.splitext(name)
+    return stem if ext in VIDEO_EXTS or ext == SIDECAR_EXT else None
+
+
+class StorageManager:
+    """
+    Квота та вільне місце для теки записів.
+
+    Фоновий потік раз на check_interval (або одразу після wake()) рахує розмір
+    записів і вільне місце на розділі. Якщо перевищено quota_mb або вільного
+    місця менше за min_free_mb, видаляються найстаріші записи: спершу без руху,
+    записи з подіями руху (непорожній .events.json) — останніми. Записи, які
+    зараз пишуться або відтворюються (protect()), не чіпаються.
+
+    Видалення виконує той самий потік з обмеженням швидкості: великі файли
+    спершу поступово вкорочуються truncate(), щоб звільнення блоків на SD-карті
+    не займало диск надовго одним unlink. Потік рендерингу лише ставить файли в
+    чергу (delete_async) і забирає результати через poll().
+    """
+
+    def __init__(self, directory, quota_mb=None, min_free_mb=None, critical_free_mb=None,
+                 check_interval=10.0, delete_mb_per_s=32.0, truncate_step_mb=16, protect=None):
+        """
+        :param directory: Тека записів.
+        :param quota_mb: Максимальний сумарний розмір записів, МБ (None — без квоти).
+        :param min_free_mb: Мінімум вільного місця на розділі, МБ (None — не перевіряти).
+        :param critical_free_mb: Поріг, нижче якого запис треба зупинити (поки витіснення не звільнить місце).
+        :param check_interval: Період фонової перевірки, с.
+        :param delete_mb_per_s: Обмеження швидкості звільнення місця, МБ/с.
+        :param truncate_step_mb: Крок поступового вкорочення великих файлів, МБ.
+        :param protect: Функція без аргументів -> шляхи відео, які не можна видаляти.
+        """
+        self.directory = directory
+        self.quota = quota_mb * 1024 * 1024 if quota_mb else None
+        self.min_free = min_free_mb * 1024 * 1024 if min_free_mb else None
+        self.critical_free = critical_free_mb * 1024 * 1024 if critical_free_mb else 0
+        self.check_interval = check_interval
+        self.delete_rate = delete_mb_per_s * 1024 * 1024
+        self.truncate_step = truncate_step_mb * 1024 * 1024
+        self.protect = protect or (lambda: ())
+
+        self.status = None
+        self.critical = False
+        self._exhausted = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._queue = deque()
+        self._pending = set()       # відео, що чекають видалення або видаляються
+        self._results = []          # (причина, кількість, байт) для poll()
+        self._motion_cache = {}     # шлях індексу -> (mtime, є рух)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="storage", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def wake(self):
+        """Позачергова перевірка (наприклад, перед початком запису)."""
+        self._wake.set()
+
+    # --- Інтерфейс для потоку рендерингу ---
+    def delete_async(self, videos):
+        """
+        Ставить відео (імена в теці або шляхи) разом із супутніми файлами в чергу видалення.
+        Повертається одразу; результат — через poll().
+        """
+        paths = [v if os.path.dirname(v) else os.path.join(self.directory, v) for v in videos]
+        with self._lock:
+            paths = [p for p in paths if p not in self._pending]
+            self._pending.update(paths)
+            if paths:
+                self._queue.append(paths)
+        self._wake.set()
+        return len(paths)
+
+    @property
+    def pending(self):
+        """Відео в черзі видалення (разом із тим, що видаляється зараз)."""
+        return len(self._pending)
+
+    def is_pending(self, video):
+        """Чи стоїть відео в черзі видалення (меню його вже не показує)."""
+        path = video if os.path.dirname(video) else os.path.join(self.directory, video)
+        return path in self._pending
+
+    def poll(self):
+        """Завершені видалення з минулого виклику: [(причина, кількість записів, байт), ...]."""
+        if not self._results:
+            return []
+        with self._lock:
+            results, self._results = self._results, []
+        return results
+
+    def can_record(self):
+        """False, якщо вільного місця менше критичного порогу."""
+        disk = self._disk_usage()
+        return disk is None or disk.free >= self.critical_free
+
+    # --- Фоновий потік ---
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+            if not self._running:
+                break
+            while self._queue:
+                with self._lock:
+                    paths = self._queue.popleft()
+                freed = sum(self._remove_clip(p) for p in paths)
+                self._finish(paths, "delete", freed)
+            self._enforce()
+
+    def _enforce(self):
+        clips = self.scan()
+        used = sum(c.size for c in clips)
+        disk = self._disk_usage()
+        free = disk.free if disk else None
+        excess = 0
+        if self.quota is not None:
+            excess = max(excess, used - self.quota)
+        if self.min_free is not None and free is not None:
+            excess = max(excess, self.min_free - free)
+
+        protected = {os.path.abspath(p) for p in self.protect() if p}
+        evicted, freed = [], 0
+        if excess > 0:
+            # Без руху — раніше за будь-який запис з рухом; в межах групи — найстаріші першими
+            for clip in sorted(clips, key=lambda c: (c.motion, c.mtime)):
+                if freed >= excess or not self._running:
+                    break
+                if any(os.path.abspath(f) in protected for f in clip.files):
+                    continue
+                # Як і черга видалення: меню перестає показувати запис ще до unlink
+                video = clip.video or clip.stem
+                with self._lock:
+                    self._pending.add(video)
+                freed += self._remove_files(clip.files)
+                evicted.append(video)
+            if evicted:
+                self._finish(evicted, "evict", freed)
+                print(f"🧹 Витіснено записів: {len(evicted)}, звільнено {freed / 1048576:.0f} МБ")
+                used -= freed
+                disk = self._disk_usage()
+                free = disk.free if disk else None
+        exhausted = excess > freed
+        if exhausted and not self._exhausted:
+            print("⚠️ Місце для записів вичерпано, а витіснити більше нічого")
+        self._exhausted = exhausted
+
+        self.critical = free is not None and free < self.critical_free
+        self.status = StorageStatus(used, free, disk.total if disk else None, len(clips) - len(evicted))
+
+    def _finish(self, paths, reason, freed):
+        with self._lock:
+            self._pending.difference_update(paths)
+            self._results.append((reason, len(paths), freed))
+
+    # --- Диск ---
+    def scan(self):
+        """Записи в теці (згруповані за основою імені) без тих, що в черзі видалення."""
+        groups = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return []
+        for entry in entries:
+            stem = _stem(entry.name)
+            if stem is None or not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            group = groups.setdefault(stem, {"video": None, "files": [], "size": 0, "mtime": st.st_mtime})
+            group["files"].append(entry.path)
+            group["size"] += st.st_size
+            if os.path.splitext(entry.name)[1] in VIDEO_EXTS:
+                group["video"] = entry.path
+                group["mtime"] = st.st_mtime
+
+        clips = []
+        with self._lock:
+            pending = set(self._pending)
+        for stem, g in groups.items():
+            if g["video"] in pending:
+                continue
+            motion = self._has_motion(os.path.join(self.directory, stem + EVENTS_EXT))
+            clips.append(Clip(stem, g["video"], g["files"], g["size"], g["mtime"], motion))
+        return clips
+
+    def _has_motion(self, path):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        cached = self._motion_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path) as f:
+                motion = bool(json.load(f).get("events"))
+        except (OSError, ValueError, AttributeError):
+            motion = False
+        self._motion_cache[path] = (mtime, motion)
+        return motion
+
+    def _disk_usage(self):
+        try:
+            return shutil.disk_usage(self.directory)
+        except OSError:
+            return None
+
+    def _remove_clip(self, video):
+        stem = os.path.splitext(video)[0]
+        files = [video, stem + SIDECAR_EXT, stem + EVENTS_EXT]
+        return self._remove_files([f for f in files if os.path.exists(f)])
+
+    def _remove_files(self, files):
+        freed = 0
+        for path in files:
+            try:
+                freed += self._remove_throttled(path)
+            except OSError as e:
+                print(f"⚠️ Не вдалося видалити {path}: {e}")
+            self._motion_cache.pop(path, None)
+        return freed
+
+    def _remove_throttled(self, path):
+        size = os.path.getsize(path)
+        if size > self.truncate_step:
+            # Звільняємо блоки частинами: кожен truncate — коротка операція, між ними диск вільний
+            with open(path, "r+b") as f:
+                remaining = size
+                while remaining > self.truncate_step and self._running:
+                    remaining -= self.truncate_step
+                    f.truncate(remaining)
+                    os.fsync(f.fileno())
+                    time.sleep(self.truncate_step / self.delete_rate)
+        os.remove(path)
+        if size <= self.truncate_step:
+            time.sleep(size / self.delete_rate)
+        return size
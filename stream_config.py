@@ -0,0 +1,306 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import threading
+import time
+from collections import namedtuple
+
+# Більше кнопок HLS не вміщується в рядок над кадром
+MAX_STREAMS = 8
+# Перші два джерела (CSI, тепловізор); третє завжди HTTP Stream
+MAX_CAMERAS = 2
+TRANSPORTS = ("auto", "tcp", "udp")
+
+StreamDiff = namedtuple("StreamDiff", "added removed changed")
+
+
+class ConfigError(ValueError):
+    """Файл конфігурації непридатний (не JSON або неправильна структура)."""
+
+
+class StreamConfig:
+    """
+    Вміст hls_streams.json після перевірки.
+
+    streams — список словників {"name", "url"} з опційними налаштуваннями
+    джерела: width/height (роздільність декодування), fps (обмеження частоти),
+    transport (auto/tcp/udp для RTSP), roi [x, y, w, h] (обрізання кадру).
+    cameras — заміна перших джерел device_list: [{"source", "label"}] або None.
+    """
+
+    def __init__(self, streams, cameras=None):
+        self.streams = streams
+        self.cameras = cameras
+
+    def __eq__(self, other):
+        return isinstance(other, StreamConfig) and (self.streams, self.cameras) == (other.streams, other.cameras)
+
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _validate_stream(entry, index, warnings):
+    if not isinstance(entry, dict):
+        warnings.append(f"потік #{index}: очікується об'єкт")
+        return None
+    name, url = entry.get("name"), entry.get("url")
+    if not isinstance(name, str) or not isinstance(url, str) or not url.strip():
+        warnings.append(f"потік #{index}: потрібні рядки 'name' та 'url'")
+        return None
+    stream = {"name": name, "url": url.strip()}
+
+    width, height = entry.get("width"), entry.get("height")
+    if width is not None or height is not None:
+        if _positive_int(width) and _positive_int(height):
+            stream["width"], stream["height"] = width, height
+        else:
+            warnings.append(f"'{name}': width/height мають бути додатними цілими — ігнорується")
+    fps = entry.get("fps")
+    if fps is not None:
+        if isinstance(fps, (int, float)) and not isinstance(fps, bool) and fps > 0:
+            stream["fps"] = float(fps)
+        else:
+            warnings.append(f"'{name}': fps має бути додатним числом — ігнорується")
+    transport = entry.get("transport")
+    if transport is not None:
+        if transport in TRANSPORTS:
+            stream["transport"] = transport
+        else:
+            warnings.append(f"'{name}': transport має бути одним з {TRANSPORTS} — ігнорується")
+    roi = entry.get("roi")
+    if roi is not None:
+        if (isinstance(roi, list) and len(roi) == 4 and all(isinstance(v, int) and v >= 0 for v in roi)
+                and roi[2] > 0 and roi[3] > 0):
+            stream["roi"] = tuple(roi)
+        else:
+            warnings.append(f"'{name}': roi має бути [x, y, w, h] — ігнорується")
+    return stream
+
+
+def validate_config(data):
+    """
+    Перевіряє розібраний JSON. Допустимі формати:
+        [{"name": ..., "url": ...}, ...]                      — лише потоки (як раніше)
+        {"streams": [...], "cameras": [{"source": ..., "label": ...}]}
+    Некоректні записи пропускаються з попередженням, а не ламають весь файл.
+    :return: Кортеж (StreamConfig, список попереджень).
+    :raises ConfigError: Якщо структура файлу непридатна.
+    """
+    warnings = []
+    cameras = None
+    if isinstance(data, list):
+        entries = data
+    elif isinstance(data, dict):
+        entries = data.get("streams", [])
+        if not isinstance(entries, list):
+            raise ConfigError("'streams' має бути списком")
+        if "cameras" in data:
+            if not isinstance(data["cameras"], list):
+                raise ConfigError("'cameras' має бути списком")
+            cameras = []
+            for i, cam in enumerate(data["cameras"][:MAX_CAMERAS]):
+                if not isinstance(cam, dict) or not isinstance(cam.get("source"), str) or not cam["source"]:
+                    raise ConfigError(f"камера #{i}: потрібен рядок 'source'")
+                cameras.append({"source": cam["source"], "label": str(cam.get("label", f"Camera {i + 1}"))})
+    else:
+        raise ConfigError("очікується список потоків або об'єкт {\"streams\": [...]}")
+
+    streams, seen = [], set()
+    for i, entry in enumerate(entries):
+        stream = _validate_stream(entry, i, warnings)
+        if stream is None:
+            continue
+        if stream["url"] in seen:
+            warnings.append(f"'{stream['name']}': URL повторюється — пропущено")
+            continue
+        seen.add(stream["url"])
+        streams.append(stream)
+    if len(streams) > MAX_STREAMS:
+        warnings.append(f"потоків {len(streams)}, використовуються перші {MAX_STREAMS}")
+        streams = streams[:MAX_STREAMS]
+    return StreamConfig(streams, cameras), warnings
+
+
+def read_config(path):
+    """Читає та перевіряє файл. :raises ConfigError: файл не читається або не JSON."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(str(e)) from e
+    return validate_config(data)
+
+
+def diff_streams(old, new):
+    """
+    Порівнює списки потоків за URL (URL — ідентичність джерела).
+    :return: StreamDiff(added, removed, changed) зі списками URL; changed — той самий
+             URL, але інші ім'я чи налаштування.
+    """
+    old_by_url = {s["url"]: s for s in old}
+    new_by_url = {s["url"]: s for s in new}
+    added = [url for url in new_by_url if url not in old_by_url]
+    removed = [url for url in old_by_url if url not in new_by_url]
+    changed = [url for url in new_by_url if url in old_by_url and new_by_url[url] != old_by_url[url]]
+    return StreamDiff(added, removed, changed)
+
+
+# --- inotify через ctypes (Linux) ---
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _inotify_open(directory):
+    """Повертає fd inotify, що стежить за каталогом, або None, якщо inotify недоступний."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    # Стежимо за каталогом: редактори та json.dump часто пишуть новий файл і перейменовують
+    mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class ConfigWatcher:
+    """
+    Стежить за hls_streams.json і перечитує його після змін.
+
+    Фоновий потік чекає подій inotify (або, якщо inotify недоступний, порівнює
+    mtime/розмір раз на poll_interval), витримує паузу debounce, щоб не читати
+    напівзаписаний файл, і перевіряє вміст. Некоректний файл лише друкує
+    помилку — працюють попередні налаштування. Нова конфігурація забирається
+    основним циклом через poll() і застосовується в потоці рендерингу.
+    """
+
+    def __init__(self, path, poll_interval=1.0, debounce=0.3):
+        """
+        :param path: Шлях до файлу конфігурації.
+        :param poll_interval: Період перевірки mtime без inotify, с.
+        :param debounce: Пауза після останньої події перед читанням файлу, с.
+        """
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.backend = None
+        self._lock = threading.Lock()
+        self._pending = None
+        self._last = self._read_bytes()
+        self._running = False
+        self._thread = None
+        self._fd = None
+
+    def start(self):
+        if self._running:
+            return
+        self._fd = _inotify_open(os.path.dirname(self.path))
+        self.backend = "inotify" if self._fd is not None else "poll"
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="config-watch", daemon=True)
+        self._thread.start()
+        print(f"👀 Стеження за {os.path.basename(self.path)} ({self.backend})")
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def poll(self):
+        """Повертає нову StreamConfig, якщо файл змінився з минулого виклику, інакше None."""
+        if self._pending is None:
+            return None
+        with self._lock:
+            config, self._pending = self._pending, None
+        return config
+
+    # --- Фоновий потік ---
+    def _run(self):
+        stamp = self._stat()
+        while self._running:
+            if self._fd is not None:
+                if not self._wait_inotify(0.5):
+                    continue
+            else:
+                time.sleep(self.poll_interval)
+                current = self._stat()
+                if current == stamp:
+                    continue
+                stamp = current
+            # Збираємо пачку подій одного збереження
+            time.sleep(self.debounce)
+            if self._fd is not None:
+                self._drain_inotify()
+            self._reload()
+
+    def _wait_inotify(self, timeout):
+        try:
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+        except (OSError, ValueError):
+            return False
+        return bool(readable) and self._drain_inotify()
+
+    def _drain_inotify(self):
+        """Читає всі події; True, якщо серед них є наш файл."""
+        name = os.path.basename(self.path)
+        hit = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return hit
+            except OSError:
+                return hit
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                event_name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                hit |= event_name == name
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except OSError:
+            return None
+
+    def _read_bytes(self):
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _reload(self):
+        raw = self._read_bytes()
+        if raw is None or raw == self._last:
+            return
+        try:
+            config, warnings = read_config(self.path)
+        except ConfigError as e:
+            print(f"⚠️  {os.path.basename(self.path)} не застосовано: {e}")
+            return
+        self._last = raw
+        for warning in warnings:
+            print(f"⚠️  {os.path.basename(self.path)}: {warning}")
+        with self._lock:
+            self._pending = config
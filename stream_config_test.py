@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+import unittest
+
+from stream_config import (ConfigError, ConfigWatcher, MAX_CAMERAS, MAX_STREAMS, StreamConfig,
+                           diff_streams, validate_config)
+
+
+def _stream(i, **extra):
+    return dict({"name": f"s{i}", "url": f"http://cam{i}/video.mjpg"}, **extra)
+
+
+class ValidateConfigTest(unittest.TestCase):
+    def test_plain_list(self):
+        config, warnings = validate_config([_stream(1), _stream(2)])
+        self.assertEqual([s["url"] for s in config.streams], ["http://cam1/video.mjpg", "http://cam2/video.mjpg"])
+        self.assertIsNone(config.cameras)
+        self.assertEqual(warnings, [])
+
+    def test_url_is_stripped(self):
+        config, _ = validate_config([{"name": "a", "url": "  rtsp://x/1 "}])
+        self.assertEqual(config.streams[0]["url"], "rtsp://x/1")
+
+    def test_duplicate_url_skipped(self):
+        config, warnings = validate_config([_stream(1), dict(_stream(1), name="copy")])
+        self.assertEqual([s["name"] for s in config.streams], ["s1"])
+        self.assertEqual(len(warnings), 1)
+
+    def test_max_streams_cut(self):
+        config, warnings = validate_config([_stream(i) for i in range(MAX_STREAMS + 3)])
+        self.assertEqual(len(config.streams), MAX_STREAMS)
+        self.assertEqual(config.streams[-1]["name"], f"s{MAX_STREAMS - 1}")
+        self.assertEqual(len(warnings), 1)
+
+    def test_duplicates_do_not_count_towards_limit(self):
+        entries = [_stream(0)] * 3 + [_stream(i) for i in range(1, MAX_STREAMS)]
+        config, _ = validate_config(entries)
+        self.assertEqual(len(config.streams), MAX_STREAMS)
+
+    def test_invalid_entries_skipped(self):
+        config, warnings = validate_config(["text", {"name": "a"}, {"name": 1, "url": "x"},
+                                            {"name": "b", "url": "  "}, _stream(1)])
+        self.assertEqual([s["name"] for s in config.streams], ["s1"])
+        self.assertEqual(len(warnings), 4)
+
+    def test_valid_options_kept(self):
+        config, warnings = validate_config([_stream(1, width=640, height=360, fps=12, transport="tcp",
+                                                    roi=[0, 10, 320, 200])])
+        stream = config.streams[0]
+        self.assertEqual((stream["width"], stream["height"]), (640, 360))
+        self.assertEqual(stream["fps"], 12.0)
+        self.assertIsInstance(stream["fps"], float)
+        self.assertEqual(stream["transport"], "tcp")
+        self.assertEqual(stream["roi"], (0, 10, 320, 200))
+        self.assertEqual(warnings, [])
+
+    def test_invalid_fps_ignored(self):
+        for fps in (0, -5, "10", True):
+            config, warnings = validate_config([_stream(1, fps=fps)])
+            self.assertNotIn("fps", config.streams[0], fps)
+            self.assertEqual(len(warnings), 1, fps)
+
+    def test_invalid_roi_ignored(self):
+        for roi in ([0, 0, 10], [0, 0, 0, 10], [-1, 0, 10, 10], [0, 0, 10.5, 10], (0, 0, 10, 10), "0,0,10,10"):
+            config, warnings = validate_config([_stream(1, roi=roi)])
+            self.assertNotIn("roi", config.streams[0], roi)
+            self.assertEqual(len(warnings), 1, roi)
+
+    def test_size_needs_both_dimensions(self):
+        for extra in ({"width": 640}, {"width": 640, "height": 0}, {"width": True, "height": 360}):
+            config, warnings = validate_config([_stream(1, **extra)])
+            self.assertNotIn("width", config.streams[0], extra)
+            self.assertEqual(len(warnings), 1, extra)
+
+    def test_unknown_transport_ignored(self):
+        config, warnings = validate_config([_stream(1, transport="http")])
+        self.assertNotIn("transport", config.streams[0])
+        self.assertEqual(len(warnings), 1)
+
+    def test_cameras_capped(self):
+        cameras = [{"source": f"/dev/video{i}", "label": f"cam {i}"} for i in range(MAX_CAMERAS + 2)]
+        config, _ = validate_config({"streams": [], "cameras": cameras})
+        self.assertEqual(len(config.cameras), MAX_CAMERAS)
+        self.assertEqual(config.cameras[0], {"source": "/dev/video0", "label": "cam 0"})
+
+    def test_camera_default_label(self):
+        config, _ = validate_config({"cameras": [{"source": "/dev/video0"}]})
+        self.assertEqual(config.cameras, [{"source": "/dev/video0", "label": "Camera 1"}])
+        self.assertEqual(config.streams, [])
+
+    def test_structure_errors(self):
+        for data in ("streams", 42, None, {"streams": {}}, {"cameras": "x"}, {"cameras": [{"label": "no source"}]},
+                     {"cameras": [{"source": ""}]}):
+            with self.assertRaises(ConfigError, msg=repr(data)):
+                validate_config(data)
+
+
+class DiffStreamsTest(unittest.TestCase):
+    def test_added_removed_changed(self):
+        old = [_stream(1), _stream(2), _stream(3)]
+        new = [_stream(1), dict(_stream(2), name="renamed"), _stream(4)]
+        diff = diff_streams(old, new)
+        self.assertEqual(diff.added, ["http://cam4/video.mjpg"])
+        self.assertEqual(diff.removed, ["http://cam3/video.mjpg"])
+        self.assertEqual(diff.changed, ["http://cam2/video.mjpg"])
+
+    def test_reorder_is_not_a_change(self):
+        diff = diff_streams([_stream(1), _stream(2)], [_stream(2), _stream(1)])
+        self.assertEqual(diff, ([], [], []))
+
+    def test_option_change(self):
+        diff = diff_streams([_stream(1)], [_stream(1, fps=5)])
+        self.assertEqual(diff.changed, ["http://cam1/video.mjpg"])
+
+
+class ConfigWatcherReloadTest(unittest.TestCase):
+    """_reload() без фонового потоку: лише читання, перевірка та передача в poll()."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "hls_streams.json")
+        self._write([_stream(1)])
+        self.watcher = ConfigWatcher(self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _write(self, data):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+
+    def test_unchanged_file_ignored(self):
+        self.watcher._reload()
+        self.assertIsNone(self.watcher.poll())
+
+    def test_changed_file_delivered_once(self):
+        self._write([_stream(1), _stream(2)])
+        self.watcher._reload()
+        config = self.watcher.poll()
+        self.assertIsInstance(config, StreamConfig)
+        self.assertEqual(len(config.streams), 2)
+        self.assertIsNone(self.watcher.poll())
+        self.watcher._reload()
+        self.assertIsNone(self.watcher.poll())
+
+    def test_invalid_file_keeps_previous(self):
+        self._write("[{broken")
+        self.watcher._reload()
+        self.assertIsNone(self.watcher.poll())
+        # Повернення до останнього застосованого вмісту — не зміна
+        self._write([_stream(1)])
+        self.watcher._reload()
+        self.assertIsNone(self.watcher.poll())
+        self._write([_stream(3)])
+        self.watcher._reload()
+        self.assertEqual(self.watcher.poll().streams[0]["name"], "s3")
+
+    def test_missing_file_ignored(self):
+        os.remove(self.path)
+        self.watcher._reload()
+        self.assertIsNone(self.watcher.poll())
+
+
+if __name__ == "__main__":
+    unittest.main()
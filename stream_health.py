@@ -0,0 +1,246 @@
+import os
+import socket
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+# Схеми, для яких перевіряється лише TCP порт (порт за замовчуванням)
+TCP_PORTS = {"rtsp": 554, "rtsps": 322, "rtmp": 1935, "rtmps": 443}
+
+
+class StreamStatus:
+    """Стан одного потоку за результатами останніх перевірок."""
+
+    UNKNOWN = "unknown"
+    OK = "ok"
+    SLOW = "slow"
+    DOWN = "down"
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url
+        self.status = self.UNKNOWN
+        self.latency_ms = None
+        self.last_check = None
+        self.last_good = None
+        self.error = None
+        self.failures = 0
+
+    @property
+    def healthy(self):
+        return self.status in (self.OK, self.SLOW)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "url": self.url,
+            "status": self.status,
+            "latency_ms": self.latency_ms,
+            "last_check": self.last_check,
+            "last_good": self.last_good,
+            "error": self.error,
+        }
+
+
+class StreamHealthMonitor:
+    """
+    Фонова паралельна перевірка доступності потоків з hls_streams.json.
+
+    Усі URL перевіряються одночасно в пулі потоків з таймаутом, тому кілька
+    мертвих камер не блокують інтерфейс. Основний цикл лише читає готовий стан:
+    next_healthy() для перемикання та color() для кнопок HLS.
+    """
+
+    # Кольори кнопок (BGR) для кожного стану
+    COLORS = {
+        StreamStatus.UNKNOWN: (100, 100, 100),
+        StreamStatus.OK: (0, 140, 0),
+        StreamStatus.SLOW: (0, 165, 255),
+        StreamStatus.DOWN: (0, 0, 170),
+    }
+
+    def __init__(self, streams, interval=10.0, timeout=2.0, slow_ms=1000, max_workers=8):
+        """
+        :param streams: Список словників {"name": ..., "url": ...}.
+        :param interval: Період (с) між повними раундами перевірок.
+        :param timeout: Таймаут (с) однієї перевірки.
+        :param slow_ms: Затримка, понад яку потік вважається повільним.
+        :param max_workers: Максимальна кількість одночасних перевірок.
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self.slow_ms = slow_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stream-probe")
+        self._lock = threading.Lock()
+        self._statuses = []
+        self._wakeup = threading.Event()
+        self._active = True
+        self._running = False
+        self._thread = None
+        self.set_streams(streams)
+
+    # --- Керування ---
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="stream-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def set_active(self, active):
+        """Перевірки виконуються лише в режимі HTTP Stream; при вході — одразу."""
+        if active and not self._active:
+            self._wakeup.set()
+        self._active = active
+
+    def set_streams(self, streams):
+        """Оновлює список потоків, зберігаючи історію для незмінених URL."""
+        with self._lock:
+            old = {s.url: s for s in self._statuses}
+            statuses = []
+            for stream in streams:
+                status = old.get(stream["url"]) or StreamStatus(stream["name"], stream["url"])
+                status.name = stream["name"]
+                statuses.append(status)
+            self._statuses = statuses
+        self._wakeup.set()
+
+    def request_probe(self):
+        """Позачергова перевірка (напр. коли активний потік щойно впав)."""
+        self._wakeup.set()
+
+    def mark_failed(self, index, error="read failed"):
+        """Позначає потік як недоступний за даними основного циклу."""
+        with self._lock:
+            if 0 <= index < len(self._statuses):
+                status = self._statuses[index]
+                status.status = StreamStatus.DOWN
+                status.error = error
+                status.failures += 1
+                status.last_check = time.time()
+        self._wakeup.set()
+
+    # --- Запити стану ---
+    def status(self, index):
+        with self._lock:
+            if 0 <= index < len(self._statuses):
+                return self._statuses[index]
+        return None
+
+    def color(self, index):
+        status = self.status(index)
+        return self.COLORS[status.status if status else StreamStatus.UNKNOWN]
+
+    def next_healthy(self, start_index):
+        """
+        Повертає індекс наступного (після start_index) здорового потоку.
+        Якщо здорових немає — наступний ще не перевірений, інакше None.
+        """
+        with self._lock:
+            count = len(self._statuses)
+            order = [(start_index + 1 + i) % count for i in range(count)] if count else []
+            order = [i for i in order if i != start_index]
+            for i in order:
+                if self._statuses[i].healthy:
+                    return i
+            for i in order:
+                if self._statuses[i].status == StreamStatus.UNKNOWN:
+                    return i
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            return [s.as_dict() for s in self._statuses]
+
+    # --- Фоновий потік ---
+    def _run(self):
+        while self._running:
+            if self._active:
+                self._probe_all()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def _probe_all(self):
+        with self._lock:
+            targets = list(self._statuses)
+        futures = {self._executor.submit(self._probe, s.url): s for s in targets}
+        done, _ = wait(futures, timeout=self.timeout * 2)
+        now = time.time()
+        with self._lock:
+            for future, status in futures.items():
+                status.last_check = now
+                if future not in done:
+                    ok, latency, error = False, None, "timeout"
+                else:
+                    ok, latency, error = future.result()
+                status.latency_ms = latency
+                status.error = error
+                if ok:
+                    status.status = StreamStatus.SLOW if latency > self.slow_ms else StreamStatus.OK
+                    status.last_good = now
+                    status.failures = 0
+                else:
+                    status.status = StreamStatus.DOWN
+                    status.failures += 1
+
+    def _probe(self, url):
+        """
+        Одна перевірка URL.
+        :return: Кортеж (ok, latency_ms, error).
+        """
+        start = time.perf_counter()
+        try:
+            parts = urlsplit(url)
+            if parts.scheme in ("http", "https"):
+                ok = self._probe_http(url)
+            elif parts.scheme in TCP_PORTS:
+                # RTSP/RTMP: перевіряємо лише доступність TCP порту
+                with socket.create_connection((parts.hostname, parts.port or TCP_PORTS[parts.scheme]),
+                                              timeout=self.timeout):
+                    ok = True
+            elif parts.scheme in ("", "file"):
+                # Локальний файл чи пристрій
+                ok = os.path.exists(parts.path if parts.scheme else url)
+                if not ok:
+                    return False, None, "not found"
+            else:
+                # sim:// (симулятор) та схеми, які нема чим перевірити, вважаються доступними
+                ok = True
+            latency = round((time.perf_counter() - start) * 1000.0, 1)
+            return ok, latency, None if ok else "bad payload"
+        except Exception as e:
+            return False, None, str(e)
+
+    def _probe_http(self, url):
+        """
+        HLS: плейлист починається з #EXTM3U; MJPEG/JPEG: у потоці є початок JPEG.
+        Тип визначається за Content-Type і першими байтами, а не за URL —
+        плейлисти бувають без суфікса .m3u8 (токени, редиректи, /live).
+        """
+        request = urllib.request.Request(url, headers={"User-Agent": "VideoLd-probe"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            content_type = response.headers.get("Content-Type", "").lower()
+            data = response.read(16 * 1024)
+            playlist = data.lstrip().startswith(b"#EXTM3U")
+            if playlist or "mpegurl" in content_type:
+                return playlist
+            if b"\xff\xd8" in data:
+                return True
+            while data and len(data) < 256 * 1024:
+                chunk = response.read(16 * 1024)
+                if not chunk:
+                    break
+                data += chunk
+                if b"\xff\xd8" in data:
+                    return True
+            return False
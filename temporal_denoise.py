@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+
+
+class TemporalDenoiser:
+    """
+    Часове шумозаглушення: експоненційне середнє кадрів з адаптацією до руху.
+
+    Обробляється лише яскравість (Y з YCrCb) — основний шум сенсора вночі та
+    теплової камери. Середнє накопичується cv2.accumulateWeighted у float32
+    буфері, що живе між кадрами. Пікселі, де поточний кадр відрізняється від
+    середнього більше за поріг, вважаються рухом і замінюються поточним
+    значенням — рухомі об'єкти не залишають "шлейфу".
+    """
+
+    def __init__(self, alpha=0.25, motion_threshold=14, motion_scale=0.5):
+        """
+        :param alpha: Вага нового кадру в середньому (менше — сильніше згладжування).
+        :param motion_threshold: Різниця яскравості (0-255), з якої піксель вважається рухом.
+        :param motion_scale: Коефіцієнт зменшення для маски руху (маска грубіша,
+                             але поодинокі шумні пікселі не сприймаються як рух).
+        """
+        self.alpha = alpha
+        self.motion_threshold = motion_threshold
+        self.motion_scale = motion_scale
+        self.kernel = np.ones((3, 3), np.uint8)
+        self._buffers = {}
+        self._average = None
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self._buffers[name] = np.empty(shape, dtype)
+        return buf
+
+    def reset(self):
+        """Скидає накопичене середнє (зміна джерела)."""
+        self._average = None
+
+    def apply(self, frame, dst=None):
+        """
+        :param frame: Кадр BGR.
+        :param dst: Буфер результату (форма як у frame).
+        :return: Кадр зі згладженою в часі яскравістю.
+        """
+        height, width = frame.shape[:2]
+        ycc = cv2.cvtColor(frame, cv2.COLOR_BGR2YCrCb, dst=self._buffer("ycc", frame.shape))
+        luma = cv2.extractChannel(ycc, 0, dst=self._buffer("luma", (height, width)))
+
+        if self._average is None or self._average.shape != luma.shape:
+            self._average = luma.astype(np.float32)
+            return cv2.cvtColor(ycc, cv2.COLOR_YCrCb2BGR, dst=dst)
+
+        # Маска руху: різниця з поточним середнім на зменшеному кадрі
+        smoothed = cv2.convertScaleAbs(self._average, dst=self._buffer("smoothed", luma.shape))
+        diff = cv2.absdiff(luma, smoothed, dst=self._buffer("diff", luma.shape))
+        size = (max(1, int(width * self.motion_scale)), max(1, int(height * self.motion_scale)))
+        small = cv2.resize(diff, size, dst=self._buffer("diff_small", (size[1], size[0])),
+                           interpolation=cv2.INTER_AREA)
+        cv2.threshold(small, self.motion_threshold, 255, cv2.THRESH_BINARY, dst=small)
+        cv2.dilate(small, self.kernel, dst=small)
+        moving = cv2.resize(small, (width, height), dst=self._buffer("moving", luma.shape),
+                            interpolation=cv2.INTER_NEAREST)
+        still = cv2.bitwise_not(moving, dst=self._buffer("still", luma.shape))
+
+        # Нерухомі області усереднюються, рухомі — беруться з поточного кадру
+        cv2.accumulateWeighted(luma, self._average, self.alpha, mask=still)
+        cv2.accumulateWeighted(luma, self._average, 1.0, mask=moving)
+
+        cv2.convertScaleAbs(self._average, dst=luma)
+        cv2.insertChannel(luma, ycc, 0)
+        return cv2.cvtColor(ycc, cv2.COLOR_YCrCb2BGR, dst=dst)
@@ -3,16 +3,75 @@
 
 
 import cv2
-import numpy as np
 import time
-import math
 import os
 import json
 import sys
-from audio_player import AudioPlayer
+import argparse
 from datetime import datetime
 from hud_manager import HUDManager
 from motion_detector import MotionDetector
+from thermal_analysis import ThermalAnalyzer
+from temporal_denoise import TemporalDenoiser
+from stabilizer import Stabilizer
+from lrf_telemetry import LRFTelemetry, STATUS_NO_READING
+from recording_metadata import MetadataWriter, sidecar_path
+from motion_events import EventRecorder, EventIndex, events_path
+from storage_manager import StorageManager
+from snapshot import SnapshotWriter
+from mjpeg_streamer import FrameBroadcaster, HlsLiveOutput
+from remote_control import RemoteControl
+from stream_health import StreamHealthMonitor
+from warm_standby import WarmStandbyPool
+from mosaic_view import MosaicView
+from frame_pipeline import FramePipeline, FrameContext
+from frame_pool import FramePool, AllocTracker
+from perf_metrics import MetricsRegistry
+from output_sinks import create_sink, detach_stdout, DisplaySink
+from action_script import ActionScript
+from startup import StartupTimeline, StartupTasks
+from alert_engine import AlertEngine
+from gst_pipeline import CaptureSettings, build_pipeline
+from v4l2_capture import V4L2MjpegCapture
+from stream_config import read_config, diff_streams, ConfigError, ConfigWatcher, StreamConfig
+from hud_widgets import StateStore, WidgetLayer, ButtonStyle, COLOR_NORMAL, COLOR_ACTIVE, COLOR_DISABLED
+from simulator.camera import open_sim_source
+from frame_ops import enhance_image, zoom_frame, zoom_rect, thermal_hot_mask, apply_thermal_colormap, draw_text_pil
+
+# Часова шкала запуску: усе, що не потрібне для першого кадру, ініціалізується
+# у фоні (startup.background) або після його показу (startup.after_first_frame)
+timeline = StartupTimeline()
+startup = StartupTasks(timeline)
+timeline.mark("imports")
+
+# --- Аргументи командного рядка ---
+# Headless режим: той самий pipeline без вікна, кадри йдуть у sink-и,
+# а дії кнопок задаються сценарієм замість миші, напр.:
+#   python test_opt.py --headless --sink null --max-frames 600
+#   python test_opt.py --headless --sink file:record/headless.mp4 --script actions.json
+#   python test_opt.py --headless --sink pipe:- | ffplay -f rawvideo -pixel_format bgr24 -video_size 1024x600 -
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="VideoLd HUD")
+    parser.add_argument("--headless", action="store_true",
+                        help="без вікна OpenCV; кадри лише у sink-и")
+    parser.add_argument("--sink", action="append", default=[],
+                        help="null | file:<шлях> | pipe:<шлях або -> | mjpeg | display (можна кілька)")
+    parser.add_argument("--script", help="JSON сценарій дій кнопок (див. action_script.py)")
+    parser.add_argument("--max-frames", type=int, default=0, help="зупинитися після N кадрів")
+    parser.add_argument("--duration", type=float, default=0.0, help="зупинитися через N секунд")
+    parser.add_argument("--sim", action="store_true",
+                        help="симулятор апаратури: LRF на pty, GPIO-заглушка, sim:// камери")
+    parser.add_argument("--sim-lrf-profile", default="sine:800:300:10",
+                        help="профіль відстані симулятора (constant:M | ramp:FROM:TO:PERIOD | sine:MEAN:AMP:PERIOD)")
+    parser.add_argument("--sim-lrf-latency", type=float, default=0.08, help="затримка відповіді симулятора, с")
+    parser.add_argument("--sim-lrf-error-rate", type=float, default=0.0, help="частка відповідей з помилкою")
+    return parser.parse_args(argv)
+
+ARGS = parse_args()
+HEADLESS = ARGS.headless
+# Сирі кадри в stdout: звільняємо його до першого print()
+if any(spec in ("pipe", "pipe:-") for spec in ARGS.sink):
+    detach_stdout()
 
 # ---------------------------
 # --- Заглушки / безпечні імпорти ---
@@ -20,12 +79,23 @@ from motion_detector import MotionDetector
 # Якщо у тебе є реальні модулі ldtest, hud_manager, hls_player, wifi_hotspot — вони будуть імпортовані.
 # Якщо ні — використовуються прості заглушки, щоб код можна було запустити.
 try:
-    from PIL import ImageFont, ImageDraw, Image
+    from PIL import ImageFont
     PIL_AVAILABLE = True
 except ImportError:
     PIL_AVAILABLE = False
     print("⚠️  Pillow не встановлено. Українські літери в HUD не будуть відображатись.")
 
+# Симулятор: GPIO-заглушка має бути в sys.modules до імпорту ldtest
+LRF_PORT = '/dev/ttyAMA0'
+LRF_ENABLE_PIN = 17
+fake_lrf = None
+if ARGS.sim:
+    from simulator import gpio as sim_gpio, FakeRangefinder
+    sim_gpio.install()
+    fake_lrf = FakeRangefinder(profile=ARGS.sim_lrf_profile, latency=ARGS.sim_lrf_latency,
+                               error_rate=ARGS.sim_lrf_error_rate, enable_pin=LRF_ENABLE_PIN)
+    LRF_PORT = fake_lrf.start()
+
 try:
     from ldtest import LRF
 except Exception:
@@ -33,6 +103,7 @@ except Exception:
         SINGLE = 0
         def __init__(self, port=None, enable_pin=None, mode=None):
             self._on = False
+            self.is_available = True
         def power_on(self):
             self._on = True
         def power_off(self):
@@ -47,8 +118,18 @@ except Exception:
     class WifiHotspotServer:
         def __init__(self, ssid="Pi", password=None, folder="download", port=8000):
             print("WifiHotspotServer: заглушка ініціалізована")
-        def start_all(self):
+        def start_all(self, background=False):
             print("WifiHotspotServer: start_all (заглушка)")
+        def start_hotspot(self, background=False):
+            print("WifiHotspotServer: start_hotspot (заглушка)")
+        def start_http_server(self):
+            print("WifiHotspotServer: start_http_server (заглушка)")
+        def attach_stream(self, broadcaster):
+            pass
+        def add_route(self, path, handler, method="GET"):
+            pass
+        def stop_http_server(self):
+            pass
 
 # Спроба імпорту HLSVideo (повинен надавати інтерфейс схожий на VideoCapture)
 HLS_AVAILABLE = True
@@ -57,7 +138,7 @@ try:
 except Exception:
     HLS_AVAILABLE = False
     class HLSVideo:
-        def __init__(self, url, fps=30, width=1024, height=600):
+        def __init__(self, url, fps=30, width=1024, height=600, options=None):
             print("HLSVideo: заглушка, використовується cv2.VideoCapture")
             # спробуємо використовувати OpenCV для простих HTTP MJPEG/RTSP/файлів
             self.cap = cv2.VideoCapture(url)
@@ -84,9 +165,62 @@ ZOOM_MIN, ZOOM_MAX = 1.0, 5.0
 CONTINUOUS_AUTO_OFF_MINUTES = 2
 RECORD_DIR = "record"
 MENU_FILES_PER_PAGE = 15
+# Місце під записи: квота теки та мінімум вільного на розділі (МБ); найстаріші записи
+# витісняються у фоні, записи з рухом — останніми. Нижче критичного порогу запис зупиняється.
+STORAGE_QUOTA_MB = 8192
+STORAGE_MIN_FREE_MB = 1024
+STORAGE_CRITICAL_FREE_MB = 200
+# Обмеження швидкості видалення (МБ/с), щоб не займати SD-карту під час запису
+STORAGE_DELETE_MB_PER_S = 32.0
+# Знімки (кадр джерела без HUD) — у теці, яку роздає хотспот; кодування у фоні
+SNAPSHOT_DIR = os.path.join("download", "snapshots")
+SNAPSHOT_JPEG_QUALITY = 92
+SNAPSHOT_BURST_COUNT = 10
+SNAPSHOT_WORKERS = 2
 FPS = 30.0
 
+# CSI камера: appsink віддає лише найсвіжіший кадр, формат з ISP узгоджується
+# від найдешевшого для перетворення в BGR (див. gst_pipeline.py)
+CSI_CAPTURE = CaptureSettings("libcamerasrc", width=FRAME_W, height=FRAME_H, fps=int(FPS),
+                              drop=True, max_buffers=1, sync=False)
+
+# USB/V4L2 камера: MJPEG з декодуванням одразу в розмір кадру (див. v4l2_capture.py).
+# None — найбільший режим камери, якщо він щонайменше вдвічі більший за кадр
+# (зменшення в DCT-домені), інакше режим, найближчий до FRAME_W x FRAME_H
+V4L2_MJPEG = True
+V4L2_CAPTURE_SIZE = None
+
 STREAMS_JSON = "hls_streams.json"
+# Перечитувати hls_streams.json на льоту (inotify, або опитування mtime)
+STREAMS_HOT_RELOAD = True
+
+# Warm standby: наступне / останнє джерело тримається відкритим для миттєвого перемикання
+WARM_STANDBY_ENABLED = True
+WARM_STANDBY_BUDGET_MB = 48
+WARM_STANDBY_MAX_ENTRIES = 2
+# Живі потоки в пулі вичитуються повністю: бюджет трафіку та оцінка бітрейту одного потоку
+WARM_STANDBY_BANDWIDTH_MBPS = 10
+WARM_STANDBY_LIVE_MBPS = 8
+# Скільки чекати джерело, яке ще відкривається у фоні, замість другого відкриття пристрою
+WARM_STANDBY_TAKE_WAIT = 3.0
+
+# Мозаїка потоків (2x2 / 3x3): максимальна частота кадрів клітинки та бюджет CPU (ядра)
+MOSAIC_MAX_FPS = 10.0
+MOSAIC_CPU_BUDGET = 2.0
+
+# Трансляція кадру клієнтам хотспоту (/stream.mjpg) та опційний HLS вихід
+STREAM_SERVER_ENABLED = True
+STREAM_JPEG_QUALITY = 70
+STREAM_MAX_FPS = 15.0
+HLS_OUTPUT_ENABLED = False
+HLS_OUTPUT_DIR = os.path.join("download", "live")
+# Підняти Wi-Fi хотспот (nmcli) при старті — у фоні, після першого кадру
+HOTSPOT_AUTOSTART = False
+
+# Звукові сповіщення: буфер мікшера (семпли) та обмеження частоти сигналу детекції
+ALERT_BUFFER_SAMPLES = 512
+ALERT_DETECTION_COOLDOWN = 2.0
+ALERT_DETECTION_MAX_PER_MINUTE = 12
 
 # Якщо немає streams.json — створимо дефолтний
 DEFAULT_STREAMS = [
@@ -118,63 +252,144 @@ def ensure_streams_file(filename=STREAMS_JSON):
             json.dump(DEFAULT_STREAMS, f, ensure_ascii=False, indent=2)
         print(f"Створено дефолтний {filename}")
 
-def load_hls_streams(filename=STREAMS_JSON):
+def load_stream_config(filename=STREAMS_JSON):
+    """Читає потоки (та опційно камери) з файлу; некоректні записи пропускаються (див. stream_config.py)."""
     if not os.path.exists(filename):
         ensure_streams_file(filename)
     try:
-        with open(filename, "r", encoding="utf-8") as f:
-            streams = json.load(f)
-            # Фільтруємо тільки валідні записи
-            valid_streams = [s for s in streams if isinstance(s, dict) and "url" in s and "name" in s]
-            streams = valid_streams[:8]  # Беремо тільки перші 8 стрімів
-            return streams
-    except Exception as e:
-        print("Помилка читання streams.json:", e)
+        config, warnings = read_config(filename)
+    except ConfigError as e:
         print(f"Помилка читання {filename}:", e)
-        return []
+        return StreamConfig([])
+    for warning in warnings:
+        print(f"⚠️  {filename}: {warning}")
+    return config
 
 # ---------------------------
 # --- Ініціалізація апаратури та станів ---
 # ---------------------------
 hotspot = WifiHotspotServer(ssid="PiLdVideo", password="video1234", folder="download", port=8000)
+if HOTSPOT_AUTOSTART:
+    # nmcli блокує на кілька секунд — лише після першого кадру і у фоні
+    startup.after_first_frame("hotspot", lambda: hotspot.start_hotspot(background=True))
+
+# Спільний буфер кадру для трансляції (кодування JPEG один раз на всіх клієнтів)
+frame_broadcaster = FrameBroadcaster(quality=STREAM_JPEG_QUALITY, max_fps=STREAM_MAX_FPS)
+hls_output = None
+if STREAM_SERVER_ENABLED:
+    frame_broadcaster.start()
+    hotspot.attach_stream(frame_broadcaster)
+    if HLS_OUTPUT_ENABLED:
+        hls_output = HlsLiveOutput(HLS_OUTPUT_DIR, width=FRAME_W, height=FRAME_H, fps=int(STREAM_MAX_FPS))
+
+        def start_hls_output():
+            if hls_output.start():
+                frame_broadcaster.add_raw_consumer(hls_output)
+        startup.after_first_frame("hls output", start_hls_output)
+
+# Віддалене керування HUD (control.html): дії з черги виконуються в основному циклі
+REMOTE_ACTIONS = [
+    "crosshair", "zoom_in", "zoom_out", "switch_cam", "single_measure",
+    "continuous_measure", "enhance", "record", "motion_detect", "switch_hls", "mosaic",
+    "perf_overlay", "stabilize", "snapshot", "burst",
+]
+remote_control = RemoteControl(REMOTE_ACTIONS)
+if STREAM_SERVER_ENABLED:
+    remote_control.attach(hotspot)
+
+    def start_http_server():
+        try:
+            hotspot.start_http_server()
+        except OSError as e:
+            print("Не вдалося запустити HTTP сервер трансляції:", e)
+    startup.after_first_frame("http server", start_http_server)
+
+class PendingLRF:
+    """Замінює далекомір, поки справжній ініціалізується у фоні (GPIO, UART, перевірка зв'язку)."""
+    SINGLE = 0
+    is_available = False
+    def power_on(self):
+        pass
+    def power_off(self):
+        pass
+    def get_single_measurement(self):
+        return None
+
+def init_lrf():
+    return LRF(port=LRF_PORT, enable_pin=LRF_ENABLE_PIN, mode=LRF.SINGLE)
 
-lrf_sensor = LRF(port='/dev/ttyAMA0', enable_pin=17, mode=LRF.SINGLE)
+def on_lrf_ready(sensor):
+    global lrf_sensor, lrf_powered
+    lrf_sensor = sensor
+    # Приціл увімкнули (віддалено чи сценарієм), поки працював PendingLRF — його power_on()
+    # нічого не робив, а справжній далекомір після check_availability вимкнений
+    if lrf_powered or show_crosshair or continuous_measure:
+        sensor.power_on()
+        lrf_powered = True
+
+lrf_sensor = PendingLRF()
+# Історія вимірювань далекоміра: фільтрація, "захоплена" дистанція, експорт /api/lrf.json|csv
+lrf_telemetry = LRFTelemetry(capacity=4096, window=9, lock_count=5, lock_tolerance=1.0)
+startup.background("lrf", init_lrf, on_ready=on_lrf_ready)
 # lrf_sensor.power_on() # живлення тепер керується автоматично
 lrf_powered = False # Початково вимкнено
 
 # --- Шрифти для HUD ---
+# Поки шрифти вантажаться у фоні, draw_text_pil малює через cv2.putText
 FONT_PATH = "/home/laserlab/LD_PROJECT/DejaVuSans.ttf"
-if PIL_AVAILABLE and os.path.exists(FONT_PATH):
-    FONT_HUD = ImageFont.truetype(FONT_PATH, 16)
-    FONT_HUD_LARGE = ImageFont.truetype(FONT_PATH, 22)
-    FONT_STREAM_MODE = ImageFont.truetype(FONT_PATH, 24)
-    FONT_HLS = ImageFont.truetype(FONT_PATH, 14)
-else:
-    FONT_HUD = None
-    FONT_HUD_LARGE = None
-    FONT_STREAM_MODE = None
-    FONT_HLS = None
-    
+FONT_HUD = None
+FONT_HUD_LARGE = None
+FONT_STREAM_MODE = None
+FONT_HLS = None
+
+def load_fonts():
+    if not PIL_AVAILABLE or not os.path.exists(FONT_PATH):
+        return None
+    return (ImageFont.truetype(FONT_PATH, 16), ImageFont.truetype(FONT_PATH, 22),
+            ImageFont.truetype(FONT_PATH, 24), ImageFont.truetype(FONT_PATH, 14))
+
+def on_fonts_ready(fonts):
+    global FONT_HUD, FONT_HUD_LARGE, FONT_STREAM_MODE, FONT_HLS
+    if fonts:
+        FONT_HUD, FONT_HUD_LARGE, FONT_STREAM_MODE, FONT_HLS = fonts
+        hud.font = FONT_HUD_LARGE
+
+startup.background("fonts", load_fonts, on_ready=on_fonts_ready)
+
 # HUD, хотспот, LRF
 hud = HUDManager(font=FONT_HUD_LARGE)
 
 # ---------------------------
 # --- Потоки та device_list ---
 # ---------------------------
-hls_streams = load_hls_streams(STREAMS_JSON)
+streams_config = load_stream_config(STREAMS_JSON)
+hls_streams = streams_config.streams
 current_hls_idx = 0  # індекс активного HLS-потоку
 
+# Фонова паралельна перевірка потоків: перемикання одразу на живий потік
+stream_health = StreamHealthMonitor(hls_streams, interval=10.0, timeout=2.0)
+if hls_streams:
+    startup.after_first_frame("stream probing", stream_health.start)
+
 # Порядок пристроїв: pipeline CSI / /dev/video0 / HLS
 device_list = [
-    "libcamerasrc ! video/x-raw,format=BGR,width=1024,height=600,framerate=30/1 ! videoconvert ! appsink",
+    build_pipeline(CSI_CAPTURE),
     "/dev/video0"
 ]
 if hls_streams:
     device_list.append(hls_streams[current_hls_idx]["url"])
 else:
     device_list.append("")  # placeholder
-
 camera_labels = ["Wide camera", "Thermal camera", "HTTP Stream"]
+if streams_config.cameras and not ARGS.sim:
+    for i, camera in enumerate(streams_config.cameras):
+        device_list[i] = camera["source"]
+        camera_labels[i] = camera["label"]
+if ARGS.sim:
+    # Синтетичні джерела замість CSI та тепловізора (див. simulator/camera.py)
+    device_list[0] = "sim://synthetic"
+    device_list[1] = "sim://thermal?fps=9"
+
 current_cam_idx = 0
 
 # ---------------------------
@@ -185,20 +400,26 @@ zoom = 1.0
 continuous_measure = False
 continuous_start_time = None
 motion_detection_active = False
-enhance_active = False
+# Режим покращення зображення; кнопка Enhance перемикає по колу
+ENHANCE_MODES = ("off", "enhance", "denoise")
+enhance_mode = "off"
 recording = False
+recording_path = None
 video_writer = None
+metadata_writer = None  # покадрові метадані запису (sidecar .vmeta)
+event_recorder = None   # індекс подій руху запису (.events.json)
+motion_frame_idx = -1   # кадр pipeline, на якому востаннє виконувалась детекція руху
 distance_text = "Distance: N/A"
 active_set = "HUD"
 menu_page = 0
 menu_files = []
 continuous_off_msg = ""
-button_sets = {}
-button_pressed = {}
+# Стан, від якого залежить вигляд кнопок; кнопки підписані на свої ключі
+ui_state = StateStore()
+widget_layers = {}
 
-# Лічильник кадрів для оптимізації
-frame_count = 0
-MOTION_DETECT_FRAME_SKIP = 5 # Аналізувати кожен 5-й кадр
+# Аналізувати кожен 5-й кадр (за лічильником кадрів pipeline)
+MOTION_DETECT_FRAME_SKIP = 5
 
 # Поріг яскравості для детекції на тепловій камері (0-255)
 THERMAL_DETECTION_THRESHOLD = 200
@@ -210,19 +431,43 @@ motion_detector = MotionDetector(
     var_threshold=700       # Збільшено з 50. Робить детектор менш чутливим до змін освітлення.
 )
 
-# Ініціалізація аудіоплеєра
-audio_player = AudioPlayer("/home/laserlab/LD_PROJECT/alarm-clock-beep-1_zjgin-vd.mp3")
+# Аналіз теплового кадру (гаряча точка, статистика, гарячі зони) у кожному кадрі
+# камери 1, незалежно від детекції руху
+THERMAL_ANALYSIS = True
+thermal_analyzer = ThermalAnalyzer(scale=0.25, offset=50, min_blob_area=200)
+thermal_stats = None
+
+# Часове шумозаглушення (режим "denoise"): нічна CSI камера та теплова камера
+temporal_denoiser = TemporalDenoiser(alpha=0.25, motion_threshold=14)
+
+# Стабілізація при зумі: зсуває вікно зуму проти тремтіння (клавіша 's' / кнопка Stabilize)
+stabilization_active = False
+stabilizer = Stabilizer(scale=0.25, smoothing=0.9, budget_ms=3.0)
+stab_frame_idx = -1
 
-# Ініціалізація аудіоплеєра
-audio_player_ondetect = AudioPlayer("/home/laserlab/LD_PROJECT/audio-editor-output.mp3")
+# Звукові сповіщення: звуки декодуються один раз, кожен на своєму каналі мікшера.
+# Ініціалізація у фоні (імпорт pygame та mixer.init — сотні мс)
+alerts = AlertEngine(buffer=ALERT_BUFFER_SAMPLES)
+alerts.register("motion_on", "/home/laserlab/LD_PROJECT/alarm-clock-beep-1_zjgin-vd.mp3", cooldown=0.5)
+alerts.register("detection", "/home/laserlab/LD_PROJECT/audio-editor-output.mp3",
+                cooldown=ALERT_DETECTION_COOLDOWN, max_per_minute=ALERT_DETECTION_MAX_PER_MINUTE)
+startup.background("audio", alerts.start)
 
 # Video playback
 video_playing = False
 video_cap = None
+video_path = None
+video_events = EventIndex()
+video_frame_count = 0
+# Перехід до події починається трохи раніше, щоб було видно її початок
+EVENT_PRE_ROLL_SEC = 1.0
+
+# Час останнього виявленого руху (для подій віддаленого керування)
+last_motion_time = 0.0
+MOTION_EVENT_INTERVAL = 1.0
 
 # mouse state
-mouse_pressed_name = None
-mouse_pressed_rect = None
+mouse_pressed_widget = None
 mouse_pressed_set = None
 
 # HLS buttons layout
@@ -230,16 +475,91 @@ HLS_BTN_SIZE = 40
 HLS_BTN_SPACING = 10
 HLS_BTN_X_START = 200
 HLS_BTN_Y_START = 10
+MOSAIC_BTN_W = 60
+
+# --- Метрики продуктивності (/metrics та оверлей по клавіші 'p') ---
+PERF_OVERLAY_REFRESH = 0.5
+perf_overlay_lines = []
+perf_overlay_time = 0.0
+metrics = MetricsRegistry()
+metrics.counter("dropped_frames_total", "Frames lost to capture read failures")
+metrics.counter("stream_dropped_frames_total", "Frames overwritten before the MJPEG encoder took them",
+                func=lambda: frame_broadcaster.dropped)
+metrics.gauge("fps", "Rendered frames per second")
+metrics.gauge("cpu_percent", "Process CPU usage, 100 = one core")
+metrics.gauge("rss_bytes", "Resident set size")
+metrics.gauge("soc_temp_celsius", "SoC temperature")
+metrics.gauge("lrf_rtt_ms", "Last rangefinder request/response time")
+metrics.gauge("lrf_readings_per_second", "Rangefinder responses per second (last 5 s)",
+              func=lambda: lrf_telemetry.rate()[0])
+metrics.gauge("v4l2_decode_ms", "Mean MJPEG decode time of the V4L2 camera",
+              func=lambda: getattr(cap, "decode_ms", 0.0))
+# Запис синхронний (VideoWriter.write в етапі record), черги немає — експортується час етапу
+metrics.gauge("record_ms", "Last record stage time (synchronous VideoWriter.write)",
+              func=lambda: pipeline.get("record").timer.last_ns / 1e6)
+metrics.gauge("stream_pending_frames", "Frames waiting for the MJPEG encoder",
+              func=lambda: frame_broadcaster.pending_frames)
+metrics.gauge("hls_pending_frames", "Frames waiting to be written to the HLS encoder",
+              func=lambda: hls_output.pending_frames if hls_output else 0)
+metrics.gauge("snapshot_queue_depth", "Snapshot frames waiting for JPEG encoding",
+              func=lambda: snapshots.pending)
+metrics.gauge("storage_delete_queue_depth", "Recordings waiting for background deletion",
+              func=lambda: storage.pending)
+metrics.counter("alerts_played_total", "Alert sounds played", func=lambda: alerts.played_total)
+metrics.counter("alerts_suppressed_total", "Alert sounds dropped by debounce or rate limit",
+                func=lambda: alerts.suppressed_total)
+metrics.gauge("action_queue_depth", "Pending remote control actions", func=lambda: remote_control.pending_count)
+metrics.gauge("stream_clients", "Connected MJPEG clients", func=lambda: frame_broadcaster.client_count)
+metrics.gauge("warm_standby_sources", "Sources kept open by the warm standby pool",
+              func=lambda: len(standby_pool.keys()))
+metrics.gauge("warm_standby_opening", "Warm standby sources still being opened",
+              func=lambda: standby_pool.opening)
+metrics.start()
+hotspot.add_route("/metrics", metrics.serve_metrics)
+hotspot.add_route("/api/lrf.json", lrf_telemetry.serve_json)
+hotspot.add_route("/api/lrf.csv", lrf_telemetry.serve_csv)
+
+# Мозаїка потоків
+mosaic = MosaicView(FRAME_W, FRAME_H, cpu_budget=MOSAIC_CPU_BUDGET, max_fps=MOSAIC_MAX_FPS)
 
 # Close btn for playback
 close_x = close_y = close_w = close_h = 0
 
-# Blink start
-blink_start_time = time.time()
-
 # --- Функції для камер / HLS ---
-def open_camera(index):
-    global current_hls_idx
+def stream_options(stream):
+    """Опції FFmpeg для потоку: транспорт RTSP з налаштувань джерела."""
+    transport = stream.get("transport", "auto")
+    return {"rtsp_transport": transport} if transport != "auto" else {}
+
+def open_stream_capture(stream, width, height):
+    """Відкриває потік з hls_streams з його налаштуваннями (роздільність, fps, транспорт)."""
+    url = stream["url"]
+    width, height = stream.get("width", width), stream.get("height", height)
+    fps = stream.get("fps", FPS)
+    if url.startswith("sim://"):
+        return open_sim_source(url, width, height, fps=fps)
+    options = stream_options(stream)
+    try:
+        cap = HLSVideo(url, fps=fps, width=width, height=height, options=options)
+        # якщо у HLSVideo є isOpened:
+        if hasattr(cap, "isOpened"):
+            if not cap.isOpened():
+                print("HLSVideo не відкрився, пробуємо OpenCV")
+        return cap
+    except Exception as e:
+        print("HLSVideo error:", e)
+        # fallback to cv2
+        if options:
+            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = ";".join(f"{k};{v}" for k, v in options.items())
+        cap = cv2.VideoCapture(url)
+        os.environ.pop("OPENCV_FFMPEG_CAPTURE_OPTIONS", None)
+        return cap
+
+def open_camera(index, hls_idx=None):
+    """
+    Відкриває джерело за індексом device_list.
+    hls_idx дозволяє відкрити конкретний HLS потік (напр. для warm standby у фоні).
+    """
     source = None
     try:
         source = device_list[index]
@@ -249,22 +569,19 @@ def open_camera(index):
     if isinstance(source, str):
         # HLS case: third index (2)
         if index == 2 and hls_streams:
-            url = hls_streams[current_hls_idx]["url"]
-            try:
-                cap = HLSVideo(url, fps=FPS, width=FRAME_W, height=FRAME_H)
-                # якщо у HLSVideo є isOpened:
-                if hasattr(cap, "isOpened"):
-                    if not cap.isOpened():
-                        print("HLSVideo не відкрився, пробуємо OpenCV")
-                return cap
-            except Exception as e:
-                print("HLSVideo error:", e)
-                # fallback to cv2
-                cap = cv2.VideoCapture(url)
-                return cap
+            return open_stream_capture(hls_streams[current_hls_idx if hls_idx is None else hls_idx], FRAME_W, FRAME_H)
+
+        # Симульоване джерело (sim://synthetic, sim://thermal, sim://file/...)
+        if source.startswith("sim://"):
+            return open_sim_source(source, FRAME_W, FRAME_H, fps=FPS)
 
         # /dev/video* device
         if source.startswith("/dev/"):
+            if V4L2_MJPEG:
+                cap = V4L2MjpegCapture(source, *(V4L2_CAPTURE_SIZE or (None, None)), fps=FPS,
+                                       output_size=(FRAME_W, FRAME_H))
+                if cap.isOpened():
+                    return cap
             cap = cv2.VideoCapture(source, cv2.CAP_V4L2)
             if not cap.isOpened():
                 cap = cv2.VideoCapture(source)
@@ -287,8 +604,54 @@ def open_camera(index):
         # other types
         return None
 
+# --- Warm standby пул ---
+standby_pool = WarmStandbyPool(
+    budget_mb=WARM_STANDBY_BUDGET_MB if WARM_STANDBY_ENABLED else 0,
+    frame_shape=(FRAME_H, FRAME_W),
+    max_entries=WARM_STANDBY_MAX_ENTRIES,
+    bandwidth_mbps=WARM_STANDBY_BANDWIDTH_MBPS,
+    live_mbps=WARM_STANDBY_LIVE_MBPS,
+)
+
+def source_key(cam_idx, hls_idx=None):
+    """Ключ джерела в пулі: камера за індексом або HLS потік за URL."""
+    if cam_idx == 2:
+        idx = current_hls_idx if hls_idx is None else hls_idx
+        return ("hls", hls_streams[idx]["url"] if hls_streams else "")
+    return ("cam", cam_idx)
+
+def acquire_source(cam_idx):
+    """Бере тепле джерело з пулу або відкриває його заново."""
+    # Живі потоки вичитуються в пулі з частотою джерела — пропускати кадри не потрібно
+    source = standby_pool.take(source_key(cam_idx), flush=0 if cam_idx == 2 else 3, wait=WARM_STANDBY_TAKE_WAIT)
+    if source is not None:
+        return source
+    return open_camera(cam_idx)
+
+def park_source(cam_idx, source):
+    """Повертає джерело в пул замість release() (або закриває, якщо пул вимкнено)."""
+    standby_pool.put(source_key(cam_idx), source, drain=cam_idx == 2)
+
+def prefetch_next_source():
+    """Прогріває джерело, на яке користувач найімовірніше перемкнеться далі."""
+    if not standby_pool.enabled:
+        return
+    if current_cam_idx == 2:
+        if not hls_streams:
+            return
+        next_hls = stream_health.next_healthy(current_hls_idx)
+        if next_hls is not None:
+            standby_pool.prefetch(source_key(2, next_hls), lambda i=next_hls: open_camera(2, i), drain=True)
+        return
+    next_cam = (current_cam_idx + 1) % len(device_list)
+    if next_cam == 2 and not hls_streams:
+        return
+    standby_pool.prefetch(source_key(next_cam), lambda i=next_cam: open_camera(i), drain=next_cam == 2)
+
 # Запускаємо стартову камеру
+timeline.mark("camera open start")
 cap = open_camera(current_cam_idx)
+timeline.mark("camera open")
 if cap is None or (hasattr(cap, "isOpened") and not cap.isOpened()):
     print("Не вдалося відкрити початкову камеру:", device_list[current_cam_idx])
     # спробуємо /dev/video0
@@ -298,47 +661,83 @@ if cap is None or (hasattr(cap, "isOpened") and not cap.isOpened()):
         print("Критична помилка: не знайдено доступних камер.")
         # не робимо exit — даємо шанс запустити і перевірити
         # sys.exit(1)
+startup.after_first_frame("warm standby", prefetch_next_source)
 
-# --- Enhancement filter ---
-def enhance_image(frame):
-    alpha, beta = 1.8, 20
-    frame_enhanced = cv2.convertScaleAbs(frame, alpha=alpha, beta=beta)
-    kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-    return cv2.filter2D(frame_enhanced, -1, kernel)
-
-# --- Функція для малювання тексту з підтримкою UTF-8 ---
-def draw_text_pil(frame, text, pos, font, color=(255, 255, 255)):
+# --- Buttons system (HUD/Menu) ---
+# Кнопки, що світяться зеленим, поки увімкнено відповідний стан
+BUTTON_ACTIVE_STATE = {
+    "enhance": "enhance_active",
+    "record": "recording",
+    "continuous_measure": "continuous_measure",
+    "motion_detect": "motion_detect",
+    "stabilize": "stabilize",
+}
+
+def button_depends(name):
+    """Ключі ui_state, від яких залежить вигляд кнопки."""
+    keys = ["hls"]
+    if name in ("single_measure", "continuous_measure", "crosshair"):
+        keys.append("lrf_available")
+    if name in ("crosshair", "single_measure"):
+        keys.append("continuous_measure")
+    if name in ("single_measure", "continuous_measure"):
+        keys.append("crosshair")
+    if name == "switch_cam":
+        keys.append("camera_label")
+    if name == "enhance":
+        keys.append("enhance_mode")
+    if name in BUTTON_ACTIVE_STATE:
+        keys.append(BUTTON_ACTIVE_STATE[name])
+    return keys
+
+def button_style(name, label, state):
     """
-    Малює текст на кадрі OpenCV за допомогою Pillow.
-    Підтримує UTF-8 символи.
+    Вигляд кнопки зі стану. Викликається лише після зміни її залежностей.
+    message — пояснення, що показується при натисканні на заблоковану кнопку.
     """
-    if not PIL_AVAILABLE or not font:
-        # Fallback до стандартного cv2.putText, якщо Pillow недоступний
-        # або шрифт не завантажено. Кирилиця не буде працювати.
-        cv2.putText(frame, text, pos, cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-        return frame
-
-    # Конвертуємо кадр OpenCV (BGR) в зображення Pillow (RGB)
-    img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(img_pil)
-
-    # Малюємо текст
-    draw.text(pos, text, font=font, fill=color)
-
-    # Конвертуємо назад в кадр OpenCV
-    frame = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
-    return frame
-
+    # Блокування всіх кнопок крім switch_cam при HLS
+    if state.get("hls") and name != "switch_cam":
+        return ButtonStyle(False, COLOR_DISABLED, label, "Кнопка вимкнена в режимі HLS", False)
+    if name in ("single_measure", "continuous_measure", "crosshair") and not state.get("lrf_available"):
+        return ButtonStyle(False, COLOR_DISABLED, label, "Далекомір недоступний", False)
+    if name in ("crosshair", "single_measure") and state.get("continuous_measure"):
+        return ButtonStyle(False, COLOR_DISABLED, label, "Спочатку зупиніть безперервне вимірювання", False)
+    if name in ("single_measure", "continuous_measure") and not state.get("crosshair"):
+        return ButtonStyle(False, COLOR_DISABLED, label, "Спочатку увімкніть приціл", False)
+    if name == "switch_cam":
+        return ButtonStyle(True, COLOR_NORMAL, state.get("camera_label", label), None, bool(state.get("hls")))
+    if name == "enhance" and state.get("enhance_mode") == "denoise":
+        label = "Denoise"
+    active = name in BUTTON_ACTIVE_STATE and state.get(BUTTON_ACTIVE_STATE[name])
+    return ButtonStyle(True, COLOR_ACTIVE if active else COLOR_NORMAL, label, None, False)
+
+def sync_ui_state():
+    """
+    Переносить глобальний стан у ui_state. Викликається щокадру, але кнопки
+    отримують сповіщення лише про ключі, що справді змінилися.
+    """
+    ui_state.update(
+        hls=current_cam_idx == 2,
+        lrf_available=bool(lrf_sensor.is_available),
+        continuous_measure=continuous_measure,
+        crosshair=show_crosshair,
+        enhance_active=enhance_mode != "off",
+        enhance_mode=enhance_mode,
+        recording=recording,
+        motion_detect=motion_detection_active,
+        stabilize=stabilization_active,
+        camera_label=camera_labels[current_cam_idx],
+    )
 
-# --- Buttons system (HUD/Menu) ---
 def create_button_set(name, buttons_dict):
-    button_sets[name] = buttons_dict
-    for btn in buttons_dict.keys():
-        button_pressed[btn] = False
+    """buttons_dict: {name: (x, y, w, h, label)}. Повторний виклик замінює набір."""
+    if name in widget_layers:
+        widget_layers[name].clear()
+    widget_layers[name] = WidgetLayer.from_layout(ui_state, buttons_dict, style=button_style, depends=button_depends)
 
 def set_active_button_set(name):
     global active_set
-    if name in button_sets:
+    if name in widget_layers:
         active_set = name
 
 create_button_set("HUD", {
@@ -351,39 +750,80 @@ create_button_set("HUD", {
     "enhance": (10, 370, 150, 50, "Enhance"),
     "record": (10, 430, 150, 50, "Record"),
     "play": (10, 490, 150, 50, "Play"),
-    "motion_detect": (10, 550, 150, 50, "Motion Detect")
+    "motion_detect": (10, 550, 150, 50, "Motion Detect"),
+    # Права колонка, під панеллю HUD
+    "stabilize": (FRAME_W - 160, 300, 150, 50, "Stabilize"),
+    "snapshot": (FRAME_W - 160, 360, 150, 50, "Snapshot"),
+    "burst": (FRAME_W - 160, 420, 150, 50, "Burst"),
 })
 
 def update_switch_cam_label():
-    if "HUD" in button_sets and "switch_cam" in button_sets["HUD"]:
-        x, y, w, h, _ = button_sets["HUD"]["switch_cam"]
-        button_sets["HUD"]["switch_cam"] = (x, y, w, h, camera_labels[current_cam_idx])
+    ui_state.set("camera_label", camera_labels[current_cam_idx])
 
 # --- Recording / menu files ---
+# Поточний запис і відео, що відтворюється, не витісняються
+storage = StorageManager(RECORD_DIR, quota_mb=STORAGE_QUOTA_MB, min_free_mb=STORAGE_MIN_FREE_MB,
+                         critical_free_mb=STORAGE_CRITICAL_FREE_MB, delete_mb_per_s=STORAGE_DELETE_MB_PER_S,
+                         protect=lambda: (recording_path, video_path))
+startup.after_first_frame("storage", storage.start)
+
+snapshots = SnapshotWriter(SNAPSHOT_DIR, workers=SNAPSHOT_WORKERS, quality=SNAPSHOT_JPEG_QUALITY,
+                           max_pending=SNAPSHOT_BURST_COUNT + 2)
+startup.after_first_frame("snapshots", snapshots.start)
+
+def take_snapshot(count=1):
+    """Замовляє знімок або серію; кадри захоплює етап snapshot наступних кадрів."""
+    if not snapshots.request(count):
+        hud.show_message("Snapshot busy")
+
 def start_or_stop_recording():
-    global recording, video_writer
+    global recording, recording_path, video_writer, metadata_writer, event_recorder
     if not os.path.exists(RECORD_DIR):
         os.makedirs(RECORD_DIR)
     if not recording:
+        if not storage.can_record():
+            storage.wake()
+            hud.show_message("Storage full")
+            print("⚠️ Недостатньо місця для запису")
+            return
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = os.path.join(RECORD_DIR, f"rec_{timestamp}.mp4")
         video_writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*'mp4v'), FPS, (FRAME_W, FRAME_H))
+        metadata_writer = MetadataWriter(sidecar_path(filename), fps=FPS, info={
+            "video": os.path.basename(filename), "width": FRAME_W, "height": FRAME_H, "cameras": camera_labels})
+        event_recorder = EventRecorder(events_path(filename), fps=FPS, gap_frames=int(2 * FPS))
         recording = True
+        recording_path = filename
+        storage.wake()
         print("▶️ Запис стартував:", filename)
     else:
         recording = False
         if video_writer:
             video_writer.release()
             video_writer = None
+        if metadata_writer:
+            metadata_writer.close()
+            metadata_writer = None
+        if event_recorder:
+            event_recorder.close()
+            event_recorder = None
+        recording_path = None
         print("⏹ Запис зупинено")
 
 def update_menu_files():
     global menu_files
     if not os.path.exists(RECORD_DIR):
         os.makedirs(RECORD_DIR)
-    menu_files = sorted([f for f in os.listdir(RECORD_DIR) if f.endswith(".mp4")],
-                        key=lambda x: os.path.getmtime(os.path.join(RECORD_DIR, x)),
-                        reverse=True)
+    mtimes = {}
+    for f in os.listdir(RECORD_DIR):
+        if not f.endswith(".mp4") or storage.is_pending(f):
+            continue
+        try:
+            mtimes[f] = os.path.getmtime(os.path.join(RECORD_DIR, f))
+        except OSError:
+            # Запис видалили між listdir і stat (фонове витіснення)
+            continue
+    menu_files = sorted(mtimes, key=mtimes.get, reverse=True)
 
 def get_menu_buttons(page):
     buttons = {}
@@ -414,13 +854,12 @@ def get_menu_buttons(page):
     return buttons
 
 def refresh_menu_buttons():
-    global button_sets
     update_menu_files()
-    button_sets["Menu"] = get_menu_buttons(menu_page)
+    create_button_set("Menu", get_menu_buttons(menu_page))
 
 # --- Video playback ---
 def start_video(filename):
-    global video_playing, video_cap
+    global video_playing, video_cap, video_path, video_events, video_frame_count
     filepath = os.path.join(RECORD_DIR, filename)
     if not os.path.exists(filepath):
         print("Файл не знайдено:", filepath)
@@ -429,34 +868,101 @@ def start_video(filename):
     if not video_cap.isOpened():
         print("Не вдалося відкрити відео:", filepath)
         return
+    video_path = filepath
+    video_events = EventIndex.load(events_path(filepath))
+    video_frame_count = int(video_cap.get(cv2.CAP_PROP_FRAME_COUNT) or video_events.frames or 0)
     video_playing = True
 
+# Смуга часу з мітками подій руху: ліворуч від панелі часу
+PLAYBACK_TIMELINE = (20, FRAME_H - 40, FRAME_W - 270, 20)
+# Кнопки переходу між подіями поруч із Close (x, y, w, h)
+PLAYBACK_PREV_EVENT = (FRAME_W - 130, FRAME_H - 45, 55, 25)
+PLAYBACK_NEXT_EVENT = (FRAME_W - 70, FRAME_H - 45, 55, 25)
+
+def seek_video(frame_idx):
+    """Перехід на кадр: декодер стає на найближчий ключовий кадр і декодує до потрібного."""
+    video_cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, min(int(frame_idx), video_frame_count - 1)))
+
+def seek_motion_event(direction):
+    """Перехід до наступної (direction > 0) або попередньої події руху."""
+    pos = int(video_cap.get(cv2.CAP_PROP_POS_FRAMES))
+    fps = video_events.fps or FPS
+    pre_roll = int(EVENT_PRE_ROLL_SEC * fps)
+    # Після переходу позиція = start - pre_roll, тож порівнюємо з урахуванням pre_roll
+    if direction > 0:
+        event = video_events.next_event(pos + pre_roll)
+    else:
+        event = video_events.prev_event(pos + pre_roll, margin=int(fps))
+    if event is not None:
+        seek_video(event.start - pre_roll)
+
+def seek_timeline(x):
+    """Дотик до смуги часу: до події під пальцем (±8 px) або просто на цю позицію."""
+    tx, _, tw, _ = PLAYBACK_TIMELINE
+    total = max(1, video_frame_count)
+    frame_idx = (x - tx) * total // tw
+    tolerance = 8 * total // tw
+    event = video_events.prev_event(frame_idx + tolerance + 1)
+    if event is not None and event.end >= frame_idx - tolerance:
+        seek_video(event.start - int(EVENT_PRE_ROLL_SEC * (video_events.fps or FPS)))
+    else:
+        seek_video(frame_idx)
+
+def draw_playback_timeline(frame, pos):
+    x, y, w, h = PLAYBACK_TIMELINE
+    total = max(1, video_frame_count)
+    band = frame[y:y + h, x:x + w]
+    cv2.convertScaleAbs(band, dst=band, alpha=0.4)
+    for event in video_events.events:
+        x1 = x + event.start * w // total
+        x2 = min(x + w, max(x1 + 3, x + (event.end + 1) * w // total))
+        cv2.rectangle(frame, (x1, y + 3), (x2, y + h - 3), (0, 0, 255), -1)
+    px = x + min(pos, total) * w // total
+    cv2.line(frame, (px, y - 4), (px, y + h + 4), (255, 255, 255), 2)
+    if video_events:
+        cv2.putText(frame, f"Motion events: {len(video_events)}  (b / n)", (x, y - 8),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        for (bx, by, bw, bh), label in ((PLAYBACK_PREV_EVENT, "<Ev"), (PLAYBACK_NEXT_EVENT, "Ev>")):
+            cv2.rectangle(frame, (bx, by), (bx + bw, by + bh), (0, 100, 200), -1)
+            cv2.putText(frame, label, (bx + 8, by + 18), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2)
+    return frame
+
 def stop_video():
-    global video_playing, video_cap
+    global video_playing, video_cap, video_path
     if video_cap:
         video_cap.release()
     video_playing = False
+    video_path = None
     set_active_button_set("Menu")
     refresh_menu_buttons()
 
 # --- Measures / camera switching ---
+def record_lrf(result):
+    """
+    Записує відповідь далекоміра в телеметрію й оновлює distance_text.
+    ld.LRF повертає (мін, макс), ldtest.LRF — число: обидва нормалізує LRFTelemetry.
+    """
+    global distance_text
+    lrf_telemetry.record(result)
+    distance = lrf_telemetry.display_distance()
+    distance_text = f"Distance: {distance:.1f} m" if distance is not None else "Distance: N/A"
+
 def do_single_measure():
     global hud
     if not lrf_sensor.is_available:
         hud.show_message("Помилка: далекомір недоступний")
         return
 
-    global distance_text, lrf_powered
+    global lrf_powered
     if not lrf_powered:
         lrf_sensor.power_on()
         lrf_powered = True
         time.sleep(0.3) # Даємо час на ініціалізацію
 
+    lrf_start = time.perf_counter()
     result = lrf_sensor.get_single_measurement()
-    if result:
-        distance_text = f"Distance: {result:.1f} m"
-    else:
-        distance_text = "Distance: N/A"
+    metrics.set("lrf_rtt_ms", (time.perf_counter() - lrf_start) * 1000.0)
+    record_lrf(result)
     hud.show_message("Single measurement done")
 
 def switch_camera():
@@ -468,23 +974,24 @@ def switch_camera():
         hud.show_message("Motion Detection OFF (camera switched)")
 
     motion_detector.reset() # Скидаємо детектор при зміні камери
+    temporal_denoiser.reset()
+    stabilizer.reset()
     
     previous_cam_idx = current_cam_idx
-    
-    try:
-        cap.release()
-    except Exception:
-        pass
+
+    # Поточне джерело не закриваємо, а лишаємо теплим у пулі
+    park_source(previous_cam_idx, cap)
     current_cam_idx = (current_cam_idx + 1) % len(device_list)
-    cap = open_camera(current_cam_idx)
+    cap = acquire_source(current_cam_idx)
     if not cap or (hasattr(cap, "isOpened") and not cap.isOpened()):
         cam_name = camera_labels[current_cam_idx]
         hud.show_message(f"Error: {cam_name} not found")
         print(f"Помилка: не вдалося відкрити камеру {cam_name}")
         # Повертаємось до попередньої камери
         current_cam_idx = previous_cam_idx
-        cap = open_camera(current_cam_idx)
+        cap = acquire_source(current_cam_idx)
     update_switch_cam_label()
+    prefetch_next_source()
 
 
 # --- HLS stream switching ---
@@ -499,18 +1006,139 @@ def switch_hls_stream(index):
     if index < 0 or index >= len(hls_streams):
         motion_detector.reset() # Скидаємо детектор при зміні стріму
         return
+    if current_cam_idx == 2:
+        # Поточний потік лишаємо теплим у пулі
+        park_source(2, cap)
+        cap = None
     current_hls_idx = index
     # Оновлюємо device_list[2] на новий URL (на випадок, якщо іншими місцями звертаємось)
     device_list[2] = hls_streams[current_hls_idx]["url"]
-    try:
-        cap.release()
-    except Exception:
-        pass
     # Відкриваємо HLS (якщо зараз активна HTTP камера)
     if current_cam_idx == 2:
-        cap = open_camera(2)
+        cap = acquire_source(2)
+        prefetch_next_source()
     print(f"🔄 Перемикання HLS → {hls_streams[current_hls_idx]['name']}")
 
+# --- Мозаїка потоків ---
+def open_mosaic_source(stream, width, height):
+    """Відкриває потік для клітинки мозаїки одразу у зменшеній роздільності."""
+    url = stream["url"]
+    if url.startswith("sim://"):
+        return open_sim_source(url, width, height, fps=FPS)
+    if HLS_AVAILABLE:
+        return HLSVideo(url, fps=stream.get("fps", FPS), width=width, height=height, options=stream_options(stream))
+    return cv2.VideoCapture(url)
+
+def mosaic_sources():
+    return [(s["name"], lambda w, h, stream=s: open_mosaic_source(stream, w, h)) for s in hls_streams]
+
+def start_mosaic():
+    """Перемикає екран у мозаїку всіх HLS потоків."""
+    global cap
+    if not hls_streams or mosaic.active:
+        return
+    # Поточне джерело лишаємо теплим, щоб повернення було миттєвим
+    park_source(current_cam_idx, cap)
+    cap = None
+    mosaic.start(mosaic_sources())
+    hud.show_message("Mosaic: tap a tile to open it")
+
+def stop_mosaic(promote_idx=None):
+    """Виходить з мозаїки; promote_idx — потік, який відкрити на весь екран."""
+    global cap, current_cam_idx, current_hls_idx, motion_detection_active
+    mosaic.stop()
+    if promote_idx is not None and 0 <= promote_idx < len(hls_streams):
+        if motion_detection_active and (current_cam_idx != 2 or promote_idx != current_hls_idx):
+            motion_detection_active = False
+            hud.show_message("Motion Detection OFF (stream switched)")
+        motion_detector.reset()
+        current_cam_idx = 2
+        current_hls_idx = promote_idx
+        device_list[2] = hls_streams[current_hls_idx]["url"]
+        update_switch_cam_label()
+    cap = acquire_source(current_cam_idx)
+    prefetch_next_source()
+
+# --- Гаряче перезавантаження hls_streams.json ---
+def apply_camera_config(cameras):
+    """Оновлює джерела CSI/тепловізора; активне перевідкривається лише якщо змінилося його джерело."""
+    global cap
+    if not cameras or ARGS.sim:
+        return
+    for i, camera in enumerate(cameras):
+        camera_labels[i] = camera["label"]
+        if device_list[i] == camera["source"]:
+            continue
+        device_list[i] = camera["source"]
+        standby_pool.discard(source_key(i))
+        if i == current_cam_idx and not mosaic.active:
+            if cap:
+                cap.release()
+            cap = open_camera(i)
+        print(f"🔧 Камера {i}: {camera['source']}")
+    update_switch_cam_label()
+
+def apply_stream_config(config):
+    """
+    Застосовує нову конфігурацію потоків у основному циклі.
+    Активний потік не перевідкривається, якщо його URL залишився в списку,
+    навіть коли змінився порядок чи налаштування (вони діють з наступного відкриття, ROI — одразу).
+    """
+    global hls_streams, current_hls_idx, cap, current_cam_idx, streams_config
+    apply_camera_config(config.cameras)
+    diff = diff_streams(hls_streams, config.streams)
+    streams_config = config
+    if not (diff.added or diff.removed or diff.changed) and \
+            [s["url"] for s in hls_streams] == [s["url"] for s in config.streams]:
+        return
+
+    active_url = hls_streams[current_hls_idx]["url"] if hls_streams else None
+    # Теплі з'єднання видалених потоків та відкриті зі старими налаштуваннями більше не потрібні
+    for url in diff.removed + diff.changed:
+        if url != active_url:
+            standby_pool.discard(("hls", url))
+
+    hls_streams = config.streams
+    stream_health.set_streams(hls_streams)
+    if hls_streams and not startup.waiting_first_frame:
+        stream_health.start()
+
+    urls = [s["url"] for s in hls_streams]
+    if active_url in urls:
+        current_hls_idx = urls.index(active_url)
+    else:
+        current_hls_idx = 0
+        if current_cam_idx == 2 and not mosaic.active:
+            # Активний потік видалено з файлу
+            if cap:
+                cap.release()
+            cap = None
+            if not hls_streams:
+                current_cam_idx = 0
+            cap = acquire_source(current_cam_idx)
+            motion_detector.reset()
+    device_list[2] = hls_streams[current_hls_idx]["url"] if hls_streams else ""
+
+    if mosaic.active and (diff.added or diff.removed):
+        mosaic.stop()
+        if hls_streams:
+            mosaic.start(mosaic_sources())
+        else:
+            current_cam_idx = 0
+            cap = acquire_source(current_cam_idx)
+    update_switch_cam_label()
+    prefetch_next_source()
+    print(f"🔧 {STREAMS_JSON}: +{len(diff.added)} -{len(diff.removed)} ~{len(diff.changed)}")
+    hud.show_message(f"Streams updated: +{len(diff.added)} -{len(diff.removed)} ~{len(diff.changed)}")
+
+config_watcher = ConfigWatcher(STREAMS_JSON) if STREAMS_HOT_RELOAD else None
+if config_watcher:
+    startup.after_first_frame("config watcher", config_watcher.start)
+
+def mosaic_button_rect():
+    x = HLS_BTN_X_START + len(hls_streams) * (HLS_BTN_SIZE + HLS_BTN_SPACING)
+    return x, HLS_BTN_Y_START, MOSAIC_BTN_W, HLS_BTN_SIZE
+
 # --- Button callback ---
 def menu_button_callback(name):
     global menu_page
@@ -524,16 +1152,21 @@ def menu_button_callback(name):
     elif name == "back":
         set_active_button_set("HUD")
     elif name == "delete_all":
-        for f in menu_files:
-            os.remove(os.path.join(RECORD_DIR, f))
+        # Видалення у фоні (storage_manager.py); меню одразу ховає файли з черги
+        protected = {os.path.basename(p) for p in (recording_path, video_path) if p}
+        count = storage.delete_async([f for f in menu_files if f not in protected])
         menu_page = 0
-        update_menu_files()
-        refresh_menu_buttons()
-        print("🗑 Усі файли видалено")
+        print(f"🗑 Файлів у черзі на видалення: {count}")
     refresh_menu_buttons()
 
+def toggle_stabilization():
+    global stabilization_active
+    stabilization_active = not stabilization_active
+    stabilizer.reset()
+    hud.show_message("Stabilization ON" if stabilization_active else "Stabilization OFF")
+
 def button_callback(name, pressed, current_set):
-    global show_crosshair, zoom, recording, enhance_active, continuous_measure, continuous_start_time
+    global show_crosshair, zoom, recording, enhance_mode, continuous_measure, continuous_start_time
     global lrf_powered, distance_text, video_playing, motion_detection_active
     if not pressed:
         return
@@ -552,8 +1185,7 @@ def button_callback(name, pressed, current_set):
             if show_crosshair:
                 lrf_sensor.power_on()
                 lrf_powered = True
-                result = lrf_sensor.get_single_measurement()
-                distance_text = f"Distance: {result:.1f} m" if result else "Distance: N/A"
+                record_lrf(lrf_sensor.get_single_measurement())
                 print("Приціл увімкнено, далекомір запущено")
             else:
                 lrf_sensor.power_off()
@@ -594,7 +1226,16 @@ def button_callback(name, pressed, current_set):
                 continuous_start_time = None
                 hud.show_message("Continuous measurement OFF")
         elif name == "enhance":
-            enhance_active = not enhance_active
+            enhance_mode = ENHANCE_MODES[(ENHANCE_MODES.index(enhance_mode) + 1) % len(ENHANCE_MODES)]
+            if enhance_mode == "denoise":
+                temporal_denoiser.reset()
+            hud.show_message(f"Image mode: {enhance_mode}")
+        elif name == "stabilize":
+            toggle_stabilization()
+        elif name == "snapshot":
+            take_snapshot()
+        elif name == "burst":
+            take_snapshot(SNAPSHOT_BURST_COUNT)
         elif name == "record":
             start_or_stop_recording()
         elif name == "play":
@@ -605,19 +1246,92 @@ def button_callback(name, pressed, current_set):
             if motion_detection_active:
                 motion_detector.reset() # Скидаємо стан при активації
                 hud.show_message("Motion Detection ON")
-                audio_player.play()
+                alerts.trigger("motion_on")
         elif name == "exit":
+            alerts.stop()
             if lrf_powered:
-                try:
-                    audio_player.stop()
-                except:
-                    pass
                 lrf_sensor.power_off()
             sys.exit(0)
 
+# --- Віддалене керування ---
+def dispatch_action(action, params):
+    """Виконує дію кнопки від віддаленого керування або сценарію (у потоці рендерингу)."""
+    global quit_requested
+    if action == "quit":
+        quit_requested = True
+        return
+    if video_playing:
+        return
+    if action == "perf_overlay":
+        hud.toggle_perf_overlay()
+        return
+    if action == "mosaic":
+        if mosaic.active:
+            stop_mosaic()
+        elif current_cam_idx == 2:
+            start_mosaic()
+        return
+    if action == "switch_hls":
+        if mosaic.active:
+            try:
+                stop_mosaic(int(params.get("index", -1)))
+            except (TypeError, ValueError):
+                pass
+        elif current_cam_idx == 2:
+            try:
+                switch_hls_stream(int(params.get("index", -1)))
+            except (TypeError, ValueError):
+                pass
+        return
+    # Те саме блокування, що й для дотику в режимі HLS
+    if current_cam_idx == 2 and action != "switch_cam":
+        hud.show_message("Кнопка вимкнена в режимі HLS")
+        return
+    if action == "burst":
+        try:
+            count = int(params.get("count", SNAPSHOT_BURST_COUNT))
+        except (TypeError, ValueError):
+            count = SNAPSHOT_BURST_COUNT
+        take_snapshot(max(1, min(count, snapshots.max_pending)))
+        return
+    button_callback(action, True, "HUD")
+
+def handle_remote_actions():
+    """Виконує дії, що надійшли через /api/action, у потоці рендерингу."""
+    for action, params in remote_control.poll_actions():
+        dispatch_action(action, params)
+
+def handle_scripted_actions():
+    """Виконує кроки сценарію (--script), час або кадр яких настав."""
+    for action, params in action_script.due(loop_frames, time.monotonic() - run_started):
+        print(f"🎬 Сценарій: {action} {params or ''}")
+        dispatch_action(action, params)
+
+def publish_remote_state():
+    """Передає стан клієнтам; події надсилаються лише для змінених полів."""
+    remote_control.update_state(
+        distance=distance_text,
+        zoom=round(zoom, 2),
+        crosshair=show_crosshair,
+        continuous_measure=continuous_measure,
+        enhance=enhance_mode != "off",
+        enhance_mode=enhance_mode,
+        recording=recording,
+        motion_detect=motion_detection_active,
+        stabilize=stabilization_active,
+        motion=time.time() - last_motion_time < 2.0,
+        camera=camera_labels[current_cam_idx],
+        camera_idx=current_cam_idx,
+        hls_idx=current_hls_idx,
+        hls_streams=[s["name"] for s in hls_streams],
+        playing=video_playing,
+        mosaic=mosaic.active,
+        perf_overlay=hud.perf_overlay,
+    )
+
 # --- Mouse handler (включає HLS кнопки) ---
 def mouse_event(event, x, y, flags, param):
-    global mouse_pressed_name, mouse_pressed_rect, mouse_pressed_set, video_playing
+    global mouse_pressed_widget, mouse_pressed_set, video_playing
     global close_x, close_y, close_w, close_h
 
    # Якщо відтворюється відео — кнопка Close
@@ -625,10 +1339,29 @@ def mouse_event(event, x, y, flags, param):
         if event == cv2.EVENT_LBUTTONUP:
             if close_x <= x <= close_x + close_w and close_y <= y <= close_y + close_h:
                 stop_video()
+                return
+            tx, ty, tw, th = PLAYBACK_TIMELINE
+            if tx <= x <= tx + tw and ty - 10 <= y <= ty + th + 10:
+                seek_timeline(x)
+            elif video_events:
+                for (bx, by, bw, bh), direction in ((PLAYBACK_PREV_EVENT, -1), (PLAYBACK_NEXT_EVENT, 1)):
+                    if bx <= x <= bx + bw and by <= y <= by + bh:
+                        seek_motion_event(direction)
+        return
+
+    # Мозаїка: дотик до клітинки відкриває потік на весь екран
+    if mosaic.active:
+        if event == cv2.EVENT_LBUTTONUP:
+            stop_mosaic(mosaic.tile_at(x, y))
         return
 
     # HLS кнопки (зверху)
     if current_cam_idx == 2 and hls_streams:
+        gx, gy, gw, gh = mosaic_button_rect()
+        if gy <= y <= gy + gh and gx <= x <= gx + gw:
+            if event == cv2.EVENT_LBUTTONUP:
+                start_mosaic()
+            return
         for i in range(len(hls_streams)):
             bx = HLS_BTN_X_START + i * (HLS_BTN_SIZE + HLS_BTN_SPACING)
             by = HLS_BTN_Y_START
@@ -637,33 +1370,28 @@ def mouse_event(event, x, y, flags, param):
                     switch_hls_stream(i)
                 return
 
-    if active_set not in button_sets:
+    layer = widget_layers.get(active_set)
+    if layer is None:
         return
 
     if event == cv2.EVENT_LBUTTONDOWN:
-        for name, data in button_sets[active_set].items():
-            if len(data) != 5:
-                continue
-            bx, by, bw, bh, label = data
-            if bx <= x <= bx + bw and by <= y <= by + bh:
-                # Блокування всіх кнопок крім switch_cam при HLS
-                if current_cam_idx == 2 and name != "switch_cam":
-                    hud.show_message("Кнопка вимкнена в режимі HLS")
-                    return
-                mouse_pressed_name = name
-                mouse_pressed_rect = (bx, by, bw, bh)
-                mouse_pressed_set = active_set
-                break
+        widget = layer.hit(x, y)
+        if widget is None:
+            return
+        # Стан міг змінитися після останнього кадру (напр. дією з пульта)
+        sync_ui_state()
+        widget.refresh(ui_state)
+        if not widget.style.enabled:
+            hud.show_message(widget.style.message)
+            return
+        mouse_pressed_widget = widget
+        mouse_pressed_set = active_set
         return
 
     if event == cv2.EVENT_LBUTTONUP:
-        if mouse_pressed_name and mouse_pressed_rect:
-            bx, by, bw, bh = mouse_pressed_rect
-            if bx <= x <= bx + bw and by <= y <= by + bh:
-                button_callback(mouse_pressed_name, True, mouse_pressed_set)
-            button_pressed[mouse_pressed_name] = False
-        mouse_pressed_name = None
-        mouse_pressed_rect = None
+        if mouse_pressed_widget and mouse_pressed_widget.contains(x, y):
+            button_callback(mouse_pressed_widget.name, True, mouse_pressed_set)
+        mouse_pressed_widget = None
         mouse_pressed_set = None
 
 # --- Малювання HLS кнопок ---
@@ -673,10 +1401,17 @@ def draw_hls_buttons(frame):
     for i, stream in enumerate(hls_streams):
         x = HLS_BTN_X_START + i * (HLS_BTN_SIZE + HLS_BTN_SPACING)
         y = HLS_BTN_Y_START
-        color = (0, 200, 0) if i == current_hls_idx else (100, 100, 100)
+        # Колір — стан потоку за фоновою перевіркою, біла рамка — активний потік
+        color = stream_health.color(i)
         cv2.rectangle(frame, (x, y), (x + HLS_BTN_SIZE, y + HLS_BTN_SIZE), color, -1)
+        if i == current_hls_idx:
+            cv2.rectangle(frame, (x, y), (x + HLS_BTN_SIZE, y + HLS_BTN_SIZE), (255, 255, 255), 3)
         # нумерація з 1
         cv2.putText(frame, str(i+1), (x + 12, y + 28), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
+    # кнопка мозаїки
+    gx, gy, gw, gh = mosaic_button_rect()
+    cv2.rectangle(frame, (gx, gy), (gx + gw, gy + gh), (0, 100, 200), -1)
+    cv2.putText(frame, "Grid", (gx + 8, gy + 27), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 2)
     # показати назву потоку
     name = hls_streams[current_hls_idx]["name"]
     cv2.putText(frame, name, (HLS_BTN_X_START, HLS_BTN_Y_START + HLS_BTN_SIZE + 20),
@@ -684,14 +1419,390 @@ def draw_hls_buttons(frame):
     return draw_text_pil(frame, name, (HLS_BTN_X_START, HLS_BTN_Y_START + HLS_BTN_SIZE + 5), FONT_HLS)
 
 
-# --- Налаштування вікна та колбек миші ---
-cv2.namedWindow("Camera HUD")
-cv2.setWindowProperty("Camera HUD", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-cv2.setMouseCallback("Camera HUD", mouse_event)
+# ---------------------------
+# --- Етапи обробки кадру ---
+# ---------------------------
+# Кожен етап отримує FrameContext і змінює ctx.frame на місці або замінює посилання.
+# Порядок і умови виконання задаються реєстрацією в `pipeline` нижче.
+# Нові кадри етапи пишуть у буфери frame_pool (dst=), які повертаються в пул
+# після кожного кадру — у сталому режимі pipeline не виділяє пам'ять під кадри.
+frame_pool = FramePool()
+read_shape = None  # Форма останнього прочитаного кадру — для буфера читання
+
+def stage_read(ctx):
+    """Читання кадру з активного джерела; при збої — перемикання джерела."""
+    global cap, read_shape
+    if cap is None:
+        cap = open_camera(current_cam_idx)
+
+    ret = False
+    frame = None
+    try:
+        if cap:
+            if read_shape is not None and (isinstance(cap, cv2.VideoCapture)
+                                           or getattr(cap, "read_accepts_buffer", False)):
+                # Читаємо у буфер пулу; інша роздільність — джерело виділить новий
+                ret, frame = cap.read(frame_pool.lease(read_shape, tag="read"))
+            elif hasattr(cap, "read"):
+                ret, frame = cap.read()
+            elif hasattr(cap, "isOpened") and cap.isOpened():
+                ret, frame = cap.read()
+    except Exception as e:
+        print("Помилка читання кадру:", e)
+        ret = False
+
+    if ret and frame is not None:
+        ctx.frame = frame
+        read_shape = frame.shape
+        return
+
+    try:
+        if cap: cap.release()
+    except Exception:
+        pass
+    # Мертве джерело не повинно потрапити в warm standby пул
+    cap = None
+    metrics.inc("dropped_frames_total")
+
+    # Спеціальна обробка для недоступних HLS стрімів: без послідовного
+    # перебору — беремо потік, який фонова перевірка вважає живим
+    if current_cam_idx == 2 and hls_streams:
+        failed_idx = current_hls_idx
+        stream_health.mark_failed(failed_idx)
+        next_idx = stream_health.next_healthy(failed_idx)
+        if next_idx is not None:
+            print(f"⚠️ HLS стрім '{hls_streams[failed_idx]['name']}' недоступний. Переключення на '{hls_streams[next_idx]['name']}'...")
+            hud.show_message("Stream unavailable, switching...")
+            switch_hls_stream(next_idx) # Ця функція оновить `cap`
+        else:
+            hud.show_message("All HLS streams failed, switching camera")
+            switch_camera()
+    else:
+        # Обробка для інших камер (CSI/USB)
+        cam_name = camera_labels[current_cam_idx]
+        print(f"⚠️ Камера {cam_name} недоступна.")
+        hud.show_message(f"No stream from: {cam_name}")
+        switch_camera()
+
+    time.sleep(0.5)
+    ctx.stop = True
+
+def stage_snapshot(ctx):
+    """Кадр джерела у повній роздільності, до зуму та HUD, — у чергу кодування знімків."""
+    distance = lrf_telemetry.display_distance()
+    snapshots.capture(ctx.frame, {
+        "time": round(time.time(), 3),
+        "camera": camera_labels[current_cam_idx],
+        "zoom": round(zoom, 2),
+        "distance_m": None if distance is None else round(distance, 1),
+    })
+
+def stage_resize(ctx):
+    frame = ctx.frame
+    if current_cam_idx == 2 and hls_streams and "roi" in hls_streams[current_hls_idx]:
+        # Обрізання потоку до області інтересу з налаштувань джерела
+        x, y, w, h = hls_streams[current_hls_idx]["roi"]
+        roi = frame[y:y + h, x:x + w]
+        if roi.size:
+            frame = roi
+    if frame.shape[1] != FRAME_W or frame.shape[0] != FRAME_H:
+        frame = cv2.resize(frame, (FRAME_W, FRAME_H),
+                           dst=frame_pool.lease((FRAME_H, FRAME_W) + frame.shape[2:], tag="resize"))
+    ctx.frame = frame
+    ctx.height, ctx.width = frame.shape[:2]
+
+def stage_stabilize(ctx):
+    """Оцінка тремтіння на повному кадрі; результат — зсув вікна зуму."""
+    global stab_frame_idx
+    if ctx.index != stab_frame_idx + 1:
+        # Етап пропускав кадри (зум 1x, інше джерело) — попередній кадр вже не сусідній
+        stabilizer.reset()
+    stab_frame_idx = ctx.index
+    stabilizer.update(ctx.frame)
+
+def stage_zoom(ctx):
+    offset = stabilizer.offset if stabilization_active else (0, 0)
+    ctx.frame = zoom_frame(ctx.frame, zoom, dst=frame_pool.like(ctx.frame, "zoom"), offset=offset)
+
+def stage_lrf(ctx):
+    """Безперервне вимірювання та автоматичне вимкнення за таймаутом."""
+    global continuous_measure, continuous_off_msg
+    lrf_start = time.perf_counter()
+    result = lrf_sensor.get_single_measurement()
+    metrics.set("lrf_rtt_ms", (time.perf_counter() - lrf_start) * 1000.0)
+    record_lrf(result)
+    if continuous_start_time:
+        elapsed = (time.time() - continuous_start_time) / 60.0
+        if elapsed >= CONTINUOUS_AUTO_OFF_MINUTES:
+            continuous_measure = False
+            continuous_off_msg = f"⚠️ Авто вимкнення через {CONTINUOUS_AUTO_OFF_MINUTES} хв"
+            print(continuous_off_msg)
+
+def stage_thermal_analysis(ctx):
+    """
+    Статистика теплового кадру до зуму, шумозаглушення та enhance/colormap —
+    по сирих рівнях яскравості всього кадру (одиночна гаряча точка не усереднюється).
+    """
+    global thermal_stats
+    thermal_stats = thermal_analyzer.analyze(ctx.frame)
+
+def stage_thermal_markers(ctx):
+    # Координати статистики — у кадрі до зуму; маркери переносяться у видиму область
+    rect = None
+    if zoom != 1.0:
+        offset = stabilizer.offset if stabilization_active else (0, 0)
+        rect = zoom_rect(ctx.frame.shape, zoom, offset)
+    ctx.frame = thermal_analyzer.draw(ctx.frame, thermal_stats, rect=rect)
+
+def stage_denoise(ctx):
+    frame = ctx.frame
+    ctx.frame = temporal_denoiser.apply(frame, dst=frame_pool.like(frame, "denoise"))
+
+def stage_enhance(ctx):
+    frame = ctx.frame
+    ctx.frame = enhance_image(frame, dst=frame_pool.like(frame, "enhance"),
+                              work=frame_pool.like(frame, "enhance"))
+
+def stage_thermal_colormap(ctx):
+    """Heatmap для теплової камери (коли увімкнена детекція руху)."""
+    frame = ctx.frame
+    ctx.frame = apply_thermal_colormap(frame, FONT_HUD, dst=frame_pool.like(frame, "thermal_colormap"),
+                                       gray=frame_pool.lease(frame.shape[:2], tag="thermal_colormap"))
+
+def stage_motion(ctx):
+    global last_motion_time, motion_frame_idx
+    motion_frame_idx = ctx.index
+    # Якщо це теплова камера, залишаємо лише "гарячі" області
+    if current_cam_idx == 1:
+        frame = ctx.frame
+        frame_for_detection = thermal_hot_mask(frame, dst=frame_pool.like(frame, "motion"),
+                                               gray=frame_pool.lease(frame.shape[:2], tag="motion"),
+                                               mask=frame_pool.lease(frame.shape[:2], tag="motion"))
+    else:
+        # detect_and_draw лише читає кадр для аналізу — копія не потрібна
+        frame_for_detection = ctx.frame
+
+    # Детектуємо на підготовленому кадрі, а малюємо на оригінальному 'frame'
+    ctx.frame, motion_found = motion_detector.detect_and_draw(frame_for_detection, ctx.frame)
+    if motion_found:
+        alerts.trigger("detection")
+        now = time.time()
+        if now - last_motion_time >= MOTION_EVENT_INTERVAL:
+            remote_control.emit("detection", {"time": now, "camera": camera_labels[current_cam_idx]})
+        last_motion_time = now
+
+def stage_crosshair(ctx):
+    frame = ctx.frame
+    center_x, center_y = ctx.width//2, ctx.height//2
+    cv2.line(frame, (center_x-20, center_y), (center_x+20, center_y), (0,0,255),2)
+    cv2.line(frame, (center_x, center_y-20), (center_x, center_y+20), (0,0,255),2)
+    cv2.circle(frame, (center_x, center_y), 5, (0,0,255), -1)
+    if distance_text != "Distance: N/A":
+        distance_display = distance_text.replace("Distance: ", "")
+        cv2.putText(frame, f"{distance_display}", (center_x + 25, center_y - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2)
+
+def stage_hud_panel(ctx):
+    """Напівпрозора панель HUD праворуч зверху та її текст."""
+    global continuous_off_msg
+    frame = ctx.frame
+    rect_w, rect_h = 300, 280
+    rect_x, rect_y = ctx.width - rect_w - 10, 10
+    # Змішування з сірим (50,50,50) навпіл лише в області панелі, на місці
+    panel = frame[rect_y:rect_y+rect_h+1, rect_x:rect_x+rect_w+1]
+    cv2.convertScaleAbs(panel, dst=panel, alpha=0.5, beta=25)
+
+    # HUD Text
+    line_y = rect_y + 30
+    if current_cam_idx == 2:
+        frame = draw_text_pil(frame, "Режим стрімінгу", (rect_x+10, line_y - 15), FONT_STREAM_MODE, (255,0,0))
+    else:
+        frame = draw_text_pil(frame, distance_text, (rect_x+10, line_y - 15), FONT_HUD_LARGE)
+        if continuous_measure and int(time.time()*2) % 2 == 0:
+            cv2.circle(frame, (rect_x+250, line_y-10), 8, (0,255,0), -1)
+        if continuous_measure:
+            line_y += 30
+            lock = "  LOCK" if lrf_telemetry.locked is not None else ""
+            frame = draw_text_pil(frame, f"LRF: {lrf_telemetry.rate()[1]:.1f}/с{lock}",
+                                  (rect_x+10, line_y - 15), FONT_HUD, (0,255,0) if lock else (255,255,255))
+        line_y += 30
+        frame = draw_text_pil(frame, f"Роздільність: {FRAME_W}x{FRAME_H}", (rect_x+10, line_y - 15), FONT_HUD)
+        if zoom > 1.0:
+            line_y += 30
+            frame = draw_text_pil(frame, f"Зум: {zoom:.2f}x", (rect_x+10, line_y - 15), FONT_HUD)
+        if current_cam_idx == 1 and THERMAL_ANALYSIS and thermal_stats is not None:
+            line_y += 30
+            frame = draw_text_pil(frame, f"Макс {thermal_stats.max} сер {thermal_stats.mean:.0f} "
+                                         f"p95 {thermal_stats.p95}", (rect_x+10, line_y - 15), FONT_HUD)
+            line_y += 30
+            frame = draw_text_pil(frame, f"Гарячих зон: {len(thermal_stats.blobs)}",
+                                  (rect_x+10, line_y - 15), FONT_HUD)
+        if recording:
+            line_y += 30
+            frame = draw_text_pil(frame, "ЗАПИС", (rect_x+10, line_y - 15), FONT_HUD, (0,0,255))
+        if continuous_off_msg:
+            line_y += 30
+            frame = draw_text_pil(frame, continuous_off_msg, (rect_x+10, line_y - 15), FONT_HUD, (0,200,255))
+    # Повідомлення про авто вимкнення показується лише в кадрі, де воно сталося
+    continuous_off_msg = ""
+    ctx.frame = frame
+
+def stage_buttons(ctx):
+    """Кнопки активного набору (HUD/Menu): готові спрайти, перемальовані лише при зміні стану."""
+    sync_ui_state()
+    widget_layers[active_set].draw(ctx.frame)
+
+def stage_hls_buttons(ctx):
+    ctx.frame = draw_hls_buttons(ctx.frame)
+
+def stage_hud_messages(ctx):
+    ctx.frame = hud.draw(ctx.frame)
+
+def stage_record(ctx):
+    video_writer.write(ctx.frame)
+    analysed = motion_frame_idx == ctx.index
+    if event_recorder is not None:
+        event_recorder.update(motion_detector.last_boxes if analysed else None, analysed)
+    if metadata_writer is not None:
+        lrf_status = lrf_telemetry.last_status
+        metadata_writer.append(time.time(), zoom, current_cam_idx,
+                               distance=lrf_telemetry.display_distance(),
+                               lrf_status=STATUS_NO_READING if lrf_status is None else lrf_status,
+                               boxes=motion_detector.last_boxes if analysed else None, motion=analysed)
+
+def stage_output(ctx):
+    """Кадр з HUD у вихідні sink-и (трансляція, файл, pipe) — до перф-оверлею."""
+    write_sinks(output_sinks, ctx.frame)
+
+def stage_remote_state(ctx):
+    publish_remote_state()
+
+def stage_perf_overlay(ctx):
+    """Перф-оверлей лише на локальному екрані (не потрапляє в запис і трансляцію)."""
+    global perf_overlay_lines, perf_overlay_time
+    now = time.monotonic()
+    if now - perf_overlay_time >= PERF_OVERLAY_REFRESH:
+        perf_overlay_lines = metrics.overlay_lines(pipeline)
+        perf_overlay_time = now
+    ctx.frame = hud.draw_perf(ctx.frame, perf_overlay_lines)
+
+def stage_display(ctx):
+    key = write_sinks(display_sinks, ctx.frame)
+    if startup.waiting_first_frame:
+        startup.first_frame()
+    if key == ord('q'):
+        ctx.quit = True
+    elif key == ord('p'):
+        hud.toggle_perf_overlay()
+    elif key == ord('s'):
+        toggle_stabilization()
+    elif key == ord('c') and current_cam_idx != 2:
+        take_snapshot()
+
+# Реєстрація етапів. Умови (when) перевіряються на кожному кадрі;
+# вимкнути етап без редагування циклу: pipeline.disable("enhance")
+# або VIDEOLD_DISABLE_STAGES=enhance,motion
+pipeline = FramePipeline("live")
+pipeline.add_stage("read", stage_read)
+pipeline.add_stage("snapshot", stage_snapshot, when=lambda: snapshots.wants_frame)
+pipeline.add_stage("resize", stage_resize)
+pipeline.add_stage("thermal_analysis", stage_thermal_analysis,
+                   when=lambda: THERMAL_ANALYSIS and current_cam_idx == 1)
+pipeline.add_stage("stabilize", stage_stabilize, when=lambda: stabilization_active and zoom != 1.0)
+pipeline.add_stage("zoom", stage_zoom, when=lambda: zoom != 1.0)
+pipeline.add_stage("lrf", stage_lrf, when=lambda: continuous_measure)
+pipeline.add_stage("denoise", stage_denoise, when=lambda: enhance_mode == "denoise")
+pipeline.add_stage("enhance", stage_enhance, when=lambda: enhance_mode == "enhance")
+pipeline.add_stage("thermal_colormap", stage_thermal_colormap,
+                   when=lambda: motion_detection_active and current_cam_idx == 1)
+pipeline.add_stage("motion", stage_motion,
+                   when=lambda: (motion_detection_active and current_cam_idx != 2
+                                 and frame_ctx.index % MOTION_DETECT_FRAME_SKIP == 0))
+pipeline.add_stage("thermal_markers", stage_thermal_markers,
+                   when=lambda: THERMAL_ANALYSIS and current_cam_idx == 1 and thermal_stats is not None)
+pipeline.add_stage("crosshair", stage_crosshair, when=lambda: show_crosshair)
+pipeline.add_stage("hud_panel", stage_hud_panel)
+pipeline.add_stage("buttons", stage_buttons, when=lambda: active_set in widget_layers and not video_playing)
+pipeline.add_stage("hls_buttons", stage_hls_buttons, when=lambda: current_cam_idx == 2 and bool(hls_streams))
+pipeline.add_stage("hud_messages", stage_hud_messages)
+pipeline.add_stage("record", stage_record, when=lambda: recording and video_writer is not None)
+pipeline.add_stage("output", stage_output, when=lambda: bool(output_sinks))
+pipeline.add_stage("remote_state", stage_remote_state)
+pipeline.add_stage("perf_overlay", stage_perf_overlay, when=lambda: hud.perf_overlay)
+pipeline.add_stage("display", stage_display)
+frame_ctx = FrameContext()
+metrics.attach_pipeline(pipeline)
+
+# VIDEOLD_TRACE_ALLOC=<кадрів розігріву>: облік алокацій по етапах (tracemalloc, повільно)
+alloc_warmup = int(os.environ.get("VIDEOLD_TRACE_ALLOC", "0") or 0)
+if alloc_warmup:
+    pipeline.alloc_tracker = AllocTracker(alloc_warmup, frame_pool)
+    pipeline.alloc_tracker.start()
+
+
+# --- Вихідні sink-и: вікно з колбеком миші або headless виходи ---
+# output_sinks отримують кадр до перф-оверлею, display_sinks — після
+output_sinks = [create_sink(spec, broadcaster=frame_broadcaster, fps=FPS)
+                for spec in ARGS.sink if spec not in ("mjpeg", "display")]
+if STREAM_SERVER_ENABLED:
+    output_sinks.append(create_sink("mjpeg", broadcaster=frame_broadcaster))
+display_sinks = []
+if not HEADLESS or "display" in ARGS.sink:
+    display_sinks.append(DisplaySink("Camera HUD", mouse_callback=mouse_event))
+elif not output_sinks:
+    output_sinks.append(create_sink("null"))
+
+def write_sinks(sinks, frame, delay=1):
+    """Передає кадр у sink-и; повертає код натиснутої клавіші або -1."""
+    key = -1
+    for sink in sinks:
+        k = sink.write(frame, delay)
+        if k != -1:
+            key = k
+    return key
+
+# Сценарій дій замість миші (--script)
+action_script = None
+if ARGS.script:
+    action_script = ActionScript.load(ARGS.script)
+    print(f"🎬 Сценарій {ARGS.script}: {len(action_script.steps)} кроків")
+quit_requested = False
+run_started = time.monotonic()
+# Кадри основного циклу в усіх режимах (камера, мозаїка, відтворення) — для сценарію та --max-frames;
+# frame_ctx.index рахує лише кадри pipeline камери
+loop_frames = 0
 
 # --- Основний цикл ---
 try:
     while True:
+        startup.poll()
+        if config_watcher:
+            new_config = config_watcher.poll()
+            if new_config is not None:
+                apply_stream_config(new_config)
+        for reason, count, freed in storage.poll():
+            if reason == "evict":
+                hud.show_message(f"Storage: removed {count} old clips")
+            else:
+                hud.show_message(f"Deleted {count} files ({freed / 1048576:.0f} MB)")
+            if active_set == "Menu":
+                refresh_menu_buttons()
+        for name, saved, requested, _ in snapshots.poll():
+            hud.show_message("Snapshot saved" if requested == 1 and saved else f"Saved {saved}/{requested}: {name}")
+        if recording and storage.critical:
+            start_or_stop_recording()
+            hud.show_message("Storage full - recording stopped")
+        handle_remote_actions()
+        if action_script:
+            handle_scripted_actions()
+        if quit_requested:
+            break
+        if ARGS.max_frames and loop_frames >= ARGS.max_frames:
+            break
+        if ARGS.duration and time.monotonic() - run_started >= ARGS.duration:
+            break
+        stream_health.set_active(current_cam_idx == 2)
+
         # Відтворення записаного відео
         if video_playing and video_cap:
             ret, frame = video_cap.read()
@@ -723,269 +1834,91 @@ try:
                           (50,50,50), -1)
             cv2.putText(frame, "Close", (close_x + 10, close_y + 18),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 2)
-            cv2.imshow("Camera HUD", frame)
-            if cv2.waitKey(int(1000/FPS)) & 0xFF == ord('q'):
+            frame = draw_playback_timeline(frame, int(video_cap.get(cv2.CAP_PROP_POS_FRAMES)))
+            key = write_sinks(output_sinks + display_sinks, frame, int(1000/FPS))
+            loop_frames += 1
+            metrics.frame_done()
+            if key == ord('q'):
                 stop_video()
+            elif key == ord('n'):
+                seek_motion_event(1)
+            elif key == ord('b'):
+                seek_motion_event(-1)
             continue
 
-        # Основна камера
-        if cap is None:
-            cap = open_camera(current_cam_idx)
-
-        ret = False
-        frame = None
-        try:
-            if cap:
-                if hasattr(cap, "read"):
-                    ret, frame = cap.read()
-                elif hasattr(cap, "isOpened") and cap.isOpened():
-                    ret, frame = cap.read()
-        except Exception as e:
-            print("Помилка читання кадру:", e)
-            ret = False
-
-        if not ret or frame is None:
-            try:
-                if cap: cap.release()
-            except Exception:
-                pass
-
-            # Спеціальна обробка для недоступних HLS стрімів
-            if current_cam_idx == 2 and hls_streams:
-                initial_hls_idx = current_hls_idx
-                switched = False
-                for i in range(len(hls_streams)):
-                    next_idx = (initial_hls_idx + 1 + i) % len(hls_streams)
-                    
-                    print(f"⚠️ HLS стрім '{hls_streams[current_hls_idx]['name']}' недоступний. Спроба переключення на '{hls_streams[next_idx]['name']}'...")
-                    hud.show_message(f"Stream unavailable, trying next...")
-                    
-                    switch_hls_stream(next_idx) # Ця функція оновить `cap`
-                    
-                    # Перевіряємо, чи відкрився новий стрім
-                    if cap and hasattr(cap, "isOpened") and cap.isOpened():
-                        ret, frame = cap.read()
-                        if ret and frame is not None:
-                            switched = True
-                            break # Знайшли робочий стрім, виходимо з циклу
-                
-                if not switched:
-                     hud.show_message("All HLS streams failed, switching camera")
-                     switch_camera()
-            else:
-                # Обробка для інших камер (CSI/USB)
-                cam_name = camera_labels[current_cam_idx]
-                print(f"⚠️ Камера {cam_name} недоступна.")
-                hud.show_message(f"No stream from: {cam_name}")
-                switch_camera()
-
-            time.sleep(0.5)
+        # Мозаїка потоків: декодери пишуть прямо в полотно, тут лише показ
+        if mosaic.active:
+            mosaic.update()
+            publish_remote_state()
+            key = write_sinks(output_sinks + display_sinks, mosaic.canvas, 30)
+            loop_frames += 1
+            metrics.frame_done()
+            if key == ord('q'):
+                stop_mosaic()
             continue
 
-        frame = cv2.resize(frame, (FRAME_W, FRAME_H))
-        h, w, _ = frame.shape
-        center_x, center_y = w//2, h//2
-
-        # Zoom
-        if zoom != 1.0:
-            nh, nw = int(h / zoom), int(w / zoom)
-            y1, y2 = center_y - nh//2, center_y + nh//2
-            x1, x2 = center_x - nw//2, center_x + nw//2
-            # захищені границі
-            y1, y2 = max(0, y1), min(h, y2)
-            x1, x2 = max(0, x1), min(w, x2)
-            frame = frame[y1:y2, x1:x2]
-            frame = cv2.resize(frame, (w, h))
-
-        # Continuous measure
-        continuous_off_msg = ""
-        if continuous_measure:
-            result = lrf_sensor.get_single_measurement()
-            distance_text = f"Distance: {result:.1f} m" if result else "Distance: N/A"
-            if continuous_start_time:
-                elapsed = (time.time() - continuous_start_time) / 60.0
-                if elapsed >= CONTINUOUS_AUTO_OFF_MINUTES:
-                    continuous_measure = False
-                    continuous_off_msg = f"⚠️ Авто вимкнення через {CONTINUOUS_AUTO_OFF_MINUTES} хв"
-                    print(continuous_off_msg)
-
-        # Enhance
-        if enhance_active:
-            frame = enhance_image(frame)
-
-        # Heatmap for Thermal Camera (when motion detection is on)
-        if motion_detection_active and current_cam_idx == 1:
-            # Припускаємо, що кадр з термокамери - відтінки сірого (навіть якщо у форматі BGR)
-            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            frame = cv2.applyColorMap(gray_frame, cv2.COLORMAP_JET)
-
-            # --- Малюємо шкалу температури (кольорову смугу) ---
-            bar_h = 200
-            bar_w = 25
-            # Координати головного HUD
-            hud_rect_x = w - 300 - 10
-            hud_rect_y = 10
-            # Розміщуємо шкалу всередині HUD, справа, з відступом 10px
-            bar_x = hud_rect_x + 300 - bar_w - 10
-            bar_y = hud_rect_y + (280 - bar_h) // 2 # Вертикально по центру HUD
-
-            # Створюємо градієнт від 255 до 0 (гарячий -> холодний)
-            gradient = np.arange(255, 0, -1, dtype=np.uint8).reshape(-1, 1)
-            
-            # Застосовуємо ту ж саму кольорову карту
-            colorbar_img = cv2.applyColorMap(gradient, cv2.COLORMAP_JET)
-            
-            # Змінюємо розмір до потрібного на екрані
-            colorbar_img = cv2.resize(colorbar_img, (bar_w, bar_h))
-
-            # Накладаємо шкалу на основний кадр
-            frame[bar_y:bar_y+bar_h, bar_x:bar_x+bar_w] = colorbar_img
-            frame = draw_text_pil(frame, "    Гар", (bar_x - 25, bar_y - 20), FONT_HUD, (255, 255, 255))
-            frame = draw_text_pil(frame, "    Хол", (bar_x - 30, bar_y + bar_h + 5), FONT_HUD, (255, 255, 255))
- 
-        # Motion Detection
-        frame_count += 1
-        if motion_detection_active and current_cam_idx != 2 and frame_count % MOTION_DETECT_FRAME_SKIP == 0:
-            frame_for_detection = frame.copy() # Працюємо з копією, щоб не змінювати оригінал
-
-            # Якщо це теплова камера, застосовуємо поріг "теплоти"
-            if current_cam_idx == 1:
-                gray = cv2.cvtColor(frame_for_detection, cv2.COLOR_BGR2GRAY)
-                
-                # Адаптивний поріг: розраховуємо середню яскравість і додаємо зміщення.
-                # Це робить систему стійкою до загальних змін температури фону.
-                avg_brightness = np.mean(gray)
-                adaptive_threshold = min(avg_brightness + 50, 254) # Додаємо 40 до середнього, але не більше 254
-                
-                # Створюємо маску, де пікселі яскравіші за адаптивний поріг - білі
-                _, mask = cv2.threshold(gray, adaptive_threshold, 255, cv2.THRESH_BINARY)
-                # Залишаємо на кадрі тільки "гарячі" області
-                frame_for_detection = cv2.bitwise_and(frame_for_detection, frame_for_detection, mask=mask)
-
-            # Детектуємо на підготовленому кадрі, а малюємо на оригінальному 'frame'
-            frame, motion_found = motion_detector.detect_and_draw(frame_for_detection, frame)
-            if motion_found:
-                audio_player_ondetect.play()
-
-        # Crosshair
-        if show_crosshair:
-            cv2.line(frame, (center_x-20, center_y), (center_x+20, center_y), (0,0,255),2)
-            cv2.line(frame, (center_x, center_y-20), (center_x, center_y+20), (0,0,255),2)
-            cv2.circle(frame, (center_x, center_y), 5, (0,0,255), -1)
-            if distance_text != "Distance: N/A":
-                distance_display = distance_text.replace("Distance: ", "")
-                cv2.putText(frame, f"{distance_display}", (center_x + 25, center_y - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2)
-
-        # HUD overlay
-        overlay = frame.copy()
-        rect_w, rect_h = 300, 280
-        rect_x, rect_y = w - rect_w - 10, 10
-        cv2.rectangle(overlay, (rect_x, rect_y), (rect_x+rect_w, rect_y+rect_h), (50,50,50), -1)
-        frame = cv2.addWeighted(overlay, 0.5, frame, 0.5, 0)
-
-        # HUD Text
-        line_y = rect_y + 30
-        if current_cam_idx == 2:
-           # cv2.putText(frame, "Streaming mode", (rect_x+10, line_y),
-            #            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,0,255), 2)
-            frame = draw_text_pil(frame, "Режим стрімінгу", (rect_x+10, line_y - 15), FONT_STREAM_MODE, (255,0,0))
-            
-        else:
-            frame = draw_text_pil(frame, distance_text, (rect_x+10, line_y - 15), FONT_HUD_LARGE)
-            if continuous_measure and int(time.time()*2) % 2 == 0:
-                cv2.circle(frame, (rect_x+250, line_y-10), 8, (0,255,0), -1)
-            line_y += 30
-            frame = draw_text_pil(frame, f"Роздільність: {FRAME_W}x{FRAME_H}", (rect_x+10, line_y - 15), FONT_HUD)
-            if zoom > 1.0:
-                line_y += 30
-                frame = draw_text_pil(frame, f"Зум: {zoom:.2f}x", (rect_x+10, line_y - 15), FONT_HUD)
-            if recording:
-                line_y += 30
-                frame = draw_text_pil(frame, "ЗАПИС", (rect_x+10, line_y - 15), FONT_HUD, (0,0,255))
-            if continuous_off_msg:
-                line_y += 30
-                frame = draw_text_pil(frame, continuous_off_msg, (rect_x+10, line_y - 15), FONT_HUD, (0,200,255))
-
-        # Draw HUD buttons
-        prev_continuous_state = False
-        if active_set in button_sets and not video_playing:
-            for name, data in button_sets[active_set].items():
-                if len(data) != 5:
-                    continue
-                bx, by, bw, bh, label = data
-                active = button_pressed.get(name, False)
-
-                # Блокування кнопок при HLS режимі
-                is_hls_and_not_switch = current_cam_idx == 2 and name != "switch_cam"
-                if is_hls_and_not_switch:
-                    if mouse_pressed_name == name:
-                        hud.show_message("Кнопка вимкнена в режимі HLS")
-                    color = (80, 80, 80) # Встановлюємо сірий колір для заблокованих кнопок
-                
-                elif name in ["single_measure", "continuous_measure", "crosshair"] and not lrf_sensor.is_available:
-                    color = (80, 80, 80) # Сірий колір, якщо далекомір недоступний
-                    if mouse_pressed_name == name:
-                        hud.show_message("Далекомір недоступний")
-
-
-                elif (name == "crosshair" or name == "single_measure") and continuous_measure:
-                    color = (80, 80, 80)
-                    if mouse_pressed_name == name:
-                        hud.show_message("Спочатку зупиніть безперервне вимірювання")
-
-                elif (name == "single_measure" or name == "continuous_measure") and not show_crosshair:
-                    color = (80, 80, 80)
-                    if mouse_pressed_name == name:
-                        hud.show_message("Спочатку увімкніть приціл")
-                
-
-                elif name == "switch_cam" and current_cam_idx == 2:
-                    t = time.time() - blink_start_time
-                    factor = (math.sin(t * 2 * math.pi / 1.5) + 1) / 2  # період 1.5 сек
-                    base_color = np.array([0, 100, 200], dtype=np.float32)
-                    red_color = np.array([0, 0, 255], dtype=np.float32)
-                    color = (base_color * (1 - factor) + red_color * factor).astype(int)
-                    color = tuple(color.tolist())
-                else:
-                    is_active_state = (
-                        (name == "enhance" and enhance_active) or
-                        (name == "record" and recording) or
-                        (name == "continuous_measure" and continuous_measure) or
-                        (name == "motion_detect" and motion_detection_active)
-                    )
-                    color = (0, 150, 0) if (active or is_active_state) else (0, 100, 200)
-                cv2.rectangle(frame, (bx, by), (bx + bw, by + bh), color, -1)
-                cv2.putText(frame, label, (bx+5, by+30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-
-        # Малюємо HLS кнопки зверху (якщо в HLS режимі)
-        frame = draw_hls_buttons(frame)
-
-        # Малюємо HUD (custom)
-        frame = hud.draw(frame)
-
-        # Запис
-        if recording and video_writer:
-            video_writer.write(frame)
-
-        cv2.imshow("Camera HUD", frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        # Основна камера: кадр проходить через зареєстровані етапи pipeline
+        frame_ctx.next_frame()
+        pipeline.run(frame_ctx)
+        loop_frames += 1
+        metrics.frame_done()
+        frame_pool.end_frame()
+        if pipeline.alloc_tracker is not None:
+            pipeline.alloc_tracker.end_frame()
+        if frame_ctx.quit:
             break
 
 except KeyboardInterrupt:
     print("Завершення по Ctrl+C")
 
-# --- Завершення ---
-try:
-    if video_writer:
-        video_writer.release()
-    if video_cap:
-        video_cap.release()
-    if cap:
+if HEADLESS:
+    run_elapsed = time.monotonic() - run_started
+    print(f"🏁 Headless: {loop_frames} кадрів за {run_elapsed:.1f} с "
+          f"({loop_frames / max(run_elapsed, 1e-6):.1f} FPS)")
+if pipeline.profile_interval or HEADLESS:
+    print(pipeline.report(window=False))
+if pipeline.alloc_tracker is not None:
+    print(pipeline.alloc_tracker.report())
+    pipeline.alloc_tracker.stop()
 
-        cap.release()
-except Exception:
-    pass
-
-cv2.destroyAllWindows()
+# --- Завершення ---
+def shutdown_step(name, func):
+    """Один крок завершення: помилка в ньому не скасовує решту кроків."""
+    try:
+        func()
+    except Exception as e:
+        print(f"⚠️ Завершення ({name}): {e}")
+
+# Спершу запис — файли мають бути дописані, навіть якщо зупинка служб нижче впаде
+if video_writer:
+    shutdown_step("video_writer", video_writer.release)
+if metadata_writer:
+    shutdown_step("metadata_writer", metadata_writer.close)
+if event_recorder:
+    shutdown_step("event_recorder", event_recorder.close)
+
+shutdown_step("metrics", metrics.stop)
+shutdown_step("alerts", alerts.stop)
+shutdown_step("mosaic", mosaic.stop)
+shutdown_step("standby_pool", standby_pool.clear)
+shutdown_step("stream_health", stream_health.stop)
+if config_watcher:
+    shutdown_step("config_watcher", config_watcher.stop)
+shutdown_step("storage", storage.stop)
+shutdown_step("snapshots", snapshots.stop)
+shutdown_step("remote_control", remote_control.stop)
+shutdown_step("frame_broadcaster", frame_broadcaster.stop)
+if hls_output:
+    shutdown_step("hls_output", hls_output.stop)
+shutdown_step("hotspot", hotspot.stop_http_server)
+if fake_lrf:
+    shutdown_step("fake_lrf", fake_lrf.stop)
+for sink in output_sinks + display_sinks:
+    shutdown_step("sink", sink.close)
+if video_cap:
+    shutdown_step("video_cap", video_cap.release)
+if cap:
+    shutdown_step("cap", cap.release)
+
+if display_sinks:
+    cv2.destroyAllWindows()
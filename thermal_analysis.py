@@ -0,0 +1,128 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Координати — у пікселях кадру, поданого в analyze()
+ThermalBlob = namedtuple("ThermalBlob", "x y w h area cx cy")
+ThermalStats = namedtuple("ThermalStats", "max mean p50 p95 hottest threshold blobs")
+
+_LEVELS = np.arange(256, dtype=np.float32)
+
+
+class ThermalAnalyzer:
+    """
+    Статистика кадру теплової камери та пошук гарячих зон.
+
+    Працює з одноканальним кадром зменшеної роздільності: максимум і середнє
+    через minMaxLoc/mean, перцентилі — за гістограмою calcHist, гарячі зони —
+    connectedComponentsWithStats по адаптивному порогу (середнє + offset).
+    Значення — рівні яскравості 0-255 (камера не радіометрична), а не градуси.
+    Не залежить від MOG2: розрахований на виконання в кожному кадрі.
+    """
+
+    def __init__(self, scale=0.25, offset=50, min_blob_area=200, max_blobs=8):
+        """
+        :param scale: Коефіцієнт зменшення кадру для аналізу.
+        :param offset: Поріг гарячої зони над середньою яскравістю кадру.
+        :param min_blob_area: Мінімальна площа зони в пікселях повного кадру.
+        :param max_blobs: Скільки найбільших зон повертати.
+        """
+        self.scale = scale
+        self.offset = offset
+        self.min_blob_area = min_blob_area
+        self.max_blobs = max_blobs
+        self.last = None
+        # Буфери живуть між кадрами, як у MotionDetector
+        self._buffers = {}
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self._buffers[name] = np.empty(shape, dtype)
+        return buf
+
+    def analyze(self, frame):
+        """
+        :param frame: Кадр BGR або відтінки сірого.
+        :return: ThermalStats (також зберігається в self.last).
+        """
+        height, width = frame.shape[:2]
+        size = (max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale))))
+        fx, fy = width / size[0], height / size[1]
+
+        # Зменшуємо до перетворення в сірий — cvtColor обробляє в 1/scale² менше пікселів
+        small = cv2.resize(frame, size, dst=self._buffer("small", (size[1], size[0]) + frame.shape[2:]),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._buffer("gray", (size[1], size[0])))
+        else:
+            gray = small
+
+        # Гістограма: 256 корзин замість сортування пікселів для перцентилів
+        hist = cv2.calcHist([gray], [0], None, [256], [0, 256], hist=self._buffer("hist", (256, 1), np.float32))
+        cumulative = np.cumsum(hist[:, 0])
+        total = cumulative[-1]
+        mean = float(hist[:, 0] @ _LEVELS / total)
+        p50 = int(np.searchsorted(cumulative, 0.50 * total))
+        p95 = int(np.searchsorted(cumulative, 0.95 * total))
+
+        # Найгарячіший блок зменшеного кадру, уточнений по пікселях повного кадру
+        _, _, _, (bx, by) = cv2.minMaxLoc(gray)
+        max_val, hottest = self._refine_peak(frame, bx, by, fx, fy)
+
+        threshold = min(mean + self.offset, 254)
+        mask = self._buffer("mask", gray.shape)
+        cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY, dst=mask)
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(
+            mask, labels=self._buffer("labels", gray.shape, np.int32), connectivity=8)
+
+        blobs = []
+        min_area = self.min_blob_area / (fx * fy)
+        for i in range(1, count):
+            area = stats[i, cv2.CC_STAT_AREA]
+            if area < min_area:
+                continue
+            x, y, w, h = stats[i, :4]
+            cx, cy = centroids[i]
+            blobs.append(ThermalBlob(int(x * fx), int(y * fy), int(w * fx), int(h * fy),
+                                     int(area * fx * fy), int(cx * fx), int(cy * fy)))
+        blobs.sort(key=lambda b: b.area, reverse=True)
+
+        self.last = ThermalStats(max_val, mean, p50, p95, hottest, threshold, blobs[:self.max_blobs])
+        return self.last
+
+    @staticmethod
+    def _refine_peak(frame, bx, by, fx, fy):
+        """Максимум у блоці повного кадру, з якого усереднено піксель (bx, by)."""
+        x1, y1 = int(bx * fx), int(by * fy)
+        x2, y2 = max(x1 + 1, int((bx + 1) * fx)), max(y1 + 1, int((by + 1) * fy))
+        block = frame[y1:y2, x1:x2]
+        if block.ndim == 3:
+            block = cv2.cvtColor(block, cv2.COLOR_BGR2GRAY)
+        _, max_val, _, (px, py) = cv2.minMaxLoc(block)
+        return int(max_val), (x1 + px, y1 + py)
+
+    @staticmethod
+    def draw(frame, stats, color=(255, 255, 255), rect=None):
+        """
+        Рамки гарячих зон і маркер найгарячішої точки з її рівнем.
+        :param rect: Область (x1, y1, x2, y2) аналізованого кадру, показана на frame
+                     (кадр після зуму, див. frame_ops.zoom_rect); None — той самий кадр.
+        """
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = rect or (0, 0, w, h)
+        sx, sy = w / (x2 - x1), h / (y2 - y1)
+
+        def to_frame(x, y):
+            return int(round((x - x1) * sx)), int(round((y - y1) * sy))
+
+        for blob in stats.blobs:
+            # Зони поза видимою областю cv2.rectangle обрізає сам
+            cv2.rectangle(frame, to_frame(blob.x, blob.y), to_frame(blob.x + blob.w, blob.y + blob.h), color, 1)
+        x, y = stats.hottest
+        if x1 <= x < x2 and y1 <= y < y2:
+            x, y = to_frame(x, y)
+            cv2.drawMarker(frame, (x, y), color, cv2.MARKER_CROSS, 24, 2)
+            cv2.putText(frame, str(stats.max), (x + 14, y - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        return frame
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Захоплення з USB/V4L2 камер у форматі MJPEG зі зменшенням під час декодування.
+
+Камера віддає стиснені JPEG кадри (CONVERT_RGB=0), а imdecode з
+IMREAD_REDUCED_COLOR_2/4/8 масштабує їх у DCT-домені libjpeg-turbo —
+це дешевше за повне декодування з подальшим cv2.resize. Якщо камера
+не підтримує MJPG, використовується звичайне перетворення OpenCV.
+
+Порівняння часу декодування з поточним шляхом (повне декодування + resize):
+    python v4l2_capture.py                        # синтетичні JPEG 1280x720 та 1920x1080
+    python v4l2_capture.py --device /dev/video0   # кадри з камери
+    python v4l2_capture.py --device /dev/video0 --capture auto   # режим, який обере застосунок
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+# Коефіцієнт зменшення -> прапорці imdecode
+REDUCED_COLOR = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+REDUCED_GRAYSCALE = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                     4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+
+def choose_reduction(src_size, dst_size):
+    """
+    Найбільший коефіцієнт 1/2/4/8, при якому зменшений кадр не менший за dst_size
+    (дозменшення — звичайним resize, але вже з меншого кадру).
+    """
+    sw, sh = src_size
+    dw, dh = dst_size
+    for factor in (8, 4, 2):
+        if sw // factor >= dw and sh // factor >= dh:
+            return factor
+    return 1
+
+
+def decode_jpeg(data, size=None, gray=False):
+    """
+    Декодує JPEG з масштабуванням у DCT-домені до розміру size (w, h).
+    :param data: Стиснені байти кадру (np.uint8 масив).
+    :return: Кадр або None, якщо дані не є JPEG.
+    """
+    flags = REDUCED_GRAYSCALE if gray else REDUCED_COLOR
+    factor = 1
+    if size is not None:
+        header = _jpeg_size(data)
+        if header is not None:
+            factor = choose_reduction(header, size)
+    frame = cv2.imdecode(data, flags[factor])
+    if frame is None:
+        return None
+    if size is not None and (frame.shape[1], frame.shape[0]) != tuple(size):
+        frame = cv2.resize(frame, tuple(size))
+    return frame
+
+
+def _jpeg_size(data):
+    """(ширина, висота) із заголовка SOF без декодування; None, якщо не знайдено."""
+    buf = memoryview(data).cast("B")
+    if len(buf) < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 < len(buf):
+        if buf[i] != 0xFF:
+            i += 1
+            continue
+        marker = buf[i + 1]
+        # SOF0..SOF15, крім DHT (C4), JPG (C8), DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = (buf[i + 5] << 8) | buf[i + 6]
+            width = (buf[i + 7] << 8) | buf[i + 8]
+            return width, height
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        i += 2 + ((buf[i + 2] << 8) | buf[i + 3])
+    return None
+
+
+class V4L2MjpegCapture:
+    """
+    Камера /dev/video* у режимі MJPEG: буфер драйвера на один кадр і декодування
+    одразу в розмір відображення. Інтерфейс як у cv2.VideoCapture.
+
+    Зменшення в DCT-домені працює лише якщо кадр камери щонайменше вдвічі
+    більший за output_size, тому без явної роздільності (width/height None)
+    береться найбільший MJPEG режим камери, коли він це дозволяє, інакше —
+    режим, найближчий до output_size (повне декодування, як раніше).
+    """
+
+    # Свідомо завеликий запит: драйвер обмежить його найбільшим режимом камери
+    NATIVE_PROBE_SIZE = (8192, 8192)
+
+    def __init__(self, device, width=None, height=None, fps=30.0, output_size=None, buffersize=1):
+        """
+        :param device: Шлях /dev/videoN або індекс.
+        :param width, height: Бажана роздільність захоплення (камера обере найближчу);
+                              None — вибір за output_size (див. опис класу).
+        :param output_size: (w, h) кадрів з read(); None — як захоплення.
+        :param buffersize: Кадрів у черзі драйвера; 1 — мінімальна затримка.
+        """
+        self.device = device
+        self.output_size = tuple(output_size) if output_size else None
+        self.mjpeg = False
+        self.reduction = 1
+        self.decode_ms = 0.0
+        self.frames = 0
+        self._decode_total = 0.0
+
+        self.cap = cv2.VideoCapture(device, cv2.CAP_V4L2)
+        if not self.cap.isOpened():
+            return
+        # FOURCC ставиться до розміру: від формату залежить перелік доступних роздільностей
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        if width is None or height is None:
+            width, height = self._auto_size()
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap.set(cv2.CAP_PROP_FPS, fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffersize)
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        self.mjpeg = fourcc.to_bytes(4, "little") == b"MJPG"
+        if self.mjpeg:
+            # Сирі байти JPEG замість декодування всередині OpenCV
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        self.capture_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                             int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if self.mjpeg and self.output_size:
+            self.reduction = choose_reduction(self.capture_size, self.output_size)
+        mode = "MJPEG" if self.mjpeg else f"{fourcc.to_bytes(4, 'little').decode(errors='replace')} (без MJPEG)"
+        reduced = f", декодування 1/{self.reduction}" if self.reduction > 1 else ""
+        print(f"📷 {device}: {self.capture_size[0]}x{self.capture_size[1]} {mode}{reduced}")
+
+    def _auto_size(self):
+        """Найбільший режим камери, якщо з нього можливе зменшене декодування, інакше output_size."""
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.NATIVE_PROBE_SIZE[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.NATIVE_PROBE_SIZE[1])
+        native = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if self.output_size is None or choose_reduction(native, self.output_size) > 1:
+            return native
+        return self.output_size
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read_raw(self):
+        """Стиснений кадр як є (лише в режимі MJPEG)."""
+        ret, data = self.cap.read()
+        if not ret or data is None:
+            return None
+        return data.reshape(-1)
+
+    def read(self):
+        if not self.mjpeg:
+            ret, frame = self.cap.read()
+            if ret and self.output_size and (frame.shape[1], frame.shape[0]) != self.output_size:
+                frame = cv2.resize(frame, self.output_size)
+            return ret, frame
+        # Пошкоджений кадр (обрив USB) пропускаємо, а не зупиняємо джерело
+        for _ in range(3):
+            data = self.read_raw()
+            if data is None:
+                return False, None
+            start = time.perf_counter()
+            frame = decode_jpeg(data, self.output_size)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            if frame is not None:
+                self.frames += 1
+                self._decode_total += elapsed
+                self.decode_ms = self._decode_total / self.frames
+                return True, frame
+        return False, None
+
+    def grab(self):
+        return self.cap.grab()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+
+# --- Порівняння часу декодування ---
+def _synthetic_jpegs(width, height, count=8, quality=85):
+    from simulator.camera import SyntheticClip
+    clip = SyntheticClip(width, height)
+    frame = np.empty((height, width, 3), np.uint8)
+    jpegs = []
+    for i in range(count):
+        clip.read_into(i * 5, frame)
+        jpegs.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].reshape(-1))
+    return jpegs
+
+
+def _camera_jpegs(device, width, height, count=30, output_size=None):
+    capture = V4L2MjpegCapture(device, width, height, output_size=output_size)
+    if not capture.isOpened() or not capture.mjpeg:
+        capture.release()
+        raise SystemExit(f"❌ {device}: MJPEG недоступний")
+    jpegs = [j for j in (capture.read_raw() for _ in range(count)) if j is not None]
+    capture.release()
+    return jpegs
+
+
+def _time_ms(func, jpegs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in jpegs:
+            func(data)
+    return (time.perf_counter() - start) * 1000.0 / (repeat * len(jpegs))
+
+
+def bench(jpegs, targets, repeat=5):
+    """Друкує мс/кадр: повне декодування + resize проти зменшеного декодування."""
+    src = _jpeg_size(jpegs[0])
+    print(f"Джерело {src[0]}x{src[1]}, {len(jpegs)} кадрів")
+    results = []
+    for size in targets:
+        def current(data, size=size):
+            frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            return cv2.resize(frame, size)
+        baseline = _time_ms(current, jpegs, repeat)
+        reduced = _time_ms(lambda data, size=size: decode_jpeg(data, size), jpegs, repeat)
+        gray = _time_ms(lambda data, size=size: decode_jpeg(data, size, gray=True), jpegs, repeat)
+        factor = choose_reduction(src, size)
+        print(f"  → {size[0]}x{size[1]}: поточний {baseline:6.2f} мс  1/{factor} {reduced:6.2f} мс  "
+              f"сірий {gray:6.2f} мс  (x{baseline / reduced:.1f})")
+        results.append({"target": size, "current_ms": baseline, "reduced_ms": reduced,
+                        "gray_ms": gray, "factor": factor})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Час декодування MJPEG: поточний шлях проти IMREAD_REDUCED_*")
+    parser.add_argument("--device", help="камера /dev/videoN (інакше синтетичні JPEG)")
+    parser.add_argument("--capture", default="1280x720,1920x1080",
+                        help="роздільності захоплення; auto — як у застосунку (за першою ціллю)")
+    parser.add_argument("--targets", default="1024x600,512x300,256x150",
+                        help="цільові розміри: екран та аналіз")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    def parse_size(text):
+        if text == "auto":
+            return None, None
+        w, h = text.lower().split("x")
+        return int(w), int(h)
+
+    targets = [parse_size(t) for t in args.targets.split(",")]
+    for capture_size in (parse_size(c) for c in args.capture.split(",")):
+        if args.device:
+            jpegs = _camera_jpegs(args.device, *capture_size, output_size=targets[0])
+        elif capture_size == (None, None):
+            raise SystemExit("❌ --capture auto потребує --device")
+        else:
+            jpegs = _synthetic_jpegs(*capture_size)
+        bench(jpegs, targets, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,267 @@
+import threading
+import time
+
+
+class _StandbyEntry:
+    """Одне тепле з'єднання: джерело та потік, що тримає його живим."""
+
+    def __init__(self, key, opener, drain=False):
+        self.key = key
+        self.opener = opener
+        self.drain = drain
+        self.cap = None
+        # Встановлюється, коли відкриття завершилось — успішно (cap) чи ні (cap is None)
+        self.ready = threading.Event()
+        self.stop = threading.Event()
+        self.thread = None
+        self.last_used = time.monotonic()
+
+
+class WarmStandbyPool:
+    """
+    Пул "теплих" з'єднань для миттєвого перемикання камер і потоків.
+
+    Для кожного ключа (напр. URL потоку) фоновий потік відкриває джерело й
+    тримає його живим, забираючи кадри з низькою частотою через grab().
+    Живі потоки (drain=True) вичитуються з частотою джерела, інакше їхній
+    буфер заповнюється застарілими кадрами і після перемикання показується
+    старе відео. Скільки коштує grab(), залежить від джерела: HLSVideo лише
+    демультиплексує пакети (декодування відкладається до take()), а
+    cv2.VideoCapture декодує кадр повністю. Перемикання зводиться до take():
+    готовий об'єкт cap віддається основному циклу, а попередній повертається
+    в пул через put() замість release().
+
+    Розмір пулу обмежено бюджетом пам'яті: кожне з'єднання оцінюється як
+    кілька кадрів width*height*3; найдавніше використане витісняється. Живі
+    потоки вичитуються повністю, тож їх кількість обмежує ще й бюджет трафіку.
+    """
+
+    def __init__(self, budget_mb=64, frame_shape=(600, 1024), buffered_frames=4, standby_fps=2.0, max_entries=2,
+                 drain_max_fps=60.0, bandwidth_mbps=None, live_mbps=8.0):
+        """
+        :param budget_mb: Бюджет пам'яті на всі теплі з'єднання (МБ).
+        :param frame_shape: (висота, ширина) кадру для оцінки вартості з'єднання.
+        :param buffered_frames: Скільки кадрів у середньому тримає декодер/буфер.
+        :param standby_fps: Частота забирання кадрів у фоновому режимі.
+        :param max_entries: Жорстка межа кількості теплих з'єднань.
+        :param drain_max_fps: Межа частоти вичитування живих потоків (grab() джерела
+                              зазвичай сам чекає на наступний кадр; межа — для тих, що не чекають).
+        :param bandwidth_mbps: Бюджет трафіку на всі живі потоки в пулі, Мбіт/с (None — без обмеження).
+        :param live_mbps: Оцінка бітрейту одного живого потоку, Мбіт/с.
+        """
+        h, w = frame_shape
+        entry_cost = w * h * 3 * buffered_frames
+        self.capacity = max(0, min(max_entries, int(budget_mb * 1024 * 1024 // entry_cost)))
+        self.live_capacity = self.capacity
+        if bandwidth_mbps is not None:
+            self.live_capacity = min(self.capacity, int(bandwidth_mbps // live_mbps))
+        self.standby_interval = 1.0 / standby_fps if standby_fps > 0 else 1.0
+        self.drain_interval = 1.0 / drain_max_fps if drain_max_fps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @property
+    def enabled(self):
+        return self.capacity > 0
+
+    @property
+    def opening(self):
+        """Скільки джерел ще відкривається у фоні."""
+        with self._lock:
+            return sum(1 for e in self._entries.values() if not e.ready.is_set())
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def prefetch(self, key, opener, drain=False):
+        """
+        Відкриває джерело у фоні, якщо його ще немає в пулі.
+        :param key: Ключ джерела (URL або індекс камери).
+        :param opener: Функція без аргументів, що повертає об'єкт з read()/release().
+        :param drain: Живий потік — вичитувати з частотою джерела, а не standby_fps.
+        """
+        if not self.enabled or (drain and not self.live_capacity):
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                return
+            evicted = self._evict_locked(keep=1, drain=drain)
+            entry = _StandbyEntry(key, opener, drain)
+            self._entries[key] = entry
+        for old in evicted:
+            self._shutdown(old)
+        entry.thread = threading.Thread(target=self._keep_warm, args=(entry,), name="warm-standby", daemon=True)
+        entry.thread.start()
+
+    def put(self, key, cap, drain=False):
+        """
+        Повертає в пул активне джерело замість release().
+        Якщо пул вимкнений чи ключ уже зайнятий — джерело закривається.
+        :param drain: Див. prefetch().
+        """
+        if cap is None:
+            return
+        if not self.enabled or (drain and not self.live_capacity):
+            _release(cap)
+            return
+        with self._lock:
+            if key in self._entries:
+                duplicate = True
+            else:
+                duplicate = False
+                evicted = self._evict_locked(keep=1, drain=drain)
+                entry = _StandbyEntry(key, None, drain)
+                entry.cap = cap
+                entry.ready.set()
+                self._entries[key] = entry
+        if duplicate:
+            _release(cap)
+            return
+        for old in evicted:
+            self._shutdown(old)
+        entry.thread = threading.Thread(target=self._keep_warm, args=(entry,), name="warm-standby", daemon=True)
+        entry.thread.start()
+
+    def take(self, key, flush=0, wait=0.0):
+        """
+        Забирає готове джерело з пулу.
+        :param flush: Скільки кадрів пропустити, щоб позбутися застарілих у буфері.
+        :param wait: Скільки чекати, якщо джерело ще відкривається у фоні, с.
+                     Якщо не дочекались — відкриття скасовується і запис прибирається з пулу,
+                     тож повторне відкриття того ж пристрою не конкурує з фоновим
+                     (окрім відкриття, що зависло довше за wait).
+        :return: Відкритий cap або None, якщо з'єднання не готове чи його немає.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.ready.wait(wait):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            # _keep_warm закриє джерело сам, коли opener поверне керування
+            entry.stop.set()
+            return None
+        with self._lock:
+            if self._entries.get(key) is not entry or entry.cap is None:
+                return None
+            del self._entries[key]
+        entry.stop.set()
+        if entry.thread and entry.thread is not threading.current_thread():
+            entry.thread.join(timeout=2.0)
+            if entry.thread.is_alive():
+                # Потік ще всередині grab(): спільний декодер віддавати не можна.
+                # Джерело закриється, щойно grab() поверне керування
+                print(f"Warm standby: {key} не звільнився вчасно, відкриваємо заново")
+                threading.Thread(target=self._release_after, args=(entry,), name="warm-standby-release",
+                                 daemon=True).start()
+                return None
+        cap = entry.cap
+        if cap is not None and flush and hasattr(cap, "grab"):
+            for _ in range(flush):
+                cap.grab()
+        return cap
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry:
+            self._shutdown(entry)
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._shutdown(entry)
+
+    # --- Внутрішнє ---
+    def _evict_locked(self, keep, drain=False):
+        """
+        Звільняє місце для `keep` нових записів, витісняючи найдавніші.
+        :param drain: Нові записи — живі потоки: також звільняється бюджет трафіку.
+        """
+        evicted = []
+        while self._entries:
+            live = [e for e in self._entries.values() if e.drain]
+            if drain and len(live) + keep > self.live_capacity:
+                candidates = live
+            elif len(self._entries) + keep > self.capacity:
+                candidates = self._entries.values()
+            else:
+                break
+            oldest = min(candidates, key=lambda e: e.last_used)
+            del self._entries[oldest.key]
+            evicted.append(oldest)
+        return evicted
+
+    @staticmethod
+    def _release_after(entry):
+        """Закриває джерело після завершення потоку, що його ще використовує."""
+        entry.thread.join()
+        _release(entry.cap)
+        entry.cap = None
+
+    def _shutdown(self, entry):
+        entry.stop.set()
+        if entry.thread and entry.thread is not threading.current_thread():
+            entry.thread.join(timeout=2.0)
+        _release(entry.cap)
+        entry.cap = None
+
+    def _keep_warm(self, entry):
+        if entry.cap is None:
+            try:
+                entry.cap = entry.opener()
+            except Exception as e:
+                print(f"Warm standby: не вдалося відкрити {entry.key}: {e}")
+                entry.cap = None
+            if entry.cap is None or (hasattr(entry.cap, "isOpened") and not entry.cap.isOpened()):
+                with self._lock:
+                    if self._entries.get(entry.key) is entry:
+                        del self._entries[entry.key]
+                _release(entry.cap)
+                entry.cap = None
+                entry.ready.set()
+                return
+            if entry.stop.is_set():
+                # Поки відкривали, запис уже витіснили або take() не дочекався
+                _release(entry.cap)
+                entry.cap = None
+                entry.ready.set()
+                return
+            entry.ready.set()
+
+        # Тримаємо з'єднання живим; вартість grab() залежить від джерела (див. опис класу)
+        interval = self.drain_interval if entry.drain else self.standby_interval
+        last = time.monotonic()
+        while not entry.stop.wait(max(0.0, interval - (time.monotonic() - last))):
+            last = time.monotonic()
+            try:
+                if hasattr(entry.cap, "grab"):
+                    ok = entry.cap.grab()
+                else:
+                    ok, _ = entry.cap.read()
+            except Exception:
+                ok = False
+            if not ok:
+                # Джерело впало — прибираємо його з пулу
+                with self._lock:
+                    if self._entries.get(entry.key) is entry:
+                        del self._entries[entry.key]
+                _release(entry.cap)
+                entry.cap = None
+                return
+
+
+def _release(cap):
+    if cap is None:
+        return
+    try:
+        cap.release()
+    except Exception:
+        pass
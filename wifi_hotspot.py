@@ -1,8 +1,35 @@
 # wifi_hotspot.py
 import os
-from http.server import SimpleHTTPRequestHandler, HTTPServer
+import subprocess
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
 import threading
 
+
+class HotspotRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Статичний файловий сервер з підтримкою динамічних маршрутів.
+    Маршрути реєструються через WifiHotspotServer.add_route().
+    """
+
+    def _dispatch(self, method):
+        path = urlsplit(self.path).path
+        route = self.server.routes.get((method, path))
+        if route is None:
+            return False
+        route(self)
+        return True
+
+    def do_GET(self):
+        if not self._dispatch("GET"):
+            super().do_GET()
+
+    def do_POST(self):
+        if not self._dispatch("POST"):
+            self.send_error(404, "Not found")
+
+
 class WifiHotspotServer:
     def __init__(self, ssid="PiHotspot", password="12345678", folder="download", port=8000):
         self.ssid = ssid
@@ -11,25 +38,65 @@ class WifiHotspotServer:
         self.port = port
         self.http_thread = None
         self.httpd = None
+        self.routes = {}
+
+    def _nmcli(self, *args, timeout=30):
+        """Викликає nmcli без shell; повертає True при успіху."""
+        try:
+            result = subprocess.run(["nmcli", *args], capture_output=True, text=True, timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"⚠️  nmcli {args[0]}: {e}")
+            return False
+        if result.returncode != 0:
+            print(f"⚠️  nmcli: {result.stderr.strip()}")
+        return result.returncode == 0
 
-    def start_hotspot(self):
-        """Створює Wi-Fi хотспот через NetworkManager"""
+    def start_hotspot(self, background=False):
+        """
+        Створює Wi-Fi хотспот через NetworkManager.
+        :param background: Не чекати на nmcli (кілька секунд) — запуск у фоновому потоці.
+        """
+        if background:
+            threading.Thread(target=self.start_hotspot, name="hotspot", daemon=True).start()
+            return None
         print(f"Запуск хотспоту '{self.ssid}' з паролем '{self.password}'...")
-        os.system(f"nmcli device wifi hotspot ifname wlan0 con-name {self.ssid} ssid {self.ssid} password {self.password}")
-        print("Hotspot запущено")
+        ok = self._nmcli("device", "wifi", "hotspot", "ifname", "wlan0", "con-name", self.ssid,
+                         "ssid", self.ssid, "password", self.password)
+        if ok:
+            print("Hotspot запущено")
+        return ok
 
     def stop_hotspot(self):
         """Зупиняє хотспот"""
-        os.system(f"nmcli connection down {self.ssid}")
-        print("Hotspot зупинено")
+        if self._nmcli("connection", "down", self.ssid, timeout=10):
+            print("Hotspot зупинено")
+
+    def add_route(self, path, handler, method="GET"):
+        """
+        Реєструє динамічний маршрут.
+        :param path: Шлях, напр. "/stream.mjpg".
+        :param handler: Функція handler(request_handler), що сама формує відповідь.
+        :param method: HTTP метод ("GET" або "POST").
+        """
+        self.routes[(method, path)] = handler
+
+    def attach_stream(self, broadcaster):
+        """Підключає FrameBroadcaster: живий /stream.mjpg та /snapshot.jpg."""
+        self.add_route("/stream.mjpg", broadcaster.serve_mjpeg)
+        self.add_route("/snapshot.jpg", broadcaster.serve_snapshot)
 
     def start_http_server(self):
         """Запускає HTTP сервер для папки з відео"""
         if not os.path.exists(self.folder):
             os.makedirs(self.folder)
-        os.chdir(self.folder)
 
-        self.httpd = HTTPServer(("", self.port), SimpleHTTPRequestHandler)
+        # Роздаємо папку через directory=, а не os.chdir, щоб не змінювати
+        # робочу папку всього застосунку (відносні шляхи record/, json тощо)
+        handler = partial(HotspotRequestHandler, directory=os.path.abspath(self.folder))
+        # Потоковий сервер: MJPEG клієнти тримають з'єднання відкритим
+        self.httpd = ThreadingHTTPServer(("", self.port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.routes = self.routes
         print(f"HTTP сервер запущено на http://<Pi_IP>:{self.port} (папка: {self.folder})")
 
         # Запускаємо сервер у окремому потоці, щоб не блокувати основний цикл
@@ -43,9 +110,9 @@ class WifiHotspotServer:
             self.httpd.server_close()
             print("HTTP сервер зупинено")
 
-    def start_all(self):
+    def start_all(self, background=False):
         """Запуск хотспоту та HTTP сервера"""
-        self.start_hotspot()
+        self.start_hotspot(background=background)
         self.start_http_server()
 
     def stop_all(self):